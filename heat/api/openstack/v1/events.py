@@ -17,6 +17,7 @@ import six
 from webob import exc
 
 from heat.api.openstack.v1 import util
+from heat.api.openstack.v1.views import views_common
 from heat.common.i18n import _
 from heat.common import identifier
 from heat.common import param_utils
@@ -54,7 +55,7 @@ def format_event(req, event, keys=None):
                              util.make_link(req, identity.stack(),
                                             'stack')])
         elif key in (rpc_api.EVENT_STACK_ID, rpc_api.EVENT_STACK_NAME,
-                     rpc_api.EVENT_RES_ACTION):
+                     rpc_api.EVENT_RES_ACTION, rpc_api.LIST_CURSOR):
             return
         elif (key == rpc_api.EVENT_RES_STATUS and
               rpc_api.EVENT_RES_ACTION in event):
@@ -85,18 +86,15 @@ class EventController(object):
         self.options = options
         self.rpc_client = rpc_client.EngineClient()
 
-    def _event_list(self, req, identity, detail=False, filters=None,
-                    limit=None, marker=None, sort_keys=None, sort_dir=None):
-        events = self.rpc_client.list_events(req.context,
-                                             identity,
-                                             filters=filters,
-                                             limit=limit,
-                                             marker=marker,
-                                             sort_keys=sort_keys,
-                                             sort_dir=sort_dir)
-        keys = None if detail else summary_keys
-
-        return [format_event(req, e, keys) for e in events]
+    def _event_list(self, req, identity, filters=None, limit=None,
+                    marker=None, sort_keys=None, sort_dir=None):
+        return self.rpc_client.list_events(req.context,
+                                           identity,
+                                           filters=filters,
+                                           limit=limit,
+                                           marker=marker,
+                                           sort_keys=sort_keys,
+                                           sort_dir=sort_dir)
 
     @util.identified_stack
     def index(self, req, identity, resource_name=None):
@@ -137,18 +135,26 @@ class EventController(object):
             msg = _('No events found for resource %s') % resource_name
             raise exc.HTTPNotFound(msg)
 
-        return {'events': events}
+        formatted_events = [format_event(req, e, summary_keys)
+                            for e in events]
+        result = {'events': formatted_events}
+        cursor = events[-1].get(rpc_api.LIST_CURSOR) if events else None
+        links = views_common.get_collection_links(req, formatted_events,
+                                                  cursor)
+        if links:
+            result['links'] = links
+        return result
 
     @util.identified_stack
     def show(self, req, identity, resource_name, event_id):
         """Gets detailed information for an event."""
 
         filters = {"resource_name": resource_name, "uuid": event_id}
-        events = self._event_list(req, identity, filters=filters, detail=True)
+        events = self._event_list(req, identity, filters=filters)
         if not events:
             raise exc.HTTPNotFound(_('No event %s found') % event_id)
 
-        return {'event': events[0]}
+        return {'event': format_event(req, events[0])}
 
 
 def create_resource(options):
@@ -14,8 +14,10 @@
 from webob import exc
 
 from heat.api.openstack.v1 import util
+from heat.common import param_utils
 from heat.common import serializers
 from heat.common import wsgi
+from heat.rpc import api as rpc_api
 from heat.rpc import client as rpc_client
 
 
@@ -49,10 +51,24 @@ class SoftwareDeploymentController(object):
         """List software deployments grouped by the group name.
 
         This is done for the requested server.
+
+        If the request has an If-None-Match header matching the current
+        ETag of the metadata, 304 Not Modified is returned instead. With a
+        wait parameter, such a request waits for up to that many seconds for
+        the metadata to change before returning.
         """
-        sds = self.rpc_client.metadata_software_deployments(
-            req.context, server_id=server_id)
-        return {'metadata': sds}
+        wait = param_utils.extract_int('wait', req.params.get('wait')) or 0
+        # Only a single ETag can be waited on in the engine
+        etags = getattr(req.if_none_match, 'etags', [])
+        result = self.rpc_client.poll_metadata_software_deployments(
+            req.context, server_id=server_id,
+            etag=etags[0] if len(etags) == 1 else None,
+            timeout=wait)
+        etag = result[rpc_api.SOFTWARE_DEPLOYMENT_METADATA_ETAG]
+        if etag is not None and etag in req.if_none_match:
+            raise exc.HTTPNotModified(headers={'ETag': '"%s"' % etag})
+        return {'metadata': result[rpc_api.SOFTWARE_DEPLOYMENT_METADATA],
+                'etag': etag}
 
     @util.policy_enforce
     def show(self, req, deployment_id):
@@ -96,9 +112,19 @@ class SoftwareDeploymentController(object):
         raise exc.HTTPNoContent()
 
 
+class SoftwareDeploymentSerializer(serializers.JSONResponseSerializer):
+    """Handles serialization of specific controller method responses."""
+
+    def metadata(self, response, result):
+        etag = result.pop('etag', None)
+        if etag is not None:
+            response.etag = etag
+        self.default(response, result)
+
+
 def create_resource(options):
     """Software deployments resource factory method."""
     deserializer = wsgi.JSONRequestDeserializer()
-    serializer = serializers.JSONResponseSerializer()
+    serializer = SoftwareDeploymentSerializer()
     return wsgi.Resource(
         SoftwareDeploymentController(options), deserializer, serializer)
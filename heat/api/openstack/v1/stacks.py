@@ -182,6 +182,12 @@ class StackController(object):
         except ValueError as e:
             raise exc.HTTPBadRequest(six.text_type(e))
 
+    def _resolve_live_param(self, params):
+        p_name = rpc_api.RESOLVE_LIVE
+        if p_name in params:
+            return self._extract_bool_param(p_name, params[p_name])
+        return False
+
     def _extract_int_param(self, name, value,
                            allow_zero=True, allow_negative=False):
         try:
@@ -430,8 +436,10 @@ class StackController(object):
                 p_name, params[p_name])
         else:
             resolve_outputs = True
+        resolve_live = self._resolve_live_param(params)
         stack_list = self.rpc_client.show_stack(req.context,
-                                                identity, resolve_outputs)
+                                                identity, resolve_outputs,
+                                                resolve_live=resolve_live)
 
         if not stack_list:
             raise exc.HTTPInternalServerError()
@@ -706,9 +714,9 @@ class StackController(object):
 
     @util.identified_stack
     def show_output(self, req, identity, output_key):
-        return {'output': self.rpc_client.show_output(req.context,
-                                                      identity,
-                                                      output_key)}
+        resolve_live = self._resolve_live_param(req.params)
+        return {'output': self.rpc_client.show_output(
+            req.context, identity, output_key, resolve_live=resolve_live)}
 
 
 class StackSerializer(serializers.JSONResponseSerializer):
@@ -45,7 +45,7 @@ def format_stack(req, stack, keys=None, tenant_safe=True):
             yield ('links', [util.make_link(req, value)])
             if not tenant_safe:
                 yield ('project', value['tenant'])
-        elif key == rpc_api.STACK_ACTION:
+        elif key in (rpc_api.STACK_ACTION, rpc_api.LIST_CURSOR):
             return
         elif (key == rpc_api.STACK_STATUS and
               rpc_api.STACK_ACTION in stack):
@@ -69,7 +69,8 @@ def collection(req, stacks, count=None, tenant_safe=True):
                         for s in stacks]
 
     result = {'stacks': formatted_stacks}
-    links = views_common.get_collection_links(req, formatted_stacks)
+    cursor = stacks[-1].get(rpc_api.LIST_CURSOR) if stacks else None
+    links = views_common.get_collection_links(req, formatted_stacks, cursor)
     if links:
         result['links'] = links
     if count is not None:
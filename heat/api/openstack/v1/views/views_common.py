@@ -14,8 +14,12 @@
 from six.moves.urllib import parse as urlparse
 
 
-def get_collection_links(request, items):
-    """Retrieve 'next' link, if applicable."""
+def get_collection_links(request, items, cursor=None):
+    """Retrieve 'next' link, if applicable.
+
+    The cursor of the last item is used as the marker for the next page
+    when the engine supplied one, and its ID otherwise.
+    """
     links = []
     try:
         limit = int(request.params.get("limit") or 0)
@@ -23,11 +27,10 @@ def get_collection_links(request, items):
         limit = 0
 
     if limit > 0 and limit == len(items):
-        last_item = items[-1]
-        last_item_id = last_item["id"]
+        marker = cursor or items[-1]["id"]
         links.append({
             "rel": "next",
-            "href": _get_next_link(request, last_item_id)
+            "href": _get_next_link(request, marker)
         })
     return links
 
@@ -24,6 +24,7 @@ from heat.common import context
 from heat.common.i18n import _
 from heat.common import service_utils
 from heat.db import api as db_api
+from heat.db import query_stats
 from heat.db import utils
 from heat.objects import service as service_objects
 from heat import version
@@ -112,19 +113,27 @@ def do_reset_stack_status():
 
 def purge_deleted():
     """Remove database records that have been previously soft deleted."""
-    utils.purge_deleted(CONF.command.age, CONF.command.granularity)
+    utils.purge_deleted(CONF.command.age, CONF.command.granularity,
+                        CONF.command.batch_size, CONF.command.batch_sleep)
 
 
 def do_crypt_parameters_and_properties():
     """Encrypt/decrypt hidden parameters and resource properties data."""
     ctxt = context.get_admin_context()
     prev_encryption_key = CONF.command.previous_encryption_key
+    kwargs = {'batch_size': CONF.command.batch_size}
+    if CONF.command.streaming:
+        kwargs.update(streaming=True,
+                      workers=CONF.command.workers,
+                      checkpoint=CONF.command.checkpoint)
     if CONF.command.crypt_operation == "encrypt":
         utils.encrypt_parameters_and_properties(
-            ctxt, prev_encryption_key, CONF.command.verbose_update_params)
+            ctxt, prev_encryption_key, CONF.command.verbose_update_params,
+            **kwargs)
     elif CONF.command.crypt_operation == "decrypt":
         utils.decrypt_parameters_and_properties(
-            ctxt, prev_encryption_key, CONF.command.verbose_update_params)
+            ctxt, prev_encryption_key, CONF.command.verbose_update_params,
+            **kwargs)
 
 
 def add_command_parsers(subparsers):
@@ -149,6 +158,13 @@ def add_command_parsers(subparsers):
         '-g', '--granularity', default='days',
         choices=['days', 'hours', 'minutes', 'seconds'],
         help=_('Granularity to use for age argument, defaults to days.'))
+    parser.add_argument(
+        '-b', '--batch-size', type=int,
+        help=_('Number of stacks to purge per transaction, oldest first. '
+               'By default all stacks are purged in one go.'))
+    parser.add_argument(
+        '--batch-sleep', type=float, default=0,
+        help=_('Seconds to sleep between batches.'))
 
     # update_params parser
     parser = subparsers.add_parser('update_params')
@@ -168,6 +184,19 @@ def add_command_parsers(subparsers):
     parser.add_argument('--verbose-update-params', action='store_true',
                         help=_('Print an INFO message when processing of each '
                                'raw_template or resource begins or ends'))
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help=_('Number of raw_templates or resources read '
+                               'from the database at a time.'))
+    parser.add_argument('--streaming', action='store_true',
+                        help=_('Commit each batch in its own transaction, '
+                               'rather than everything in one transaction.'))
+    parser.add_argument('--workers', type=int, default=1,
+                        help=_('Number of batches processed in parallel '
+                               'with --streaming.'))
+    parser.add_argument('--checkpoint',
+                        help=_('File recording the progress with '
+                               '--streaming. If it exists, processing resumes '
+                               'from the recorded progress.'))
 
     parser = subparsers.add_parser('resource_data_list')
     parser.set_defaults(func=do_resource_data_list)
@@ -186,11 +215,18 @@ command_opt = cfg.SubCommandOpt('command',
                                 help='Show available commands.',
                                 handler=add_command_parsers)
 
+query_stats_opt = cfg.BoolOpt('query-stats',
+                              default=False,
+                              help=_('Log the number of SQL statements issued '
+                                     'by the command, and the slowest of '
+                                     'them.'))
+
 
 def main():
     log.register_options(CONF)
     log.setup(CONF, "heat-manage")
     CONF.register_cli_opt(command_opt)
+    CONF.register_cli_opt(query_stats_opt)
     try:
         default_config_files = cfg.find_config_files('heat', 'heat-engine')
         CONF(sys.argv[1:], project='heat', prog='heat-manage',
@@ -199,7 +235,11 @@ def main():
     except RuntimeError as e:
         sys.exit("ERROR: %s" % e)
 
+    if CONF.query_stats:
+        CONF.set_override('query_accounting', True)
+
     try:
-        CONF.command.func()
+        with query_stats.operation('manage_%s' % CONF.command.name):
+            CONF.command.func()
     except Exception as e:
         sys.exit("ERROR: %s" % e)
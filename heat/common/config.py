@@ -145,16 +145,35 @@ engine_opts = [
                help=_('Number of times to check whether an interface has '
                       'been attached or detached.')),
     cfg.IntOpt('event_purge_batch_size',
-               default=10,
-               help=_("Controls how many events will be pruned whenever a "
-                      "stack's events exceed max_events_per_stack. Set this "
-                      "lower to keep more events at the expense of more "
-                      "frequent purges.")),
+               min=1,
+               default=1000,
+               help=_("Maximum number of events deleted in a single "
+                      "transaction by the periodic event pruning task.")),
     cfg.IntOpt('max_events_per_stack',
                default=1000,
                help=_('Maximum events that will be available per stack. Older'
-                      ' events will be deleted when this is reached. Set to 0'
-                      ' for unlimited events per stack.')),
+                      ' events will be deleted by the periodic event pruning'
+                      ' task when this is exceeded. Set to 0 for unlimited'
+                      ' events per stack.')),
+    cfg.IntOpt('event_retention_days',
+               min=0,
+               default=0,
+               help=_('Number of days events are kept before being deleted '
+                      'by the periodic event pruning task. Set to 0 to keep '
+                      'events regardless of their age.')),
+    cfg.IntOpt('event_prune_interval',
+               min=0,
+               default=300,
+               help=_('Seconds between runs of the periodic event pruning '
+                      'task. Only one engine prunes at a time. Set to 0 to '
+                      'disable event pruning.')),
+    cfg.IntOpt('resource_count_reconcile_interval',
+               min=0,
+               default=3600,
+               help=_('Seconds between runs of the periodic task that '
+                      'corrects the cached per-stack resource counts used to '
+                      'enforce max_resources_per_stack. Only one engine '
+                      'reconciles at a time. Set to 0 to disable it.')),
     cfg.IntOpt('stack_action_timeout',
                default=3600,
                help=_('Timeout in seconds for stack action (ie. create or'
@@ -164,6 +183,61 @@ engine_opts = [
                help=_('The amount of time in seconds after an error has'
                       ' occurred that tasks may continue to run before'
                       ' being cancelled.')),
+    cfg.BoolOpt('parallel_stack_delete',
+                default=False,
+                help=_('Delete stacks in parallel mode. Nested stacks are '
+                       'deleted by any engine through RPC as usual, but '
+                       'each engine bounds the number of deletes it has in '
+                       'progress against each backend service, and reports '
+                       'the progress of each stack delete in events.')),
+    cfg.IntOpt('max_concurrent_deletes_per_service',
+               min=1,
+               default=50,
+               help=_('Maximum number of resource deletes, across all '
+                      'stacks, that each engine has in progress at once '
+                      'against a single backend service when '
+                      'parallel_stack_delete is enabled. Nested stack '
+                      'deletes are bounded separately at each level of '
+                      'nesting.')),
+    cfg.IntOpt('poll_backoff_max_period',
+               min=1,
+               default=10,
+               help=_('Maximum period, in seconds, between successive checks '
+                      'of whether a resource action is complete. The period '
+                      'starts at one second and doubles while the status '
+                      'observed on each check is unchanged. This applies '
+                      'only to resources that report the status they '
+                      'observe; others are checked every second unless '
+                      'their type is listed in poll_backoff_max_periods. A '
+                      'value of 1 checks every second.')),
+    cfg.ListOpt('poll_backoff_max_periods',
+                default=[],
+                help=_('Maximum poll period, in seconds, for particular '
+                       'resource types, overriding poll_backoff_max_period. '
+                       'Listed types back off whether or not they report '
+                       'the status they observe. '
+                       'Each entry is a resource type name, which may '
+                       'contain wildcards, and a period separated by "=", '
+                       'e.g. OS::Trove::Instance=60,OS::Cinder::*=30. The '
+                       'first matching entry is used.')),
+    cfg.FloatOpt('poll_backoff_jitter',
+                 min=0.0,
+                 default=0.1,
+                 help=_('Maximum random jitter added to each poll period '
+                        'longer than one second, as a fraction of the period '
+                        'rounded up to whole seconds.')),
+    cfg.BoolOpt('query_accounting',
+                default=False,
+                help=_('Count the SQL statements issued by each engine '
+                       'operation, tag each statement with a comment naming '
+                       'the operation and resource, and log the totals and '
+                       'slowest statements when the operation ends.')),
+    cfg.IntOpt('query_accounting_slowest',
+               min=0,
+               default=3,
+               help=_('Number of the slowest SQL statements of each '
+                      'operation to log when query_accounting is '
+                      'enabled.')),
     cfg.IntOpt('engine_life_check_timeout',
                default=2,
                help=_('RPC timeout for the engine liveness check that is used'
@@ -225,6 +299,29 @@ engine_opts = [
                       'credentials. ZAQAR_SIGNAL will create a dedicated '
                       'zaqar queue to be signaled using the provided keystone '
                       'credentials.')),
+    cfg.FloatOpt('deployment_metadata_push_delay',
+                 default=1.0,
+                 min=0,
+                 help=_('Seconds to wait before pushing the software '
+                        'deployments metadata of a server to its metadata '
+                        'transport (POLL_TEMP_URL or ZAQAR_MESSAGE), so that '
+                        'changes to several deployments of the server are '
+                        'pushed together. Set to 0 to push every change '
+                        'immediately.')),
+    cfg.IntOpt('deployment_metadata_max_wait',
+               default=30,
+               min=0,
+               help=_('Maximum number of seconds a request for the software '
+                      'deployments metadata of a server may wait for the '
+                      'metadata to change.')),
+    cfg.IntOpt('deployment_metadata_max_waiters',
+               default=16,
+               min=0,
+               help=_('Maximum number of requests for the software '
+                      'deployments metadata of servers that may wait for the '
+                      'metadata to change at once, per engine. Each waiting '
+                      'request occupies an engine RPC worker; further '
+                      'requests are answered immediately.')),
     cfg.ListOpt('hidden_stack_tags',
                 default=['data-processing-cluster'],
                 help=_('Stacks containing these tag names will be hidden. '
@@ -292,7 +389,25 @@ default_clients_opts = [
     cfg.BoolOpt('insecure',
                 default=False,
                 help=_("If set, then the server's certificate will not "
-                       "be verified."))]
+                       "be verified.")),
+    cfg.FloatOpt('rate_limit',
+                 min=0,
+                 default=0,
+                 help=_('Maximum average rate, in resource actions per '
+                        'second, at which each engine starts actions against '
+                        'the service on behalf of each tenant. Set to 0 for '
+                        'no limit; OverLimit responses from the service are '
+                        'backed off from regardless.')),
+    cfg.IntOpt('rate_limit_burst',
+               min=1,
+               default=10,
+               help=_('Number of resource actions that may be started at '
+                      'once against the service before rate_limit applies.')),
+    cfg.DictOpt('tenant_rate_limits',
+                default={},
+                help=_('Rates, in resource actions per second, to use in '
+                       'place of rate_limit for particular tenants, as a '
+                       'dict of tenant IDs to rates.'))]
 
 # these options can be defined for each client
 # they must not specify defaults, since any options not defined in a client
@@ -311,7 +426,21 @@ clients_opts = [
                       'private key.')),
     cfg.BoolOpt('insecure',
                 help=_("If set, then the server's certificate will not "
-                       "be verified."))]
+                       "be verified.")),
+    cfg.FloatOpt('rate_limit',
+                 min=0,
+                 help=_('Maximum average rate, in resource actions per '
+                        'second, at which each engine starts actions against '
+                        'the service on behalf of each tenant. Set to 0 for '
+                        'no limit.')),
+    cfg.IntOpt('rate_limit_burst',
+               min=1,
+               help=_('Number of resource actions that may be started at '
+                      'once against the service before rate_limit applies.')),
+    cfg.DictOpt('tenant_rate_limits',
+                help=_('Rates, in resource actions per second, to use in '
+                       'place of rate_limit for particular tenants, as a '
+                       'dict of tenant IDs to rates.'))]
 
 heat_client_opts = [
     cfg.StrOpt('url',
@@ -340,6 +469,30 @@ revision_opts = [
                       'file and add it as another config option.'))]
 
 
+metrics_group = cfg.OptGroup('metrics')
+metrics_opts = [
+    cfg.StrOpt('sink',
+               default='null',
+               help=_('Name of the heat.metrics_sinks plugin to which '
+                      'engine counters and timings are sent, e.g. '
+                      '"statsd" or "file". The default "null" sink '
+                      'discards them.')),
+    cfg.StrOpt('prefix',
+               default='heat',
+               help=_('Prefix added to the name of each metric.')),
+    cfg.StrOpt('statsd_host',
+               default='localhost',
+               help=_('Host of the statsd server used by the statsd '
+                      'sink.')),
+    cfg.PortOpt('statsd_port',
+                default=8125,
+                help=_('UDP port of the statsd server used by the statsd '
+                       'sink.')),
+    cfg.StrOpt('file_path',
+               help=_('File to which the file sink appends one line of '
+                      'JSON per measurement.'))]
+
+
 def startup_sanity_check():
     if (not cfg.CONF.stack_user_domain_id and
             not cfg.CONF.stack_user_domain_name):
@@ -372,6 +525,7 @@ def list_opts():
     yield paste_deploy_group.name, paste_deploy_opts
     yield auth_password_group.name, auth_password_opts
     yield revision_group.name, revision_opts
+    yield metrics_group.name, metrics_opts
     yield profiler.list_opts()[0]
     yield 'clients', default_clients_opts
 
@@ -392,6 +546,7 @@ def list_opts():
 cfg.CONF.register_group(paste_deploy_group)
 cfg.CONF.register_group(auth_password_group)
 cfg.CONF.register_group(revision_group)
+cfg.CONF.register_group(metrics_group)
 profiler.set_defaults(cfg.CONF)
 
 for group, opts in list_opts():
@@ -30,6 +30,7 @@ from heat.common.i18n import _LE, _LW
 from heat.common import policy
 from heat.common import wsgi
 from heat.db import api as db_api
+from heat.db import query_stats
 from heat.engine import clients
 
 LOG = logging.getLogger(__name__)
@@ -367,7 +368,9 @@ def request_context(func):
     @six.wraps(func)
     def wrapped(self, ctx, *args, **kwargs):
         try:
-            return func(self, ctx, *args, **kwargs)
+            with query_stats.operation(func.__name__,
+                                       getattr(ctx, 'request_id', None)):
+                return func(self, ctx, *args, **kwargs)
         except exception.HeatException:
             raise oslo_messaging.rpc.dispatcher.ExpectedException()
     return wrapped
@@ -32,13 +32,25 @@ auth_opts = [
 
 cfg.CONF.register_opts(auth_opts)
 
+# Fernet ciphers, keyed by encryption key
+_fernet_ciphers = {}
+
+
+def _fernet(encryption_key=None):
+    encryption_key = get_valid_encryption_key(encryption_key, fix_length=True)
+    try:
+        return _fernet_ciphers[encryption_key]
+    except KeyError:
+        encoded_key = base64.b64encode(encryption_key.encode('utf-8'))
+        sym = fernet.Fernet(encoded_key)
+        _fernet_ciphers[encryption_key] = sym
+        return sym
+
 
 def encrypt(value, encryption_key=None):
     if value is None:
         return None, None
-    encryption_key = get_valid_encryption_key(encryption_key, fix_length=True)
-    encoded_key = base64.b64encode(encryption_key.encode('utf-8'))
-    sym = fernet.Fernet(encoded_key)
+    sym = _fernet(encryption_key)
     res = sym.encrypt(encodeutils.safe_encode(value))
     return 'cryptography_decrypt_v1', encodeutils.safe_decode(res)
 
@@ -52,6 +64,30 @@ def decrypt(method, data, encryption_key=None):
         return encodeutils.safe_decode(value, 'utf-8')
 
 
+def decrypt_many(encrypted, encryption_key=None):
+    """Decrypt a sequence of (method, data) pairs.
+
+    Returns a list of the decrypted values, in the same order. This is
+    equivalent to calling decrypt() for each pair, but looks up each
+    decryption method only once.
+    """
+    decryptors = {}
+    results = []
+    for method, data in encrypted:
+        if method is None or data is None:
+            results.append(None)
+            continue
+        decryptor = decryptors.get(method)
+        if decryptor is None:
+            decryptor = getattr(sys.modules[__name__], method)
+            decryptors[method] = decryptor
+        value = decryptor(data, encryption_key)
+        if value is not None:
+            value = encodeutils.safe_decode(value, 'utf-8')
+        results.append(value)
+    return results
+
+
 def oslo_decrypt_v1(value, encryption_key=None):
     encryption_key = get_valid_encryption_key(encryption_key)
     sym = utils.SymmetricCrypto()
@@ -60,9 +96,7 @@ def oslo_decrypt_v1(value, encryption_key=None):
 
 
 def cryptography_decrypt_v1(value, encryption_key=None):
-    encryption_key = get_valid_encryption_key(encryption_key, fix_length=True)
-    encoded_key = base64.b64encode(encryption_key.encode('utf-8'))
-    sym = fernet.Fernet(encoded_key)
+    sym = _fernet(encryption_key)
     return sym.decrypt(encodeutils.safe_encode(value))
 
 
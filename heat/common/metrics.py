@@ -0,0 +1,158 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Low-overhead counters and timings of engine operations.
+
+Measurements are passed to the sink named by the [metrics] sink option,
+which is loaded from the heat.metrics_sinks entry point namespace. The
+default null sink discards them, in which case timers do not even read the
+clock.
+"""
+
+import functools
+import json
+import socket
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from stevedore import driver
+
+from heat.common.i18n import _LW
+from heat.common import timeutils
+
+cfg.CONF.import_group('metrics', 'heat.common.config')
+
+LOG = logging.getLogger(__name__)
+
+_sink = None
+
+
+class NullSink(object):
+    """A sink that discards all measurements."""
+
+    def counter(self, name, value):
+        pass
+
+    def timing(self, name, milliseconds):
+        pass
+
+
+class StatsdSink(object):
+    """A sink that sends measurements to a statsd server over UDP."""
+
+    def __init__(self):
+        conf = cfg.CONF.metrics
+        self.address = (conf.statsd_host, conf.statsd_port)
+        self.prefix = conf.prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, name, value, metric_type):
+        if self.prefix:
+            name = '%s.%s' % (self.prefix, name)
+        data = '%s:%s|%s' % (name, value, metric_type)
+        try:
+            self._socket.sendto(data.encode('utf-8'), self.address)
+        except socket.error as ex:
+            LOG.debug('Failed to send metric %(name)s: %(ex)s',
+                      {'name': name, 'ex': ex})
+
+    def counter(self, name, value):
+        self._send(name, value, 'c')
+
+    def timing(self, name, milliseconds):
+        self._send(name, '%.3f' % milliseconds, 'ms')
+
+
+class FileSink(object):
+    """A sink that appends each measurement as a line of JSON to a file."""
+
+    def __init__(self):
+        conf = cfg.CONF.metrics
+        self.prefix = conf.prefix
+        self._file = open(conf.file_path, 'a')
+        self._lock = threading.Lock()
+
+    def _write(self, name, value, metric_type):
+        if self.prefix:
+            name = '%s.%s' % (self.prefix, name)
+        line = json.dumps({'time': timeutils.wallclock(), 'name': name,
+                           'type': metric_type, 'value': value})
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def counter(self, name, value):
+        self._write(name, value, 'counter')
+
+    def timing(self, name, milliseconds):
+        self._write(name, milliseconds, 'timing')
+
+
+def _get_sink():
+    global _sink
+    if _sink is None:
+        name = cfg.CONF.metrics.sink
+        if name == 'null':
+            _sink = NullSink()
+            return _sink
+        try:
+            _sink = driver.DriverManager('heat.metrics_sinks', name,
+                                         invoke_on_load=True).driver
+        except Exception as ex:
+            LOG.warning(_LW('Unable to load metrics sink "%(name)s", '
+                            'metrics are disabled: %(ex)s'),
+                        {'name': name, 'ex': ex})
+            _sink = NullSink()
+    return _sink
+
+
+def enabled():
+    """Return whether measurements are sent anywhere."""
+    return not isinstance(_get_sink(), NullSink)
+
+
+def incr(name, value=1):
+    """Add a value to a counter."""
+    _get_sink().counter(name, value)
+
+
+def timing(name, milliseconds):
+    """Record the duration of an operation in a histogram."""
+    _get_sink().timing(name, milliseconds)
+
+
+class timer(object):
+    """Time the enclosed block, or each call of the decorated function."""
+
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        if enabled():
+            self._start = timeutils.wallclock()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._start is not None:
+            timing(self.name, (timeutils.wallclock() - self._start) * 1000)
+            self._start = None
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(self.name):
+                return func(*args, **kwargs)
+
+        return wrapper
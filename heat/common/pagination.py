@@ -0,0 +1,70 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Opaque cursors for keyset pagination of list results.
+
+A cursor records the values of the sortable columns of the last row in a
+page, so that the next page can be fetched by seeking directly to that
+position rather than looking the marker row up again.
+"""
+
+import base64
+import datetime
+
+from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
+import six
+
+CURSOR_VERSION = 1
+_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.strftime(_TIME_FORMAT)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.datetime.strptime(value['dt'], _TIME_FORMAT)
+    return value
+
+
+def encode_cursor(values):
+    """Return an opaque marker for a row with the given column values."""
+    doc = jsonutils.dumps([CURSOR_VERSION,
+                           dict((k, _encode_value(v))
+                                for k, v in six.iteritems(values))])
+    cursor = base64.urlsafe_b64encode(doc.encode('utf-8'))
+    return cursor.decode('ascii').rstrip('=')
+
+
+def decode_cursor(marker):
+    """Return the column values recorded in a marker.
+
+    Returns None if the marker is not a cursor, e.g. because it is the ID
+    of a row as given out by earlier versions.
+    """
+    if not isinstance(marker, six.string_types) or (
+            uuidutils.is_uuid_like(marker)):
+        return None
+    padded = marker + '=' * (-len(marker) % 4)
+    try:
+        doc = base64.urlsafe_b64decode(padded.encode('ascii'))
+        version, values = jsonutils.loads(doc.decode('utf-8'))
+        if version != CURSOR_VERSION:
+            return None
+        return dict((k, _decode_value(v)) for k, v in six.iteritems(values))
+    except (AttributeError, TypeError, ValueError, KeyError, UnicodeError):
+        return None
@@ -21,6 +21,7 @@ import yaml
 
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common import metrics
 
 if hasattr(yaml, 'CSafeLoader'):
     yaml_loader = yaml.CSafeLoader
@@ -88,6 +89,7 @@ def validate_template_limit(contain_str):
         raise exception.RequestLimitExceeded(message=msg)
 
 
+@metrics.timer('template.parse')
 def parse(tmpl_str):
     """Takes a string and returns a dict containing the parsed structure.
 
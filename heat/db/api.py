@@ -26,12 +26,29 @@ supported backend.
 from oslo_config import cfg
 from oslo_db import api
 
+from heat.common import metrics
+
 CONF = cfg.CONF
 
 
 _BACKEND_MAPPING = {'sqlalchemy': 'heat.db.sqlalchemy.api'}
 
-IMPL = api.DBAPI.from_config(CONF, backend_mapping=_BACKEND_MAPPING)
+
+class _TimedAPI(object):
+    """Record the duration of each call to the database API in metrics."""
+
+    def __init__(self, impl):
+        self._impl = impl
+
+    def __getattr__(self, name):
+        attr = getattr(self._impl, name)
+        if not callable(attr) or not metrics.enabled():
+            return attr
+        return metrics.timer('db.%s' % name)(attr)
+
+
+IMPL = _TimedAPI(api.DBAPI.from_config(CONF,
+                                       backend_mapping=_BACKEND_MAPPING))
 
 
 def get_engine():
@@ -46,18 +63,24 @@ def raw_template_get(context, template_id):
     return IMPL.raw_template_get(context, template_id)
 
 
-def raw_template_create(context, values):
-    return IMPL.raw_template_create(context, values)
+def raw_template_create(context, values, file_contents=None):
+    return IMPL.raw_template_create(context, values,
+                                    file_contents=file_contents)
 
 
-def raw_template_update(context, template_id, values):
-    return IMPL.raw_template_update(context, template_id, values)
+def raw_template_update(context, template_id, values, file_contents=None):
+    return IMPL.raw_template_update(context, template_id, values,
+                                    file_contents=file_contents)
 
 
 def raw_template_delete(context, template_id):
     return IMPL.raw_template_delete(context, template_id)
 
 
+def raw_template_files_get(context, digests):
+    return IMPL.raw_template_files_get(context, digests)
+
+
 def resource_data_get_all(context, resource_id, data=None):
     return IMPL.resource_data_get_all(context, resource_id, data)
 
@@ -105,10 +128,26 @@ def resource_update(context, resource_id, values, atomic_key,
                                 expected_engine_id)
 
 
+def resource_metadata_get_all(context, resource_ids):
+    return IMPL.resource_metadata_get_all(context, resource_ids)
+
+
+def resource_metadata_update_all(context, values):
+    return IMPL.resource_metadata_update_all(context, values)
+
+
 def resource_create(context, values):
     return IMPL.resource_create(context, values)
 
 
+def resource_delete(context, resource_id):
+    return IMPL.resource_delete(context, resource_id)
+
+
+def resource_count_reconcile(context):
+    return IMPL.resource_count_reconcile(context)
+
+
 def resource_exchange_stacks(context, resource_id1, resource_id2):
     return IMPL.resource_exchange_stacks(context, resource_id1, resource_id2)
 
@@ -185,6 +224,10 @@ def stack_update(context, stack_id, values, exp_trvsl=None):
     return IMPL.stack_update(context, stack_id, values, exp_trvsl=exp_trvsl)
 
 
+def stack_clear_cached_outputs(context, stack_ids):
+    return IMPL.stack_clear_cached_outputs(context, stack_ids)
+
+
 def stack_delete(context, stack_id):
     return IMPL.stack_delete(context, stack_id)
 
@@ -205,6 +248,14 @@ def stack_lock_release(stack_id, engine_id):
     return IMPL.stack_lock_release(stack_id, engine_id)
 
 
+def engine_lease_acquire(name, engine_id, duration):
+    return IMPL.engine_lease_acquire(name, engine_id, duration)
+
+
+def engine_lease_release(name, engine_id):
+    return IMPL.engine_lease_release(name, engine_id)
+
+
 def persist_state_and_release_lock(context, stack_id, engine_id, values):
     return IMPL.persist_state_and_release_lock(context, stack_id,
                                                engine_id, values)
@@ -262,6 +313,11 @@ def event_count_all_by_stack(context, stack_id):
     return IMPL.event_count_all_by_stack(context, stack_id)
 
 
+def event_prune(context, max_events=None, max_age=None, batch_size=1000):
+    return IMPL.event_prune(context, max_events=max_events, max_age=max_age,
+                            batch_size=batch_size)
+
+
 def event_create(context, values):
     return IMPL.event_create(context, values)
 
@@ -0,0 +1,183 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Accounting of the SQL statements issued by each engine operation.
+
+When the query_accounting option is set, every statement executed while an
+operation is in progress is counted against it and tagged with a comment
+naming the operation and the resource being worked on, so that it can also
+be identified in the database's own logs. When the operation ends, the
+number of statements, their total duration and the slowest of them are
+logged and sent to the metrics sink.
+"""
+
+import contextlib
+import heapq
+import re
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+import sqlalchemy
+
+from heat.common.i18n import _LI
+from heat.common import metrics
+from heat.common import timeutils
+
+cfg.CONF.import_opt('query_accounting', 'heat.common.config')
+cfg.CONF.import_opt('query_accounting_slowest', 'heat.common.config')
+
+LOG = logging.getLogger(__name__)
+
+_local = threading.local()
+
+_UNSAFE_TAG_CHARS = re.compile(r'[^\w.:-]')
+
+
+def _tag(value):
+    return _UNSAFE_TAG_CHARS.sub('_', six.text_type(value))
+
+
+class QueryStats(object):
+    """The statements issued on behalf of a single operation."""
+
+    def __init__(self, operation, request_id=None):
+        self.operation = operation
+        self.request_id = request_id
+        self.resource = None
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+
+    def comment(self):
+        """Return the comment with which statements are tagged."""
+        tag = 'heat:%s' % _tag(self.operation)
+        if self.request_id is not None:
+            tag += ' %s' % _tag(self.request_id)
+        if self.resource is not None:
+            tag += ' resource:%s' % _tag(self.resource)
+        return '/* %s */' % tag
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        limit = cfg.CONF.query_accounting_slowest
+        if not limit:
+            return
+        entry = (duration, statement)
+        if len(self.slowest) < limit:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def report(self):
+        """Log and emit the totals for the operation."""
+        if not self.count:
+            return
+        LOG.info(_LI('%(operation)s issued %(count)d SQL statements in '
+                     '%(duration).3fs'),
+                 {'operation': self.operation, 'count': self.count,
+                  'duration': self.duration})
+        for duration, statement in sorted(self.slowest, reverse=True):
+            LOG.info(_LI('%(operation)s: %(duration).3fs: %(statement)s'),
+                     {'operation': self.operation, 'duration': duration,
+                      'statement': statement})
+        metrics.incr('db.statements.%s' % self.operation, self.count)
+        metrics.timing('db.statement_time.%s' % self.operation,
+                       self.duration * 1000)
+
+
+def current():
+    """Return the statistics of the operation in progress in this thread."""
+    return getattr(_local, 'stats', None)
+
+
+@contextlib.contextmanager
+def _accounting(stats):
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = None
+        stats.report()
+
+
+@contextlib.contextmanager
+def operation(name, request_id=None):
+    """Account the statements issued by the enclosed block to an operation.
+
+    Nothing is accounted unless query accounting is enabled. If an operation
+    is already in progress in this thread, the block is accounted to it.
+    """
+    stats = current()
+    if not cfg.CONF.query_accounting or stats is not None:
+        yield stats
+        return
+    with _accounting(QueryStats(name, request_id)) as stats:
+        yield stats
+
+
+@contextlib.contextmanager
+def inherit(parent):
+    """Account the statements of a thread to the operation that started it.
+
+    The thread's statements are reported separately when it finishes.
+    """
+    if parent is None or current() is not None:
+        yield current()
+        return
+    with _accounting(QueryStats(parent.operation,
+                                parent.request_id)) as stats:
+        yield stats
+
+
+@contextlib.contextmanager
+def resource(name):
+    """Tag the statements issued by the enclosed block with a resource."""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    previous, stats.resource = stats.resource, name
+    try:
+        yield
+    finally:
+        stats.resource = previous
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    stats = current()
+    if stats is not None and context is not None:
+        context.heat_query_start_time = timeutils.wallclock()
+        statement = '%s %s' % (statement, stats.comment())
+    return statement, parameters
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    stats = current()
+    start_time = getattr(context, 'heat_query_start_time', None)
+    if stats is not None and start_time is not None:
+        stats.record(statement, timeutils.wallclock() - start_time)
+
+
+def install(engine):
+    """Account for the statements executed on an engine."""
+    if not sqlalchemy.event.contains(engine, 'before_cursor_execute',
+                                     _before_cursor_execute):
+        sqlalchemy.event.listen(engine, 'before_cursor_execute',
+                                _before_cursor_execute, retval=True)
+        sqlalchemy.event.listen(engine, 'after_cursor_execute',
+                                _after_cursor_execute)
@@ -12,16 +12,23 @@
 #    under the License.
 
 """Implementation of SQLAlchemy backend."""
+import collections
 import datetime
+import functools
+from multiprocessing import pool as thread_pool
+import os
 import sys
+import time
 
 from oslo_config import cfg
 from oslo_db import api as oslo_db_api
+from oslo_db import exception as db_exception
 from oslo_db.sqlalchemy import session as db_session
 from oslo_db.sqlalchemy import utils
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import encodeutils
+from oslo_utils import strutils
 from oslo_utils import timeutils
 import osprofiler.sqlalchemy
 import six
@@ -36,6 +43,9 @@ from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LE
 from heat.common.i18n import _LI
+from heat.common.i18n import _LW
+from heat.common import pagination
+from heat.db import query_stats
 from heat.db.sqlalchemy import filters as db_filters
 from heat.db.sqlalchemy import migration
 from heat.db.sqlalchemy import models
@@ -46,6 +56,7 @@ from heat.rpc import api as rpc_api
 CONF = cfg.CONF
 CONF.import_opt('hidden_stack_tags', 'heat.common.config')
 CONF.import_opt('max_events_per_stack', 'heat.common.config')
+CONF.import_opt('query_accounting', 'heat.common.config')
 CONF.import_group('profiler', 'heat.common.config')
 
 _facade = None
@@ -63,6 +74,8 @@ def get_facade():
                 osprofiler.sqlalchemy.add_tracing(sqlalchemy,
                                                   _facade.get_engine(),
                                                   "db")
+        if CONF.query_accounting:
+            query_stats.install(_facade.get_engine())
 
     return _facade
 
@@ -105,7 +118,11 @@ def _session(context):
 
 
 def raw_template_get(context, template_id):
-    result = model_query(context, models.RawTemplate).get(template_id)
+    return _raw_template_get(_session(context), template_id)
+
+
+def _raw_template_get(session, template_id):
+    result = session.query(models.RawTemplate).get(template_id)
 
     if not result:
         raise exception.NotFound(_('raw template with id %s not found') %
@@ -113,28 +130,115 @@ def raw_template_get(context, template_id):
     return result
 
 
-def raw_template_create(context, values):
-    raw_template_ref = models.RawTemplate()
-    raw_template_ref.update(values)
-    raw_template_ref.save(_session(context))
+def _file_digests(files):
+    return set(six.itervalues(files or {}))
+
+
+def _raw_template_files_incref(session, digests, file_contents):
+    """Add a reference to each of the given template file digests.
+
+    Contents not already in the store are inserted from file_contents. The
+    stored rows are locked so that a concurrent release cannot delete them
+    before the new reference is counted.
+    """
+    if not digests:
+        return
+    stored = set(row.digest for row in session.query(
+        models.RawTemplateFiles.digest).filter(
+        models.RawTemplateFiles.digest.in_(digests)).with_for_update())
+    if stored:
+        session.query(models.RawTemplateFiles).filter(
+            models.RawTemplateFiles.digest.in_(stored)).update(
+            {'refcount': models.RawTemplateFiles.refcount + 1},
+            synchronize_session=False)
+    for file_digest in digests - stored:
+        if not file_contents or file_digest not in file_contents:
+            raise exception.NotFound(_('contents of template file %s not '
+                                       'found') % file_digest)
+        session.add(models.RawTemplateFiles(
+            digest=file_digest, contents=file_contents[file_digest],
+            refcount=1))
+    session.flush()
+
+
+def _raw_template_files_decref(session, digests):
+    """Drop a reference to each digest, deleting unreferenced contents."""
+    if not digests:
+        return
+    query = session.query(models.RawTemplateFiles).filter(
+        models.RawTemplateFiles.digest.in_(digests))
+    query.update({'refcount': models.RawTemplateFiles.refcount - 1},
+                 synchronize_session=False)
+    query.filter(models.RawTemplateFiles.refcount <= 0).delete(
+        synchronize_session=False)
+
+
+def _is_duplicate_entry(exc):
+    return isinstance(exc, db_exception.DBDuplicateEntry)
+
+
+@oslo_db_api.wrap_db_retry(max_retries=3, retry_on_deadlock=True,
+                           retry_interval=0.5, inc_retry_interval=True,
+                           exception_checker=_is_duplicate_entry)
+def raw_template_create(context, values, file_contents=None):
+    """Create a raw template referring to its files by digest.
+
+    :param values: the raw template columns; ``files`` maps each file name
+        to the digest of its contents.
+    :param file_contents: the contents of the files keyed by digest. Only
+        those not already in the store are required.
+    """
+    session = _session(context)
+    with session.begin(subtransactions=True):
+        _raw_template_files_incref(session, _file_digests(values.get('files')),
+                                   file_contents)
+        raw_template_ref = models.RawTemplate()
+        raw_template_ref.update(values)
+        raw_template_ref.save(session)
     return raw_template_ref
 
 
-def raw_template_update(context, template_id, values):
-    raw_template_ref = raw_template_get(context, template_id)
-    # get only the changed values
-    values = dict((k, v) for k, v in values.items()
-                  if getattr(raw_template_ref, k) != v)
+@oslo_db_api.wrap_db_retry(max_retries=3, retry_on_deadlock=True,
+                           retry_interval=0.5, inc_retry_interval=True,
+                           exception_checker=_is_duplicate_entry)
+def raw_template_update(context, template_id, values, file_contents=None):
+    session = _session(context)
+    with session.begin(subtransactions=True):
+        raw_template_ref = _raw_template_get(session, template_id)
+        # get only the changed values
+        values = dict((k, v) for k, v in values.items()
+                      if getattr(raw_template_ref, k) != v)
+
+        if 'files' in values:
+            old_digests = _file_digests(raw_template_ref.files)
+            new_digests = _file_digests(values['files'])
+            _raw_template_files_incref(session, new_digests - old_digests,
+                                       file_contents)
+            _raw_template_files_decref(session, old_digests - new_digests)
 
-    if values:
-        raw_template_ref.update_and_save(values)
+        if values:
+            raw_template_ref.update_and_save(values, session=session)
 
     return raw_template_ref
 
 
 def raw_template_delete(context, template_id):
-    raw_template = raw_template_get(context, template_id)
-    raw_template.delete()
+    session = _session(context)
+    with session.begin(subtransactions=True):
+        raw_template = _raw_template_get(session, template_id)
+        _raw_template_files_decref(session,
+                                   _file_digests(raw_template.files))
+        raw_template.delete(session)
+
+
+def raw_template_files_get(context, digests):
+    """Return a dict of the stored contents of the given digests."""
+    if not digests:
+        return {}
+    query = model_query(context, models.RawTemplateFiles.digest,
+                        models.RawTemplateFiles.contents).filter(
+        models.RawTemplateFiles.digest.in_(set(digests)))
+    return dict((row.digest, row.contents) for row in query)
 
 
 def resource_get(context, resource_id):
@@ -185,6 +289,8 @@ def resource_update(context, resource_id, values, atomic_key,
             values['atomic_key'] = 1
         else:
             values['atomic_key'] = atomic_key + 1
+        if 'rsrc_metadata' in values:
+            values['rsrc_metadata_version'] = models.next_metadata_version()
         rows_updated = session.query(models.Resource).filter_by(
             id=resource_id, engine_id=expected_engine_id,
             atomic_key=atomic_key).update(values)
@@ -192,6 +298,43 @@ def resource_update(context, resource_id, values, atomic_key,
         return bool(rows_updated)
 
 
+def resource_metadata_get_all(context, resource_ids):
+    """Return the metadata and atomic_key of each of the given resources.
+
+    :returns: a dict mapping resource IDs to (metadata, atomic_key) tuples
+    """
+    if not resource_ids:
+        return {}
+    results = model_query(
+        context, models.Resource.id, models.Resource.rsrc_metadata,
+        models.Resource.atomic_key).filter(
+            models.Resource.id.in_(resource_ids))
+    return dict((r.id, (r.rsrc_metadata, r.atomic_key)) for r in results)
+
+
+def resource_metadata_update_all(context, values):
+    """Update the metadata of several resources in a single transaction.
+
+    :param values: a dict mapping resource IDs to (metadata, atomic_key)
+                   tuples. A resource is only updated if its atomic_key still
+                   has the given value.
+    :returns: the IDs of the resources which were not updated
+    """
+    conflicts = []
+    session = _session(context)
+    with session.begin():
+        for resource_id, (metadata, atomic_key) in six.iteritems(values):
+            rows_updated = session.query(models.Resource).filter_by(
+                id=resource_id, atomic_key=atomic_key).update(
+                    {'rsrc_metadata': metadata,
+                     'rsrc_metadata_version': models.next_metadata_version(),
+                     'atomic_key': (atomic_key or 0) + 1},
+                    synchronize_session=False)
+            if not rows_updated:
+                conflicts.append(resource_id)
+    return conflicts
+
+
 def resource_data_get_all(context, resource_id, data=None):
     """Looks up resource_data by resource.id.
 
@@ -204,13 +347,11 @@ def resource_data_get_all(context, resource_id, data=None):
     if not data:
         raise exception.NotFound(_('no resource data found'))
 
-    ret = {}
-
-    for res in data:
-        if res.redact:
-            ret[res.key] = crypt.decrypt(res.decrypt_method, res.value)
-        else:
-            ret[res.key] = res.value
+    ret = dict((res.key, res.value) for res in data if not res.redact)
+    redacted = [res for res in data if res.redact]
+    decrypted = crypt.decrypt_many((res.decrypt_method, res.value)
+                                   for res in redacted)
+    ret.update(zip((res.key for res in redacted), decrypted))
     return ret
 
 
@@ -308,13 +449,52 @@ def resource_data_delete(resource, key):
     result.delete()
 
 
+def _resource_count_adjust(session, root_stack_id, delta):
+    """Add delta to the resource count of a root stack.
+
+    Must be called in the same transaction as the change to the resources.
+    The first resource of a root stack creates its counter from the actual
+    number of resources.
+    """
+    if not root_stack_id:
+        return
+    updated = session.query(models.ResourceCount).filter_by(
+        root_stack_id=root_stack_id).update(
+        {'total': models.ResourceCount.total + delta},
+        synchronize_session=False)
+    if not updated and delta > 0:
+        _resource_count_init(session, root_stack_id)
+
+
+def _resource_count_init(session, root_stack_id):
+    total = session.query(models.Resource).filter_by(
+        root_stack_id=root_stack_id).count()
+    session.add(models.ResourceCount(root_stack_id=root_stack_id,
+                                     total=total))
+    session.flush()
+
+
+@oslo_db_api.wrap_db_retry(max_retries=3, retry_on_deadlock=True,
+                           retry_interval=0.5, inc_retry_interval=True,
+                           exception_checker=_is_duplicate_entry)
 def resource_create(context, values):
-    resource_ref = models.Resource()
-    resource_ref.update(values)
-    resource_ref.save(_session(context))
+    session = _session(context)
+    with session.begin(subtransactions=True):
+        resource_ref = models.Resource()
+        resource_ref.update(values)
+        resource_ref.save(session)
+        _resource_count_adjust(session, resource_ref.root_stack_id, 1)
     return resource_ref
 
 
+def resource_delete(context, resource_id):
+    resource = resource_get(context, resource_id)
+    session = orm_session.Session.object_session(resource)
+    with session.begin(subtransactions=True):
+        session.delete(resource)
+        _resource_count_adjust(session, resource.root_stack_id, -1)
+
+
 def resource_get_all_by_stack(context, stack_id, key_id=False, filters=None):
     query = model_query(
         context, models.Resource
@@ -404,6 +584,44 @@ def _get_sort_keys(sort_keys, mapping):
     return [mapping[key] for key in sort_keys or [] if key in mapping]
 
 
+class _CursorMarker(object):
+    """Stands in for the marker row, using the values held in a cursor."""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def _cursor_marker(marker, sort_keys):
+    values = pagination.decode_cursor(marker)
+    if values is None:
+        return None
+    if not set(sort_keys).issubset(values):
+        raise exception.Invalid(reason=_('Invalid marker: %s') % marker)
+    return _CursorMarker(values)
+
+
+def _keyset_paginate_query(query, model, limit, sort_keys, model_marker,
+                           sort_dir):
+    if model_marker is not None:
+        # paginate_query() compares against the marker on every sort key in
+        # turn; also bounding the leading key lets the database seek
+        # straight to the marker through an index on the sort keys, rather
+        # than scanning all of the preceding rows.
+        column = getattr(model, sort_keys[0], None)
+        value = getattr(model_marker, sort_keys[0], None)
+        if column is not None and value is not None:
+            if sort_dir == 'desc':
+                query = query.filter(column <= value)
+            else:
+                query = query.filter(column >= value)
+    try:
+        return utils.paginate_query(query, model, limit, sort_keys,
+                                    model_marker, sort_dir)
+    except utils.InvalidSortKey as exc:
+        err_msg = encodeutils.exception_to_unicode(exc)
+        raise exception.Invalid(reason=err_msg)
+
+
 def _paginate_query(context, query, model, limit=None, sort_keys=None,
                     marker=None, sort_dir=None):
     default_sort_keys = ['created_at']
@@ -418,14 +636,11 @@ def _paginate_query(context, query, model, limit=None, sort_keys=None,
 
     model_marker = None
     if marker:
-        model_marker = model_query(context, model).get(marker)
-    try:
-        query = utils.paginate_query(query, model, limit, sort_keys,
-                                     model_marker, sort_dir)
-    except utils.InvalidSortKey as exc:
-        err_msg = encodeutils.exception_to_unicode(exc)
-        raise exception.Invalid(reason=err_msg)
-    return query
+        model_marker = _cursor_marker(marker, sort_keys)
+        if model_marker is None:
+            model_marker = model_query(context, model).get(marker)
+    return _keyset_paginate_query(query, model, limit, sort_keys,
+                                  model_marker, sort_dir)
 
 
 def _query_stack_get_all(context, tenant_safe=True, show_deleted=False,
@@ -559,6 +774,25 @@ def stack_update(context, stack_id, values, exp_trvsl=None):
     return (rows_updated is not None and rows_updated > 0)
 
 
+def stack_clear_cached_outputs(context, stack_ids):
+    """Discard the cached outputs of those of the given stacks with any.
+
+    Stacks without cached outputs are not written to, and the update time of
+    the stacks is left unchanged.
+    """
+    session = _session(context)
+    with session.begin():
+        rows_updated = (session.query(models.Stack)
+                        .filter(models.Stack.id.in_(stack_ids))
+                        .filter(sqlalchemy.type_coerce(
+                            models.Stack.cached_outputs,
+                            sqlalchemy.Text) != 'null')
+                        .update({'cached_outputs': None,
+                                 'updated_at': models.Stack.updated_at},
+                                synchronize_session=False))
+    return rows_updated
+
+
 def stack_delete(context, stack_id):
     s = stack_get(context, stack_id)
     if not s:
@@ -568,8 +802,12 @@ def stack_delete(context, stack_id):
                                      'msg': 'that does not exist'})
     session = orm_session.Session.object_session(s)
     with session.begin():
+        deleted = collections.Counter()
         for r in s.resources:
             session.delete(r)
+            deleted[r.root_stack_id] += 1
+        for root_stack_id, count in six.iteritems(deleted):
+            _resource_count_adjust(session, root_stack_id, -count)
         s.soft_delete(session=session)
 
 
@@ -630,6 +868,44 @@ def stack_lock_release(stack_id, engine_id):
         return True
 
 
+def engine_lease_acquire(name, engine_id, duration):
+    """Take or renew the named lease on behalf of an engine.
+
+    Returns True if engine_id holds the lease for the next `duration`
+    seconds, or False if another engine holds a lease that has not expired.
+    """
+    now = timeutils.utcnow()
+    expires_at = now + datetime.timedelta(seconds=duration)
+    session = get_session()
+    with session.begin():
+        rows_affected = session.query(
+            models.EngineLease
+        ).filter(
+            models.EngineLease.name == name
+        ).filter(
+            sqlalchemy.or_(models.EngineLease.engine_id == engine_id,
+                           models.EngineLease.expires_at < now)
+        ).update({'engine_id': engine_id, 'expires_at': expires_at},
+                 synchronize_session=False)
+    if rows_affected:
+        return True
+    try:
+        with session.begin():
+            session.add(models.EngineLease(name=name, engine_id=engine_id,
+                                           expires_at=expires_at))
+    except db_exception.DBDuplicateEntry:
+        return False
+    return True
+
+
+def engine_lease_release(name, engine_id):
+    session = get_session()
+    with session.begin():
+        session.query(
+            models.EngineLease
+        ).filter_by(name=name, engine_id=engine_id).delete()
+
+
 def stack_get_root_id(context, stack_id):
     s = stack_get(context, stack_id)
     if not s:
@@ -641,12 +917,57 @@ def stack_get_root_id(context, stack_id):
 
 def stack_count_total_resources(context, stack_id):
     # count all resources which belong to the root stack
+    counter = model_query(context, models.ResourceCount).get(stack_id)
+    if counter is not None:
+        return counter.total
     results = model_query(
         context, models.Resource
     ).filter(models.Resource.root_stack_id == stack_id).count()
     return results
 
 
+def resource_count_reconcile(context):
+    """Correct the resource counts of root stacks that have drifted.
+
+    Returns the number of root stacks whose count was corrected.
+    """
+    session = _session(context)
+    actual = dict(session.query(
+        models.Resource.root_stack_id,
+        func.count(models.Resource.id)).filter(
+        models.Resource.root_stack_id.isnot(None)).group_by(
+        models.Resource.root_stack_id))
+    stored = dict(session.query(models.ResourceCount.root_stack_id,
+                                models.ResourceCount.total))
+
+    drifted = [root_stack_id
+               for root_stack_id in set(actual) | set(stored)
+               if actual.get(root_stack_id, 0) != stored.get(root_stack_id)]
+    for root_stack_id in drifted:
+        counter = session.query(models.ResourceCount).filter_by(
+            root_stack_id=root_stack_id)
+        try:
+            with session.begin(subtransactions=True):
+                if not actual.get(root_stack_id):
+                    # Without a counter the total is counted from the
+                    # resources themselves
+                    counter.delete(synchronize_session=False)
+                    continue
+                # Recount in the same statement, so that resources created
+                # or deleted since the counts above are not lost.
+                recount = sqlalchemy.select(
+                    [func.count(models.Resource.id)]).where(
+                    models.Resource.root_stack_id == root_stack_id
+                ).as_scalar()
+                if not counter.update({'total': recount},
+                                      synchronize_session=False):
+                    _resource_count_init(session, root_stack_id)
+        except db_exception.DBDuplicateEntry:
+            # A resource created meanwhile has initialised the counter
+            pass
+    return len(drifted)
+
+
 def user_creds_create(context):
     values = context.to_dict()
     user_creds_ref = models.UserCreds()
@@ -688,10 +1009,9 @@ def user_creds_get(user_creds_id):
     # or it can be committed back to the DB in decrypted form
     result = dict(db_result)
     del result['decrypt_method']
-    result['password'] = crypt.decrypt(
-        db_result.decrypt_method, result['password'])
-    result['trust_id'] = crypt.decrypt(
-        db_result.decrypt_method, result['trust_id'])
+    result['password'], result['trust_id'] = crypt.decrypt_many(
+        [(db_result.decrypt_method, result['password']),
+         (db_result.decrypt_method, result['trust_id'])])
     return result
 
 
@@ -759,18 +1079,14 @@ def _events_paginate_query(context, query, model, limit=None, sort_keys=None,
 
     model_marker = None
     if marker:
+        model_marker = _cursor_marker(marker, sort_keys)
+    if marker and model_marker is None:
         # not to use model_query(context, model).get(marker), because
         # user can only see the ID(column 'uuid') and the ID as the marker
         model_marker = model_query(
             context, model).filter_by(uuid=marker).first()
-    try:
-        query = utils.paginate_query(query, model, limit, sort_keys,
-                                     model_marker, sort_dir)
-    except utils.InvalidSortKey as exc:
-        err_msg = encodeutils.exception_to_unicode(exc)
-        raise exception.Invalid(reason=err_msg)
-
-    return query
+    return _keyset_paginate_query(query, model, limit, sort_keys,
+                                  model_marker, sort_dir)
 
 
 def _events_filter_and_page_query(context, query,
@@ -795,28 +1111,68 @@ def event_count_all_by_stack(context, stack_id):
     return query.filter_by(stack_id=stack_id).scalar()
 
 
-def _delete_event_rows(context, stack_id, limit):
-    # MySQL does not support LIMIT in subqueries,
-    # sqlite does not support JOIN in DELETE.
-    # So we must manually supply the IN() values.
-    # pgsql SHOULD work with the pure DELETE/JOIN below but that must be
-    # confirmed via integration tests.
-    query = _query_all_by_stack(context, stack_id)
+def _delete_events_upto(context, criteria, upper_id, batch_size):
+    # Walk the primary key in keyset-bounded ranges so that each DELETE
+    # touches at most batch_size rows and no event IDs are loaded into
+    # Python. Each range is deleted in its own transaction.
+    session = _session(context)
+    deleted = 0
+    marker = None
+    while True:
+        query = session.query(models.Event.id).filter(
+            models.Event.id <= upper_id, *criteria)
+        if marker is not None:
+            query = query.filter(models.Event.id > marker)
+        bound = query.order_by(models.Event.id).offset(
+            batch_size - 1).limit(1).scalar()
+        if bound is None:
+            bound = upper_id
+        with session.begin(subtransactions=True):
+            query = session.query(models.Event).filter(
+                models.Event.id <= bound, *criteria)
+            if marker is not None:
+                query = query.filter(models.Event.id > marker)
+            deleted += query.delete(synchronize_session=False)
+        if bound >= upper_id:
+            return deleted
+        marker = bound
+
+
+def event_prune(context, max_events=None, max_age=None, batch_size=1000):
+    """Delete events exceeding the retention limits of every stack.
+
+    Events older than max_age (a timedelta) are deleted, and then the
+    oldest events of each stack holding more than max_events are deleted.
+    Returns the number of events deleted.
+    """
     session = _session(context)
-    ids = [r.id for r in query.order_by(
-        models.Event.id).limit(limit).all()]
-    q = session.query(models.Event).filter(
-        models.Event.id.in_(ids))
-    return q.delete(synchronize_session='fetch')
+    deleted = 0
+    if max_age:
+        cutoff = timeutils.utcnow() - max_age
+        upper_id = session.query(func.max(models.Event.id)).scalar()
+        if upper_id is not None:
+            deleted += _delete_events_upto(
+                context, [models.Event.created_at < cutoff],
+                upper_id, batch_size)
+    if max_events:
+        over_limit = session.query(
+            models.Event.stack_id
+        ).group_by(
+            models.Event.stack_id
+        ).having(func.count(models.Event.id) > max_events).all()
+        for (stack_id,) in over_limit:
+            # The newest event that falls outside the retained window
+            upper_id = session.query(models.Event.id).filter_by(
+                stack_id=stack_id).order_by(models.Event.id.desc()).offset(
+                max_events).limit(1).scalar()
+            if upper_id is not None:
+                deleted += _delete_events_upto(
+                    context, [models.Event.stack_id == stack_id],
+                    upper_id, batch_size)
+    return deleted
 
 
 def event_create(context, values):
-    if 'stack_id' in values and cfg.CONF.max_events_per_stack:
-        if ((event_count_all_by_stack(context, values['stack_id']) >=
-             cfg.CONF.max_events_per_stack)):
-            # prune
-            _delete_event_rows(
-                context, values['stack_id'], cfg.CONF.event_purge_batch_size)
     event_ref = models.Event()
     event_ref.update(values)
     event_ref.save(_session(context))
@@ -1076,7 +1432,16 @@ def service_get_all_by_args(context, host, binary, hostname):
             filter_by(hostname=hostname).all())
 
 
-def purge_deleted(age, granularity='days'):
+def purge_deleted(age, granularity='days', batch_size=None, batch_sleep=0):
+    """Remove stacks, and their data, soft-deleted before a given age.
+
+    :param age: how long to preserve deleted stacks
+    :param granularity: unit of the age, in days, hours, minutes or seconds
+    :param batch_size: if set, purge at most this many stacks, oldest
+                       first, per transaction and log the number of rows
+                       deleted from each table after each batch
+    :param batch_sleep: seconds to sleep between batches
+    """
     try:
         age = int(age)
     except ValueError:
@@ -1088,6 +1453,9 @@ def purge_deleted(age, granularity='days'):
         raise exception.Error(
             _("granularity should be days, hours, minutes, or seconds"))
 
+    if batch_size is not None and batch_size < 1:
+        raise exception.Error(_("batch size should be a positive integer"))
+
     if granularity == 'days':
         age = age * 86400
     elif granularity == 'hours':
@@ -1100,85 +1468,161 @@ def purge_deleted(age, granularity='days'):
     meta = sqlalchemy.MetaData()
     meta.bind = engine
 
-    stack = sqlalchemy.Table('stack', meta, autoload=True)
-    stack_lock = sqlalchemy.Table('stack_lock', meta, autoload=True)
-    stack_tag = sqlalchemy.Table('stack_tag', meta, autoload=True)
-    resource = sqlalchemy.Table('resource', meta, autoload=True)
-    resource_data = sqlalchemy.Table('resource_data', meta, autoload=True)
-    event = sqlalchemy.Table('event', meta, autoload=True)
-    raw_template = sqlalchemy.Table('raw_template', meta, autoload=True)
-    user_creds = sqlalchemy.Table('user_creds', meta, autoload=True)
-    service = sqlalchemy.Table('service', meta, autoload=True)
-    syncpoint = sqlalchemy.Table('sync_point', meta, autoload=True)
+    tables = dict((name, sqlalchemy.Table(name, meta, autoload=True))
+                  for name in ('stack', 'stack_lock', 'stack_tag',
+                               'resource', 'resource_data', 'event',
+                               'raw_template', 'raw_template_files',
+                               'resource_count', 'user_creds', 'service',
+                               'sync_point'))
+    stack = tables['stack']
+    service = tables['service']
 
     # find the soft-deleted stacks that are past their expiry
     stack_where = sqlalchemy.select([stack.c.id, stack.c.raw_template_id,
                                      stack.c.prev_raw_template_id,
                                      stack.c.user_creds_id]).where(
                                          stack.c.deleted_at < time_line)
-    stacks = list(engine.execute(stack_where))
-    if stacks:
-        stack_ids = [i[0] for i in stacks]
-        # delete stack locks (just in case some got stuck)
-        stack_lock_del = stack_lock.delete().where(
-            stack_lock.c.stack_id.in_(stack_ids))
-        engine.execute(stack_lock_del)
-        # delete stack tags
-        stack_tag_del = stack_tag.delete().where(
-            stack_tag.c.stack_id.in_(stack_ids))
-        engine.execute(stack_tag_del)
-        # delete resource_data
-        res_where = sqlalchemy.select([resource.c.id]).where(
-            resource.c.stack_id.in_(stack_ids))
-        res_data_del = resource_data.delete().where(
-            resource_data.c.resource_id.in_(res_where))
-        engine.execute(res_data_del)
-        # delete resources
-        res_del = resource.delete().where(resource.c.stack_id.in_(stack_ids))
-        engine.execute(res_del)
-        # delete events
-        event_del = event.delete().where(event.c.stack_id.in_(stack_ids))
-        engine.execute(event_del)
-        # clean up any sync_points that may have lingered
-        sync_del = syncpoint.delete().where(
-            syncpoint.c.stack_id.in_(stack_ids))
-        engine.execute(sync_del)
-        # delete the stacks
-        stack_del = stack.delete().where(stack.c.id.in_(stack_ids))
-        engine.execute(stack_del)
-        # delete orphaned raw templates
-        raw_template_ids = [i[1] for i in stacks if i[1] is not None]
-        raw_template_ids.extend(i[2] for i in stacks if i[2] is not None)
-        if raw_template_ids:
-            # keep those still referenced
-            raw_tmpl_sel = sqlalchemy.select([stack.c.raw_template_id]).where(
-                stack.c.raw_template_id.in_(raw_template_ids))
-            raw_tmpl = [i[0] for i in engine.execute(raw_tmpl_sel)]
-            raw_template_ids = set(raw_template_ids) - set(raw_tmpl)
-            raw_tmpl_sel = sqlalchemy.select(
-                [stack.c.prev_raw_template_id]).where(
-                stack.c.prev_raw_template_id.in_(raw_template_ids))
-            raw_tmpl = [i[0] for i in engine.execute(raw_tmpl_sel)]
-            raw_template_ids = raw_template_ids - set(raw_tmpl)
-            raw_templ_del = raw_template.delete().where(
-                raw_template.c.id.in_(raw_template_ids))
-            engine.execute(raw_templ_del)
-        # purge any user creds that are no longer referenced
-        user_creds_ids = [i[3] for i in stacks if i[3] is not None]
-        if user_creds_ids:
-            # keep those still referenced
-            user_sel = sqlalchemy.select([stack.c.user_creds_id]).where(
-                stack.c.user_creds_id.in_(user_creds_ids))
-            users = [i[0] for i in engine.execute(user_sel)]
-            user_creds_ids = set(user_creds_ids) - set(users)
-            usr_creds_del = user_creds.delete().where(
-                user_creds.c.id.in_(user_creds_ids))
-            engine.execute(usr_creds_del)
+    if batch_size is None:
+        stacks = list(engine.execute(stack_where))
+        if stacks:
+            _purge_stacks(engine, tables, stacks)
+    else:
+        stack_where = stack_where.order_by(stack.c.deleted_at,
+                                           stack.c.id).limit(batch_size)
+        batch = 0
+        while True:
+            with engine.begin() as conn:
+                stacks = list(conn.execute(stack_where))
+                if not stacks:
+                    break
+                counts = _purge_stacks(conn, tables, stacks)
+            batch += 1
+            LOG.info(_LI("Purged batch %(batch)d: %(counts)s"),
+                     {'batch': batch,
+                      'counts': ', '.join('%s=%d' % c
+                                          for c in sorted(counts.items()))})
+            if len(stacks) < batch_size:
+                break
+            if batch_sleep:
+                time.sleep(batch_sleep)
+
     # Purge deleted services
     srvc_del = service.delete().where(service.c.deleted_at < time_line)
     engine.execute(srvc_del)
 
 
+def _release_raw_template_files(conn, tables, raw_template_ids, counts):
+    """Drop the file references held by raw templates about to be purged."""
+    raw_template = tables['raw_template']
+    raw_template_files = tables['raw_template_files']
+
+    references = collections.Counter()
+    files_sel = sqlalchemy.select([raw_template.c.files]).where(
+        raw_template.c.id.in_(raw_template_ids))
+    for (files,) in conn.execute(files_sel):
+        references.update(_file_digests(jsonutils.loads(files)
+                                        if files else None))
+    if not references:
+        return
+
+    by_count = collections.defaultdict(list)
+    for file_digest, count in six.iteritems(references):
+        by_count[count].append(file_digest)
+    for count, digests in six.iteritems(by_count):
+        conn.execute(raw_template_files.update().where(
+            raw_template_files.c.digest.in_(digests)).values(
+            refcount=raw_template_files.c.refcount - count))
+    counts[raw_template_files.name] = conn.execute(
+        raw_template_files.delete().where(sqlalchemy.and_(
+            raw_template_files.c.digest.in_(list(references)),
+            raw_template_files.c.refcount <= 0))).rowcount
+
+
+def _purge_stacks(conn, tables, stacks):
+    """Delete the given stacks and the data that refers to them.
+
+    Returns a dict of the number of rows deleted from each table.
+    """
+    stack = tables['stack']
+    stack_lock = tables['stack_lock']
+    stack_tag = tables['stack_tag']
+    resource = tables['resource']
+    resource_data = tables['resource_data']
+    resource_count = tables['resource_count']
+    event = tables['event']
+    raw_template = tables['raw_template']
+    user_creds = tables['user_creds']
+    syncpoint = tables['sync_point']
+    counts = {}
+
+    def delete(table, statement):
+        counts[table.name] = conn.execute(statement).rowcount
+
+    stack_ids = [i[0] for i in stacks]
+    # delete stack locks (just in case some got stuck)
+    delete(stack_lock, stack_lock.delete().where(
+        stack_lock.c.stack_id.in_(stack_ids)))
+    # delete stack tags
+    delete(stack_tag, stack_tag.delete().where(
+        stack_tag.c.stack_id.in_(stack_ids)))
+    # delete resource_data
+    res_where = sqlalchemy.select([resource.c.id]).where(
+        resource.c.stack_id.in_(stack_ids))
+    delete(resource_data, resource_data.delete().where(
+        resource_data.c.resource_id.in_(res_where)))
+    # delete resources, keeping the resource counts of their roots
+    root_counts = conn.execute(sqlalchemy.select(
+        [resource.c.root_stack_id, func.count(resource.c.id)]).where(
+        resource.c.stack_id.in_(stack_ids)).group_by(
+        resource.c.root_stack_id)).fetchall()
+    delete(resource, resource.delete().where(
+        resource.c.stack_id.in_(stack_ids)))
+    for root_stack_id, count in root_counts:
+        if root_stack_id is not None:
+            conn.execute(resource_count.update().where(
+                resource_count.c.root_stack_id == root_stack_id).values(
+                total=resource_count.c.total - count))
+    delete(resource_count, resource_count.delete().where(
+        resource_count.c.root_stack_id.in_(stack_ids)))
+    # delete events
+    delete(event, event.delete().where(event.c.stack_id.in_(stack_ids)))
+    # clean up any sync_points that may have lingered
+    delete(syncpoint, syncpoint.delete().where(
+        syncpoint.c.stack_id.in_(stack_ids)))
+    # delete the stacks
+    delete(stack, stack.delete().where(stack.c.id.in_(stack_ids)))
+    # delete orphaned raw templates
+    raw_template_ids = [i[1] for i in stacks if i[1] is not None]
+    raw_template_ids.extend(i[2] for i in stacks if i[2] is not None)
+    if raw_template_ids:
+        # keep those still referenced
+        raw_tmpl_sel = sqlalchemy.select([stack.c.raw_template_id]).where(
+            stack.c.raw_template_id.in_(raw_template_ids))
+        raw_tmpl = [i[0] for i in conn.execute(raw_tmpl_sel)]
+        raw_template_ids = set(raw_template_ids) - set(raw_tmpl)
+        raw_tmpl_sel = sqlalchemy.select(
+            [stack.c.prev_raw_template_id]).where(
+            stack.c.prev_raw_template_id.in_(raw_template_ids))
+        raw_tmpl = [i[0] for i in conn.execute(raw_tmpl_sel)]
+        raw_template_ids = raw_template_ids - set(raw_tmpl)
+        if raw_template_ids:
+            _release_raw_template_files(conn, tables, raw_template_ids,
+                                        counts)
+        delete(raw_template, raw_template.delete().where(
+            raw_template.c.id.in_(raw_template_ids)))
+    # purge any user creds that are no longer referenced
+    user_creds_ids = [i[3] for i in stacks if i[3] is not None]
+    if user_creds_ids:
+        # keep those still referenced
+        user_sel = sqlalchemy.select([stack.c.user_creds_id]).where(
+            stack.c.user_creds_id.in_(user_creds_ids))
+        users = [i[0] for i in conn.execute(user_sel)]
+        user_creds_ids = set(user_creds_ids) - set(users)
+        delete(user_creds, user_creds.delete().where(
+            user_creds.c.id.in_(user_creds_ids)))
+    return counts
+
+
 def sync_point_delete_all_by_stack_and_traversal(context, stack_id,
                                                  traversal_id):
     rows_deleted = model_query(context, models.SyncPoint).filter_by(
@@ -1229,8 +1673,255 @@ def db_version(engine):
     return migration.db_version(engine)
 
 
+def _hidden_param_names(template):
+    """Return the names of the hidden parameters of a template.
+
+    The parameter schema is read directly from the template data, so that
+    the template does not need to be loaded.
+    """
+    if 'heat_template_version' in template:
+        schemata = template.get('parameters') or {}
+        return set(name for name, schema in schemata.items()
+                   if strutils.bool_from_string(schema.get('hidden', False),
+                                                strict=True))
+
+    schemata = template.get('Parameters') or {}
+    return set(name for name, schema in schemata.items()
+               if str(schema.get('NoEcho', 'false')).lower() == 'true')
+
+
+def _encrypt_raw_template(raw_template, encryption_key):
+    env = raw_template.environment
+    if env is None or not env.get('parameters'):
+        return None
+    hidden_params = _hidden_param_names(raw_template.template)
+    if not hidden_params:
+        return None
+
+    encrypted_params = list(env.get('encrypted_param_names', []))
+    parameters = dict(env['parameters'])
+    for param_name, param_val in parameters.items():
+        if (param_name in encrypted_params or
+                param_name not in hidden_params):
+            continue
+        encrypted_val = crypt.encrypt(six.text_type(param_val),
+                                      encryption_key)
+        parameters[param_name] = encrypted_val
+        encrypted_params.append(param_name)
+
+    if not encrypted_params:
+        return None
+    environment = env.copy()
+    environment['parameters'] = parameters
+    environment['encrypted_param_names'] = encrypted_params
+    return {'environment': environment}
+
+
+def _decrypt_raw_template(raw_template, encryption_key):
+    env = raw_template.environment
+    parameters = dict(env['parameters'])
+    encrypted_params = env['encrypted_param_names']
+    decrypted = crypt.decrypt_many((parameters[param_name]
+                                    for param_name in encrypted_params),
+                                   encryption_key)
+    parameters.update(zip(encrypted_params, decrypted))
+
+    environment = env.copy()
+    environment['parameters'] = parameters
+    environment['encrypted_param_names'] = []
+    return {'environment': environment}
+
+
+def _encrypt_resource(resource, encryption_key):
+    if not resource.properties_data:
+        return None
+    result = {}
+    for prop_name, prop_value in resource.properties_data.items():
+        prop_string = jsonutils.dumps(prop_value)
+        result[prop_name] = crypt.encrypt(prop_string, encryption_key)
+    return {'properties_data': result,
+            'properties_data_encrypted': True}
+
+
+def _decrypt_resource(resource, encryption_key):
+    prop_names = list(resource.properties_data)
+    decrypted = crypt.decrypt_many((resource.properties_data[prop_name]
+                                    for prop_name in prop_names),
+                                   encryption_key)
+    result = dict((prop_name, jsonutils.loads(value))
+                  for prop_name, value in zip(prop_names, decrypted))
+    return {'properties_data': result,
+            'properties_data_encrypted': False}
+
+
+# The steps of each crypt operation, in order: the name of the step (also
+# used in log messages and checkpoints), the model, the filters selecting
+# the rows to process, the function returning the updated values of a row
+# and the error message logged when it fails.
+_CRYPT_STEPS = {
+    'encrypt': (
+        ('raw_template', models.RawTemplate, (), _encrypt_raw_template,
+         _LE('Failed to encrypt parameters of raw template %(id)d')),
+        ('resource', models.Resource,
+         (~models.Resource.properties_data.is_(None),
+          ~models.Resource.properties_data_encrypted.is_(True)),
+         _encrypt_resource,
+         _LE('Failed to encrypt properties_data of resource %(id)d')),
+    ),
+    'decrypt': (
+        ('raw_template', models.RawTemplate, (), _decrypt_raw_template,
+         _LE('Failed to decrypt parameters of raw template %(id)d')),
+        ('resource', models.Resource,
+         (~models.Resource.properties_data.is_(None),
+          models.Resource.properties_data_encrypted.is_(True)),
+         _decrypt_resource,
+         _LE('Failed to decrypt properties_data of resource %(id)d')),
+    ),
+}
+
+
+def _crypt_row(step, row, encryption_key, verbose, update):
+    name, crypt_values, err_msg = step[0], step[3], step[4]
+    try:
+        if verbose:
+            LOG.info(_LI("Processing %(name)s %(id)d..."),
+                     {'name': name, 'id': row.id})
+        values = crypt_values(row, encryption_key)
+        if values and not update(row, values):
+            # The row is locked by an engine acting on it, or has changed
+            LOG.warning(_LW('%(name)s %(id)d is in use by an engine and was '
+                            'not processed; run the command again once it '
+                            'is no longer in use'),
+                        {'name': name, 'id': row.id})
+            return exception.UpdateInProgress(six.text_type(row.id))
+    except Exception as exc:
+        LOG.exception(err_msg, {'id': row.id})
+        return exc
+    finally:
+        if verbose:
+            LOG.info(_LI("Finished processing %(name)s %(id)d."),
+                     {'name': name, 'id': row.id})
+
+
+def _db_crypt_parameters_and_properties(ctxt, operation, encryption_key,
+                                        batch_size, verbose):
+    def update(row, values):
+        if isinstance(row, models.Resource):
+            return resource_update(ctxt, row.id, values, row.atomic_key)
+        raw_template_update(ctxt, row.id, values)
+        return True
+
+    session = get_session()
+    excs = []
+    with session.begin():
+        for step in _CRYPT_STEPS[operation]:
+            name, model, filters = step[:3]
+            query = session.query(model).filter(*filters)
+            for row in _get_batch(session=session, ctxt=ctxt, query=query,
+                                  model=model, batch_size=batch_size):
+                exc = _crypt_row(step, row, encryption_key, verbose, update)
+                if exc is not None:
+                    excs.append(exc)
+    return excs
+
+
+def _load_crypt_checkpoint(checkpoint, operation):
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return {}
+    with open(checkpoint) as f:
+        progress = jsonutils.load(f)
+    if progress.get('operation') != operation:
+        LOG.warning(_LW('Ignoring checkpoint %(file)s of a different '
+                        'operation (%(op)s)'),
+                    {'file': checkpoint, 'op': progress.get('operation')})
+        return {}
+    LOG.info(_LI('Resuming %(op)s from checkpoint %(file)s'),
+             {'op': operation, 'file': checkpoint})
+    return progress.get('markers', {})
+
+
+def _save_crypt_checkpoint(checkpoint, operation, markers):
+    if checkpoint is None:
+        return
+    tmp_file = checkpoint + '.tmp'
+    with open(tmp_file, 'w') as f:
+        jsonutils.dump({'operation': operation, 'markers': markers}, f)
+    os.rename(tmp_file, checkpoint)
+
+
+def _crypt_batch(step, encryption_key, verbose, ids):
+    """Process the rows with the given ids in a single transaction."""
+    model = step[1]
+
+    def update(row, values):
+        if isinstance(row, models.Resource):
+            atomic_key = row.atomic_key
+            values['atomic_key'] = 1 if atomic_key is None else atomic_key + 1
+            return bool(session.query(models.Resource).filter_by(
+                id=row.id, engine_id=None,
+                atomic_key=atomic_key).update(values))
+        row.update(values)
+        return True
+
+    session = get_session()
+    excs = []
+    with session.begin():
+        rows = session.query(model).filter(
+            model.id.in_(ids)).order_by(model.id)
+        for row in rows:
+            exc = _crypt_row(step, row, encryption_key, verbose, update)
+            if exc is not None:
+                excs.append(exc)
+    return excs
+
+
+def _db_crypt_streaming(ctxt, operation, encryption_key, batch_size,
+                        verbose, workers, checkpoint):
+    markers = _load_crypt_checkpoint(checkpoint, operation)
+    pool = thread_pool.ThreadPool(workers) if workers > 1 else None
+    excs = []
+    try:
+        for step in _CRYPT_STEPS[operation]:
+            name, model, filters = step[:3]
+            process = functools.partial(_crypt_batch, step, encryption_key,
+                                        verbose)
+            while True:
+                # Select the ids of the next batch for each worker, using
+                # the last id processed as the lower bound.
+                query = get_session().query(model.id).filter(*filters)
+                marker = markers.get(name)
+                if marker is not None:
+                    query = query.filter(model.id > marker)
+                ids = [r.id for r in query.order_by(model.id).limit(
+                    batch_size * workers)]
+                if not ids:
+                    break
+                batches = [ids[i:i + batch_size]
+                           for i in six.moves.xrange(0, len(ids),
+                                                     batch_size)]
+                if pool is not None:
+                    results = pool.map(process, batches)
+                else:
+                    results = [process(batch) for batch in batches]
+                for batch_excs in results:
+                    excs.extend(batch_excs)
+
+                markers[name] = ids[-1]
+                _save_crypt_checkpoint(checkpoint, operation, markers)
+
+        # The run is complete, so there is nothing left to resume
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return excs
+
+
 def db_encrypt_parameters_and_properties(ctxt, encryption_key, batch_size=50,
-                                         verbose=False):
+                                         verbose=False, streaming=False,
+                                         workers=1, checkpoint=None):
     """Encrypt parameters and properties for all templates in db.
 
     :param ctxt: RPC context
@@ -1241,98 +1932,24 @@ def db_encrypt_parameters_and_properties(ctxt, encryption_key, batch_size=50,
                        and proceed with next 50 items.
     :param verbose: log an INFO message when processing of each raw_template or
                     resource begins or ends
+    :param streaming: commit each batch in its own transaction, rather than
+                      processing everything in a single transaction
+    :param workers: number of batches processed in parallel when streaming
+    :param checkpoint: path of a file recording the progress when streaming,
+                       from which an interrupted run is resumed
     :return: list of exceptions encountered during encryption
     """
-    from heat.engine import template
-    session = get_session()
-    with session.begin():
-        query = session.query(models.RawTemplate)
-        excs = []
-        for raw_template in _get_batch(
-                session=session, ctxt=ctxt, query=query,
-                model=models.RawTemplate, batch_size=batch_size):
-            try:
-                if verbose:
-                    LOG.info(_LI("Processing raw_template %(id)d..."),
-                             {'id': raw_template.id})
-                tmpl = template.Template.load(
-                    ctxt, raw_template.id, raw_template)
-                param_schemata = tmpl.param_schemata()
-                env = raw_template.environment
-
-                if (not env or
-                        'parameters' not in env or
-                        not param_schemata):
-                    continue
-                if 'encrypted_param_names' in env:
-                    encrypted_params = env['encrypted_param_names']
-                else:
-                    encrypted_params = []
-
-                for param_name, param_val in env['parameters'].items():
-                    if (param_name in encrypted_params or
-                            param_name not in param_schemata or
-                            not param_schemata[param_name].hidden):
-                        continue
-                    encrypted_val = crypt.encrypt(six.text_type(param_val),
-                                                  encryption_key)
-                    env['parameters'][param_name] = encrypted_val
-                    encrypted_params.append(param_name)
-
-                if encrypted_params:
-                    environment = env.copy()
-                    environment['encrypted_param_names'] = encrypted_params
-                    raw_template_update(ctxt, raw_template.id,
-                                        {'environment': environment})
-            except Exception as exc:
-                LOG.exception(_LE('Failed to encrypt parameters of raw '
-                                  'template %(id)d'), {'id': raw_template.id})
-                excs.append(exc)
-                continue
-            finally:
-                if verbose:
-                    LOG.info(_LI("Finished processing raw_template "
-                                 "%(id)d."), {'id': raw_template.id})
-
-        query = session.query(models.Resource).filter(
-            ~models.Resource.properties_data.is_(None),
-            ~models.Resource.properties_data_encrypted.is_(True))
-        for resource in _get_batch(
-                session=session, ctxt=ctxt, query=query, model=models.Resource,
-                batch_size=batch_size):
-            try:
-                if verbose:
-                    LOG.info(_LI("Processing resource %(id)d..."),
-                             {'id': resource.id})
-                result = {}
-                if not resource.properties_data:
-                    continue
-                for prop_name, prop_value in resource.properties_data.items():
-                    prop_string = jsonutils.dumps(prop_value)
-                    encrypted_value = crypt.encrypt(prop_string,
-                                                    encryption_key)
-                    result[prop_name] = encrypted_value
-                resource.properties_data = result
-                resource.properties_data_encrypted = True
-                resource_update(ctxt, resource.id,
-                                {'properties_data': result,
-                                 'properties_data_encrypted': True},
-                                resource.atomic_key)
-            except Exception as exc:
-                LOG.exception(_LE('Failed to encrypt properties_data of '
-                                  'resource %(id)d'), {'id': resource.id})
-                excs.append(exc)
-                continue
-            finally:
-                if verbose:
-                    LOG.info(_LI("Finished processing resource "
-                                 "%(id)d."), {'id': resource.id})
-
-        return excs
+    if streaming:
+        return _db_crypt_streaming(ctxt, 'encrypt', encryption_key,
+                                   batch_size, verbose, workers, checkpoint)
+    return _db_crypt_parameters_and_properties(ctxt, 'encrypt',
+                                               encryption_key, batch_size,
+                                               verbose)
 
 
 def db_decrypt_parameters_and_properties(ctxt, encryption_key, batch_size=50,
-                                         verbose=False):
+                                         verbose=False, streaming=False,
+                                         workers=1, checkpoint=None):
     """Decrypt parameters and properties for all templates in db.
 
     :param ctxt: RPC context
@@ -1343,75 +1960,19 @@ def db_decrypt_parameters_and_properties(ctxt, encryption_key, batch_size=50,
                        and proceed with next 50 items.
     :param verbose: log an INFO message when processing of each raw_template or
                     resource begins or ends
+    :param streaming: commit each batch in its own transaction, rather than
+                      processing everything in a single transaction
+    :param workers: number of batches processed in parallel when streaming
+    :param checkpoint: path of a file recording the progress when streaming,
+                       from which an interrupted run is resumed
     :return: list of exceptions encountered during decryption
     """
-    session = get_session()
-    excs = []
-    with session.begin():
-        query = session.query(models.RawTemplate)
-        for raw_template in _get_batch(
-                session=session, ctxt=ctxt, query=query,
-                model=models.RawTemplate, batch_size=batch_size):
-            try:
-                if verbose:
-                    LOG.info(_LI("Processing raw_template %(id)d..."),
-                             {'id': raw_template.id})
-                parameters = raw_template.environment['parameters']
-                encrypted_params = raw_template.environment[
-                    'encrypted_param_names']
-                for param_name in encrypted_params:
-                    method, value = parameters[param_name]
-                    decrypted_val = crypt.decrypt(method, value,
-                                                  encryption_key)
-                    parameters[param_name] = decrypted_val
-
-                environment = raw_template.environment.copy()
-                environment['encrypted_param_names'] = []
-                raw_template_update(ctxt, raw_template.id,
-                                    {'environment': environment})
-            except Exception as exc:
-                LOG.exception(_LE('Failed to decrypt parameters of raw '
-                                  'template %(id)d'), {'id': raw_template.id})
-                excs.append(exc)
-                continue
-            finally:
-                if verbose:
-                    LOG.info(_LI("Finished processing raw_template "
-                                 "%(id)d."), {'id': raw_template.id})
-
-        query = session.query(models.Resource).filter(
-            ~models.Resource.properties_data.is_(None),
-            models.Resource.properties_data_encrypted.is_(True))
-        for resource in _get_batch(
-                session=session, ctxt=ctxt, query=query, model=models.Resource,
-                batch_size=batch_size):
-            try:
-                if verbose:
-                    LOG.info(_LI("Processing resource %(id)d..."),
-                             {'id': resource.id})
-                result = {}
-                for prop_name, prop_value in resource.properties_data.items():
-                    method, value = prop_value
-                    decrypted_value = crypt.decrypt(method, value,
-                                                    encryption_key)
-                    prop_string = jsonutils.loads(decrypted_value)
-                    result[prop_name] = prop_string
-                resource.properties_data = result
-                resource.properties_data_encrypted = False
-                resource_update(ctxt, resource.id,
-                                {'properties_data': result,
-                                 'properties_data_encrypted': False},
-                                resource.atomic_key)
-            except Exception as exc:
-                LOG.exception(_LE('Failed to decrypt properties_data of '
-                                  'resource %(id)d'), {'id': resource.id})
-                excs.append(exc)
-                continue
-            finally:
-                if verbose:
-                    LOG.info(_LI("Finished processing resource "
-                                 "%(id)d."), {'id': resource.id})
-        return excs
+    if streaming:
+        return _db_crypt_streaming(ctxt, 'decrypt', encryption_key,
+                                   batch_size, verbose, workers, checkpoint)
+    return _db_crypt_parameters_and_properties(ctxt, 'decrypt',
+                                               encryption_key, batch_size,
+                                               verbose)
 
 
 def _get_batch(session, ctxt, query, model, batch_size=50):
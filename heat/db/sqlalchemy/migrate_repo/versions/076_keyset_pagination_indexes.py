@@ -0,0 +1,34 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sqlalchemy
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    # Cover the default listing order (created_at, id) of each stack's
+    # events and of each tenant's stacks, so that pages can be fetched by
+    # seeking through the index.
+    event = sqlalchemy.Table('event', meta, autoload=True)
+    event_index = sqlalchemy.Index('ix_event_stack_id_created_at',
+                                   event.c.stack_id, event.c.created_at,
+                                   event.c.id)
+    event_index.create(migrate_engine)
+
+    stack = sqlalchemy.Table('stack', meta, autoload=True)
+    stack_index = sqlalchemy.Index('ix_stack_tenant_created_at',
+                                   stack.c.tenant, stack.c.created_at,
+                                   stack.c.id,
+                                   mysql_length={'tenant': 255})
+    stack_index.create(migrate_engine)
@@ -0,0 +1,86 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+
+from oslo_serialization import jsonutils
+import six
+import sqlalchemy
+
+from heat.db.sqlalchemy import types
+
+BATCH_SIZE = 100
+
+
+def _digest(contents):
+    # Must match heat.engine.template_files.digest()
+    if not isinstance(contents, six.string_types):
+        contents = jsonutils.dumps(contents, sort_keys=True)
+    return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    raw_template_files = sqlalchemy.Table(
+        'raw_template_files', meta,
+        sqlalchemy.Column('digest', sqlalchemy.String(64), primary_key=True),
+        sqlalchemy.Column('contents', types.Json),
+        sqlalchemy.Column('refcount', sqlalchemy.Integer, nullable=False),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8'
+    )
+    raw_template_files.create()
+
+    raw_template = sqlalchemy.Table(
+        'raw_template', meta,
+        sqlalchemy.Column('files', types.Json),
+        autoload=True)
+
+    # Move the contents of every template's files into the shared store,
+    # leaving a map of file names to digests in the template.
+    refcounts = {}
+    last_id = None
+    while True:
+        stmt = sqlalchemy.select([raw_template.c.id, raw_template.c.files])
+        if last_id is not None:
+            stmt = stmt.where(raw_template.c.id > last_id)
+        rows = list(migrate_engine.execute(
+            stmt.order_by(raw_template.c.id).limit(BATCH_SIZE)))
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for row in rows:
+            digests = dict((name, _digest(contents))
+                           for name, contents in six.iteritems(
+                               row.files or {}))
+            new_files = {}
+            for name, digest in six.iteritems(digests):
+                if digest not in refcounts and digest not in new_files:
+                    new_files[digest] = row.files[name]
+            if new_files:
+                migrate_engine.execute(raw_template_files.insert(), [
+                    {'digest': d, 'contents': c, 'refcount': 0}
+                    for d, c in six.iteritems(new_files)])
+            for digest in set(six.itervalues(digests)):
+                refcounts[digest] = refcounts.get(digest, 0) + 1
+            migrate_engine.execute(raw_template.update().where(
+                raw_template.c.id == row.id).values(files=digests))
+
+    for digest, refcount in six.iteritems(refcounts):
+        migrate_engine.execute(raw_template_files.update().where(
+            raw_template_files.c.digest == digest).values(
+            refcount=refcount))
@@ -0,0 +1,40 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sqlalchemy
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    resource_count = sqlalchemy.Table(
+        'resource_count', meta,
+        sqlalchemy.Column('root_stack_id', sqlalchemy.String(36),
+                          primary_key=True),
+        sqlalchemy.Column('total', sqlalchemy.Integer, nullable=False),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8'
+    )
+    resource_count.create()
+
+    # Start from the current number of resources in each root stack
+    resource = sqlalchemy.Table('resource', meta, autoload=True)
+    counts = sqlalchemy.select([
+        resource.c.root_stack_id,
+        sqlalchemy.func.count(resource.c.id)]).where(
+        resource.c.root_stack_id.isnot(None)).group_by(
+        resource.c.root_stack_id)
+    migrate_engine.execute(resource_count.insert().from_select(
+        ['root_stack_id', 'total'], counts))
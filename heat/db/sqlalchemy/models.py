@@ -98,6 +98,17 @@ class RawTemplate(BASE, HeatBase):
     template = sqlalchemy.Column(types.Json)
     files = sqlalchemy.Column(types.Json)
     environment = sqlalchemy.Column('environment', types.Json)
+    resource_digests = sqlalchemy.Column(types.Json)
+
+
+class RawTemplateFiles(BASE, HeatBase):
+    """File contents shared by raw templates, keyed by their digest."""
+
+    __tablename__ = 'raw_template_files'
+    digest = sqlalchemy.Column(sqlalchemy.String(64), primary_key=True)
+    contents = sqlalchemy.Column(types.Json)
+    refcount = sqlalchemy.Column(sqlalchemy.Integer, nullable=False,
+                                 default=0)
 
 
 class StackTag(BASE, HeatBase):
@@ -144,6 +155,9 @@ class Stack(BASE, HeatBase, SoftDelete, StateAware):
     __table_args__ = (
         sqlalchemy.Index('ix_stack_name', 'name', mysql_length=255),
         sqlalchemy.Index('ix_stack_tenant', 'tenant', mysql_length=255),
+        sqlalchemy.Index('ix_stack_tenant_created_at',
+                         'tenant', 'created_at', 'id',
+                         mysql_length={'tenant': 255}),
     )
 
     id = sqlalchemy.Column(sqlalchemy.String(36), primary_key=True,
@@ -179,6 +193,7 @@ class Stack(BASE, HeatBase, SoftDelete, StateAware):
     current_traversal = sqlalchemy.Column('current_traversal',
                                           sqlalchemy.String(36))
     current_deps = sqlalchemy.Column('current_deps', types.Json)
+    cached_outputs = sqlalchemy.Column('cached_outputs', types.Json)
 
     # Override timestamp column to store the correct value: it should be the
     # time the create/update call was issued, not the time the DB entry is
@@ -197,6 +212,16 @@ class StackLock(BASE, HeatBase):
     engine_id = sqlalchemy.Column(sqlalchemy.String(36))
 
 
+class EngineLease(BASE, HeatBase):
+    """Store named, time-limited leases held by a single engine."""
+
+    __tablename__ = 'engine_lease'
+
+    name = sqlalchemy.Column(sqlalchemy.String(255), primary_key=True)
+    engine_id = sqlalchemy.Column(sqlalchemy.String(36), nullable=False)
+    expires_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
+
+
 class UserCreds(BASE, HeatBase):
     """Represents user credentials.
 
@@ -223,6 +248,10 @@ class Event(BASE, HeatBase):
     """Represents an event generated by the heat engine."""
 
     __tablename__ = 'event'
+    __table_args__ = (
+        sqlalchemy.Index('ix_event_stack_id_created_at',
+                         'stack_id', 'created_at', 'id'),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     stack_id = sqlalchemy.Column(sqlalchemy.String(36),
@@ -240,7 +269,20 @@ class Event(BASE, HeatBase):
     _resource_status_reason = sqlalchemy.Column(
         'resource_status_reason', sqlalchemy.String(255))
     resource_type = sqlalchemy.Column(sqlalchemy.String(255))
-    resource_properties = sqlalchemy.Column(sqlalchemy.PickleType)
+    # Only events stored before resource_properties_data existed use this
+    _resource_properties = sqlalchemy.Column('resource_properties',
+                                             sqlalchemy.PickleType)
+    resource_properties_data = sqlalchemy.Column(types.CompressedJson)
+
+    @property
+    def resource_properties(self):
+        if self.resource_properties_data is not None:
+            return self.resource_properties_data
+        return self._resource_properties
+
+    @resource_properties.setter
+    def resource_properties(self, properties):
+        self.resource_properties_data = properties
 
     @property
     def resource_status_reason(self):
@@ -284,6 +326,9 @@ class Resource(BASE, HeatBase, StateAware):
                                              sqlalchemy.String(255))
     # odd name as "metadata" is reserved
     rsrc_metadata = sqlalchemy.Column('rsrc_metadata', types.Json)
+    # incremented every time rsrc_metadata is written
+    rsrc_metadata_version = sqlalchemy.Column('rsrc_metadata_version',
+                                              sqlalchemy.Integer, default=0)
 
     stack_id = sqlalchemy.Column(sqlalchemy.String(36),
                                  sqlalchemy.ForeignKey('stack.id'),
@@ -315,6 +360,30 @@ class Resource(BASE, HeatBase, StateAware):
         sqlalchemy.Integer,
         sqlalchemy.ForeignKey('raw_template.id'))
 
+    def update_and_save(self, values, session=None):
+        if 'rsrc_metadata' in values:
+            values = dict(values,
+                          rsrc_metadata_version=next_metadata_version())
+        super(Resource, self).update_and_save(values, session=session)
+
+
+def next_metadata_version():
+    """Return an expression for the next version of resource metadata."""
+    return Resource.rsrc_metadata_version + 1
+
+
+class ResourceCount(BASE, HeatBase):
+    """The number of resources in a root stack and all of its nested stacks.
+
+    Maintained by resource_create() and resource_delete(), so that the limit
+    on resources per stack can be checked without counting resource rows.
+    """
+
+    __tablename__ = 'resource_count'
+    root_stack_id = sqlalchemy.Column(sqlalchemy.String(36),
+                                      primary_key=True)
+    total = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+
 
 class WatchRule(BASE, HeatBase):
     """Represents a watch_rule created by the heat engine."""
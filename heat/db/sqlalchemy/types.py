@@ -11,7 +11,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import zlib
+
 from oslo_serialization import jsonutils
+import six
 from sqlalchemy.dialects import mysql
 from sqlalchemy import types
 
@@ -41,6 +44,28 @@ class Json(LongText):
         return loads(value)
 
 
+class CompressedJson(types.TypeDecorator):
+    """A JSON document stored zlib-compressed in a binary column.
+
+    Already serialised JSON text may be bound directly, so that callers who
+    had to encode the document anyway do not pay for it twice.
+    """
+
+    impl = types.LargeBinary
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, six.string_types):
+            value = dumps(value)
+        return zlib.compress(value.encode('utf-8'))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return loads(zlib.decompress(value).decode('utf-8'))
+
+
 class List(types.TypeDecorator):
     impl = types.Text
 
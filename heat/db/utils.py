@@ -43,15 +43,17 @@ IMPL = LazyPluggable('backend',
                      sqlalchemy='heat.db.sqlalchemy.api')
 
 
-def purge_deleted(age, granularity='days'):
-    IMPL.purge_deleted(age, granularity)
+def purge_deleted(age, granularity='days', batch_size=None, batch_sleep=0):
+    IMPL.purge_deleted(age, granularity, batch_size, batch_sleep)
 
 
-def encrypt_parameters_and_properties(ctxt, encryption_key, verbose):
+def encrypt_parameters_and_properties(ctxt, encryption_key, verbose,
+                                      **kwargs):
     IMPL.db_encrypt_parameters_and_properties(ctxt, encryption_key,
-                                              verbose=verbose)
+                                              verbose=verbose, **kwargs)
 
 
-def decrypt_parameters_and_properties(ctxt, encryption_key, verbose):
+def decrypt_parameters_and_properties(ctxt, encryption_key, verbose,
+                                      **kwargs):
     IMPL.db_decrypt_parameters_and_properties(ctxt, encryption_key,
-                                              verbose=verbose)
+                                              verbose=verbose, **kwargs)
@@ -19,6 +19,7 @@ import six
 
 from heat.common.i18n import _
 from heat.common.i18n import _LE
+from heat.common import pagination
 from heat.common import param_utils
 from heat.common import template_format
 from heat.engine import constraints as constr
@@ -170,18 +171,21 @@ def translate_filters(params):
     return params
 
 
-def format_stack_outputs(stack, outputs, resolve_value=False):
+def format_stack_outputs(stack, outputs, resolve_value=False,
+                         resolve_live=False):
     """Return a representation of the given output template.
 
     Return a representation of the given output template for the given stack
     that matches the API output expectations.
     """
     return [format_stack_output(stack, outputs,
-                                key, resolve_value=resolve_value)
+                                key, resolve_value=resolve_value,
+                                resolve_live=resolve_live)
             for key in outputs]
 
 
-def format_stack_output(stack, outputs, k, resolve_value=True):
+def format_stack_output(stack, outputs, k, resolve_value=True,
+                        resolve_live=False):
     result = {
         rpc_api.OUTPUT_KEY: k,
         rpc_api.OUTPUT_DESCRIPTION: outputs[k].get('Description',
@@ -190,7 +194,7 @@ def format_stack_output(stack, outputs, k, resolve_value=True):
 
     if resolve_value:
         try:
-            value = stack.output(k)
+            value = stack.output(k, resolve_live=resolve_live)
         except Exception as ex:
             # We don't need error raising, just adding output_error to
             # resulting dict.
@@ -204,7 +208,8 @@ def format_stack_output(stack, outputs, k, resolve_value=True):
     return result
 
 
-def format_stack(stack, preview=False, resolve_outputs=True):
+def format_stack(stack, preview=False, resolve_outputs=True,
+                 resolve_live=False):
     """Return a representation of the given stack.
 
     Return a representation of the given stack that matches the API output
@@ -240,9 +245,9 @@ def format_stack(stack, preview=False, resolve_outputs=True):
 
     # allow users to view the outputs of stacks
     if stack.action != stack.DELETE and resolve_outputs:
-        info[rpc_api.STACK_OUTPUTS] = format_stack_outputs(stack,
-                                                           stack.outputs,
-                                                           resolve_value=True)
+        info[rpc_api.STACK_OUTPUTS] = format_stack_outputs(
+            stack, stack.outputs, resolve_value=True,
+            resolve_live=resolve_live)
 
     return info
 
@@ -369,6 +374,30 @@ def format_event(event):
     return result
 
 
+def stack_cursor(stack):
+    """Return the keyset pagination cursor for a stack in a listing.
+
+    The cursor holds the value of every column stacks may be sorted by, so
+    it is valid whatever sort order the next page is requested with.
+    """
+    return pagination.encode_cursor({
+        'name': stack.name,
+        'status': stack.status,
+        'created_at': stack.created_time,
+        'updated_at': stack.updated_time,
+        'id': stack.id,
+    })
+
+
+def event_cursor(event):
+    """Return the keyset pagination cursor for an event in a listing."""
+    return pagination.encode_cursor({
+        'created_at': event.timestamp,
+        'resource_type': event.resource_type,
+        'id': event.id,
+    })
+
+
 def format_notification_body(stack):
     # some other possibilities here are:
     # - template name
@@ -132,11 +132,34 @@ class Attributes(collections.Mapping):
         self._resource_name = res_name
         self._resolver = resolver
         self._attributes = Attributes._make_attributes(schema)
+        self._store = None
         self.reset_resolved_values()
 
     def reset_resolved_values(self):
         self._resolved_values = {}
 
+    def set_store(self, store):
+        """Set a persistent store of resolved attribute values.
+
+        The store must provide a get(key) method, returning None if no value
+        is stored. Values of attributes with the CACHE_NONE cache mode are
+        never looked up in the store.
+        """
+        self._store = store
+
+    def resolved_values(self):
+        """Return the cached values of the attributes resolved so far."""
+        return dict(self._resolved_values)
+
+    def cacheable(self, key):
+        """Return whether the value of an attribute may be cached.
+
+        Attributes that are not in the schema are never cached.
+        """
+        attrib = self._attributes.get(key)
+        return (attrib is not None and
+                attrib.schema.cache_mode != Schema.CACHE_NONE)
+
     @staticmethod
     def _make_attributes(schema):
         return dict((n, Attribute(n, d)) for n, d in schema.items())
@@ -211,6 +234,12 @@ class Attributes(collections.Mapping):
         if key in self._resolved_values:
             return self._resolved_values[key]
 
+        if self._store is not None:
+            value = self._store.get(key)
+            if value is not None:
+                self._resolved_values[key] = value
+                return value
+
         value = self._resolver(key)
 
         if value is not None:
@@ -144,9 +144,7 @@ class CfnTemplate(template.Template):
             raise exception.StackValidationFailed(message=six.text_type(ex))
 
     def resource_definitions(self, stack):
-        resources = self.t.get(self.RESOURCES) or {}
-
-        def rsrc_defn_item(name, snippet):
+        def make_defn(stack, name, snippet):
             data = self.parse(stack, snippet)
 
             depends = data.get(RES_DEPENDS_ON)
@@ -172,11 +170,9 @@ class CfnTemplate(template.Template):
                 'description': data.get(RES_DESCRIPTION) or ''
             }
 
-            defn = rsrc_defn.ResourceDefinition(name, **kwargs)
-            return name, defn
+            return rsrc_defn.ResourceDefinition(name, **kwargs)
 
-        return dict(rsrc_defn_item(name, data)
-                    for name, data in resources.items())
+        return self._lazy_resource_definitions(stack, make_defn)
 
     def add_resource(self, definition, name=None):
         if name is None:
@@ -195,9 +191,7 @@ class CfnTemplate(template.Template):
         if len(cfn_tmpl.get(RES_DEPENDS_ON, [])) == 1:
             cfn_tmpl[RES_DEPENDS_ON] = cfn_tmpl[RES_DEPENDS_ON][0]
 
-        if self.t.get(self.RESOURCES) is None:
-            self.t[self.RESOURCES] = {}
-        self.t[self.RESOURCES][name] = cfn_tmpl
+        self._set_resource_snippet(name, cfn_tmpl)
 
 
 class HeatTemplate(CfnTemplate):
@@ -186,7 +186,7 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         # Some clouds append extra (STATUS) strings to the status, strip it
         return server.status.split('(')[0]
 
-    def _check_active(self, server, res_name='Server'):
+    def _check_active(self, server, res_name='Server', refresh=True):
         """Check server status.
 
         Accepts both server IDs and server objects.
@@ -195,6 +195,7 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         returns False otherwise.
 
         :param res_name: name of the resource to use in the exception message
+        :param refresh: whether to refresh a server object that is not ACTIVE
 
         """
         # not checking with is_uuid_like as most tests use strings e.g. '1234'
@@ -206,7 +207,7 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
                 status = self.get_status(server)
         else:
             status = self.get_status(server)
-            if status != 'ACTIVE':
+            if status != 'ACTIVE' and refresh:
                 self.refresh_server(server)
                 status = self.get_status(server)
 
@@ -0,0 +1,139 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Rate limits on the resource actions started against backend services.
+
+Each engine keeps a token bucket for every service and tenant it acts on.
+A resource takes a token from the bucket before calling the handler that
+starts an action against the service, and the outcome of each resource
+action is fed back to it: an OverLimit response from the service halves the
+rate and blocks new actions for a while, and successful actions gradually
+restore the configured rate.
+"""
+
+from oslo_log import log as logging
+
+from heat.common import config
+from heat.common.i18n import _LW
+from heat.common import timeutils
+
+LOG = logging.getLogger(__name__)
+
+# Consecutive OverLimit responses block new tasks for exponentially longer
+# periods, up to this many seconds
+MAX_BACKOFF = 60.0
+
+# The rate is never backed off below this fraction of the configured rate
+MIN_RATE_FRACTION = 1.0 / 16
+
+# The fraction of the configured rate regained after each successful action
+RECOVERY_FRACTION = 0.1
+
+_buckets = {}
+
+
+class TokenBucket(object):
+    """Admit tasks at an average rate, allowing for bursts.
+
+    A rate of zero admits every task, except while backing off after an
+    OverLimit response.
+    """
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self._updated = timeutils.wallclock()
+        self._blocked_until = None
+        self._backoff = 0.0
+
+    def consume(self):
+        """Take a token if one is available; return whether it was."""
+        now = timeutils.wallclock()
+        if self._blocked_until is not None:
+            if now < self._blocked_until:
+                return False
+            self._blocked_until = None
+        if not self.max_rate:
+            return True
+
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def over_limit(self):
+        """Back off after the service has reported it is over its limit."""
+        now = timeutils.wallclock()
+        self._backoff = min(MAX_BACKOFF, self._backoff * 2 or 1.0)
+        self._blocked_until = now + self._backoff
+        if self.max_rate:
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION,
+                            self.rate / 2.0)
+            self.tokens = 0.0
+            self._updated = now
+
+    def succeeded(self):
+        """Recover some of the configured rate after a successful action."""
+        self._backoff = 0.0
+        if self.max_rate and self.rate < self.max_rate:
+            self.rate = min(self.max_rate,
+                            self.rate + self.max_rate * RECOVERY_FRACTION)
+
+
+def _configured_rate(service, tenant_id):
+    tenant_rates = config.get_client_option(service, 'tenant_rate_limits')
+    if tenant_rates and tenant_id in tenant_rates:
+        try:
+            rate = float(tenant_rates[tenant_id])
+        except ValueError:
+            rate = -1
+        if rate >= 0:
+            return rate
+        LOG.warning(_LW('Ignoring invalid rate limit "%(rate)s" configured '
+                        'for tenant %(tenant)s of %(service)s'),
+                    {'rate': tenant_rates[tenant_id],
+                     'tenant': tenant_id,
+                     'service': service})
+    return config.get_client_option(service, 'rate_limit')
+
+
+def bucket(service, tenant_id):
+    """Return the token bucket for a service and tenant."""
+    key = (service, tenant_id)
+    if key not in _buckets:
+        _buckets[key] = TokenBucket(
+            _configured_rate(service, tenant_id),
+            config.get_client_option(service, 'rate_limit_burst'))
+    return _buckets[key]
+
+
+class ServiceRateLimiter(object):
+    """Start resource actions only as fast as their services allow."""
+
+    def acquire(self, res):
+        service = res.backend_service()
+        if service is None:
+            return True
+        return bucket(service, res.context.tenant_id).consume()
+
+    def release(self, res):
+        # Tokens are used up by starting a task, not returned on completion
+        pass
+
+
+limiter = ServiceRateLimiter()
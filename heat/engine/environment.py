@@ -251,11 +251,66 @@ class GlobResourceInfo(MapResourceInfo):
         return match
 
 
+class _RegistryLayer(collections.MutableMapping):
+    """A level of a child registry, overlaid on the same level of its parent.
+
+    Only the entries registered or removed in the child are stored; any other
+    lookup falls through to the parent, so that creating a child registry
+    does not copy the parent's.
+    """
+
+    def __init__(self, parent):
+        self._parent = parent
+        self._own = {}
+        self._removed = set()
+
+    def __getitem__(self, key):
+        if key in self._own:
+            return self._own[key]
+        if key in self._removed:
+            raise KeyError(key)
+        value = self._parent[key]
+        if isinstance(value, collections.Mapping):
+            # overlay nested levels too, so that changing them in the child
+            # leaves the parent alone
+            value = self._own[key] = _RegistryLayer(value)
+        return value
+
+    def __setitem__(self, key, value):
+        self._removed.discard(key)
+        self._own[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._own.pop(key, None)
+        self._removed.add(key)
+
+    def __contains__(self, key):
+        if key in self._own:
+            return True
+        return key not in self._removed and key in self._parent
+
+    def __iter__(self):
+        for key in self._own:
+            yield key
+        for key in self._parent:
+            if key not in self._own and key not in self._removed:
+                yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
 class ResourceRegistry(object):
     """By looking at the environment, find the resource implementation."""
 
-    def __init__(self, global_registry, param_defaults):
-        self._registry = {'resources': {}}
+    def __init__(self, global_registry, param_defaults, parent=None):
+        if parent is None:
+            self._registry = {'resources': {}}
+        else:
+            self._registry = _RegistryLayer(parent._registry)
+        self.parent = parent
         self.global_registry = global_registry
         self.param_defaults = param_defaults
 
@@ -443,6 +498,19 @@ class ResourceRegistry(object):
             new_resources.update(ress[resource_name])
         self._registry['resources'] = new_resources
 
+    def _bind(self, info):
+        """Return an entry, inherited from a parent, bound to this registry.
+
+        Mappings and templates are resolved against the registry holding
+        them, which for an inherited entry must be the child's.
+        """
+        if (self.parent is None or info.registry is self or
+                isinstance(info, ClassResourceInfo)):
+            return info
+        bound = ResourceInfo(self, info.path, info.value)
+        bound.user_resource = info.user_resource
+        return bound
+
     def iterable_by(self, resource_type, resource_name=None):
         is_templ_type = resource_type.endswith(('.yaml', '.template'))
         if self.global_registry is not None and is_templ_type:
@@ -453,18 +521,18 @@ class ResourceRegistry(object):
             if resource_type not in self._registry:
                 res = ResourceInfo(self, [resource_type], None)
                 self._register_info([resource_type], res)
-            yield self._registry[resource_type]
+            yield self._bind(self._registry[resource_type])
 
         # handle a specific resource mapping.
         if resource_name:
             impl = self._registry['resources'].get(resource_name)
             if impl and resource_type in impl:
-                yield impl[resource_type]
+                yield self._bind(impl[resource_type])
 
         # handle: "OS::Nova::Server" -> "Rackspace::Cloud::Server"
         impl = self._registry.get(resource_type)
         if impl:
-            yield impl
+            yield self._bind(impl)
 
         # handle: "OS::*" -> "Dreamhost::*"
         def is_a_glob(resource_type):
@@ -472,7 +540,7 @@ class ResourceRegistry(object):
         globs = six.moves.filter(is_a_glob, six.iterkeys(self._registry))
         for pattern in globs:
             if self._registry[pattern].matches(resource_type):
-                yield self._registry[pattern]
+                yield self._bind(self._registry[pattern])
 
     def get_resource_info(self, resource_type, resource_name=None,
                           registry_type=None, ignore=None):
@@ -559,7 +627,7 @@ class ResourceRegistry(object):
         def _as_dict(level):
             tmp = {}
             for k, v in iter(level.items()):
-                if isinstance(v, dict):
+                if isinstance(v, collections.Mapping):
                     tmp[k] = _as_dict(v)
                 elif is_hook_definition(
                         k, v) or is_valid_restricted_action(k, v):
@@ -639,7 +707,7 @@ class ResourceRegistry(object):
 
 class Environment(object):
 
-    def __init__(self, env=None, user_env=True):
+    def __init__(self, env=None, user_env=True, parent=None):
         """Create an Environment from an input dict.
 
         The dict may be in one of two formats:
@@ -648,6 +716,10 @@ class Environment(object):
 
         :param env: the json environment
         :param user_env: boolean, if False then we manage python resources too.
+        :param parent: an environment to inherit the resource registry,
+                       parameter defaults and event sinks of. The registry is
+                       layered on the parent's rather than copied from it, so
+                       later changes to the parent's registry are seen too.
         """
         if env is None:
             env = {}
@@ -661,8 +733,14 @@ class Environment(object):
             event_sink_classes = {}
 
         self.param_defaults = env.get(env_fmt.PARAMETER_DEFAULTS, {})
-
-        self.registry = ResourceRegistry(global_registry, self.param_defaults)
+        if parent is not None:
+            param_defaults = dict(parent.param_defaults)
+            param_defaults.update(self.param_defaults)
+            self.param_defaults = param_defaults
+
+        self.registry = ResourceRegistry(
+            global_registry, self.param_defaults,
+            parent=parent.registry if parent is not None else None)
         self.registry.load(env.get(env_fmt.RESOURCE_REGISTRY, {}))
 
         self.encrypted_param_names = env.get(env_fmt.ENCRYPTED_PARAM_NAMES, [])
@@ -676,8 +754,12 @@ class Environment(object):
                                             env_fmt.EVENT_SINKS,
                                             env_fmt.RESOURCE_REGISTRY))
         self.event_sink_classes = event_sink_classes
-        self._event_sinks = []
-        self._built_event_sinks = []
+        if parent is not None:
+            self._event_sinks = list(parent._event_sinks)
+            self._built_event_sinks = list(parent._built_event_sinks)
+        else:
+            self._event_sinks = []
+            self._built_event_sinks = []
         self._update_event_sinks(env.get(env_fmt.EVENT_SINKS, []))
         self.constraints = {}
         self.stack_lifecycle_plugins = []
@@ -777,14 +859,10 @@ def get_child_environment(parent_env, child_params, item_to_remove=None,
                 return False
         return True
 
-    child_env = parent_env.user_env_as_dict()
-    child_env[env_fmt.PARAMETERS] = {}
     flat_params = is_flat_params(child_params)
-    new_env = Environment()
+    new_env = Environment(parent=parent_env)
     if flat_params and child_params is not None:
-        child_env[env_fmt.PARAMETERS] = child_params
-
-    new_env.load(child_env)
+        new_env.params.update(child_params)
     if not flat_params and child_params is not None:
         new_env.load(child_params)
 
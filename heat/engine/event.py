@@ -11,11 +11,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import pickle
 import six
 
 import oslo_db.exception
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 
 from heat.common import exception
 from heat.common.i18n import _
@@ -27,6 +27,40 @@ LOG = logging.getLogger(__name__)
 MAX_EVENT_RESOURCE_PROPERTIES_SIZE = (1 << 16) - 1
 
 
+def _properties_json(properties):
+    """Serialise event properties to JSON within the size we will store.
+
+    Each property is serialised only once. If the document is too large,
+    the largest value is replaced and the already serialised members are
+    reassembled, rather than encoding the whole document again.
+    """
+    members = dict((k, '%s: %s' % (jsonutils.dumps(k), jsonutils.dumps(v)))
+                   for k, v in six.iteritems(properties))
+
+    def size():
+        # braces plus a ", " separator between members
+        return 2 * len(members) + sum(len(m) for m in members.values())
+
+    rp_size = size()
+    if rp_size > MAX_EVENT_RESOURCE_PROPERTIES_SIZE:
+        LOG.debug('event\'s resource_properties too large to store at '
+                  '%d bytes', rp_size)
+        # Try truncating the largest value and see if that gets us under
+        # the stored size limit.
+        max_key = max(members, key=lambda k: len(members[k]))
+        err = 'Resource properties are too large to store fully'
+        members[max_key] = '%s: %s' % (jsonutils.dumps(max_key),
+                                       jsonutils.dumps('<Deleted, too large>'))
+        members['Error'] = '"Error": %s' % jsonutils.dumps(err)
+        rp_size = size()
+        if rp_size > MAX_EVENT_RESOURCE_PROPERTIES_SIZE:
+            LOG.debug('event\'s resource_properties STILL too large '
+                      'after truncating largest key at %d bytes', rp_size)
+            err = 'Resource properties are too large to attempt to store'
+            return jsonutils.dumps({'Error': err})
+    return '{%s}' % ', '.join(members.values())
+
+
 class Event(object):
     """Class representing a Resource state change."""
 
@@ -83,7 +117,7 @@ class Event(object):
             'resource_status': self.status,
             'resource_status_reason': self.reason,
             'resource_type': self.resource_type,
-            'resource_properties': self.resource_properties,
+            'resource_properties': _properties_json(self.resource_properties),
         }
 
         if self.uuid is not None:
@@ -92,28 +126,6 @@ class Event(object):
         if self.timestamp is not None:
             ev['created_at'] = self.timestamp
 
-        # Workaround: we don't want to attempt to store the
-        # event.resource_properties column if the data is too large
-        # (greater than permitted by BLOB). Otherwise, we end up with
-        # an unsightly log message.
-        rp_size = len(pickle.dumps(ev['resource_properties']))
-        if rp_size > MAX_EVENT_RESOURCE_PROPERTIES_SIZE:
-            LOG.debug('event\'s resource_properties too large to store at '
-                      '%d bytes', rp_size)
-            # Try truncating the largest value and see if that gets us under
-            # the db column's size constraint.
-            max_key, max_val = max(ev['resource_properties'].items(),
-                                   key=lambda i: len(repr(i[1])))
-            err = 'Resource properties are too large to store fully'
-            ev['resource_properties'].update({'Error': err})
-            ev['resource_properties'][max_key] = '<Deleted, too large>'
-            rp_size = len(pickle.dumps(ev['resource_properties']))
-            if rp_size > MAX_EVENT_RESOURCE_PROPERTIES_SIZE:
-                LOG.debug('event\'s resource_properties STILL too large '
-                          'after truncating largest key at %d bytes', rp_size)
-                err = 'Resource properties are too large to attempt to store'
-                ev['resource_properties'] = {'Error': err}
-
         # We should have worked around the issue, but let's be extra
         # careful.
         try:
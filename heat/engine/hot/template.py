@@ -245,10 +245,11 @@ class HOTemplate20130523(template.Template):
             raise exception.StackValidationFailed(message=six.text_type(ex))
 
     def resource_definitions(self, stack):
-        resources = self.t.get(self.RESOURCES) or {}
-        parsed_resources = self.parse(stack, resources)
-        return dict((name, self.rsrc_defn_from_snippet(name, data))
-                    for name, data in parsed_resources.items())
+        def make_defn(stack, name, snippet):
+            return self.rsrc_defn_from_snippet(name,
+                                               self.parse(stack, snippet))
+
+        return self._lazy_resource_definitions(stack, make_defn)
 
     @staticmethod
     def rsrc_defn_from_snippet(name, data):
@@ -281,9 +282,7 @@ class HOTemplate20130523(template.Template):
         if name is None:
             name = definition.name
 
-        if self.t.get(self.RESOURCES) is None:
-            self.t[self.RESOURCES] = {}
-        self.t[self.RESOURCES][name] = definition.render_hot()
+        self._set_resource_snippet(name, definition.render_hot())
 
 
 class HOTemplate20141016(HOTemplate20130523):
@@ -19,7 +19,9 @@ import weakref
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
+from oslo_utils import fnmatch
 from oslo_utils import reflection
 import six
 
@@ -29,11 +31,14 @@ from heat.common.i18n import _LE
 from heat.common.i18n import _LI
 from heat.common.i18n import _LW
 from heat.common import identifier
+from heat.common import metrics
 from heat.common import short_id
 from heat.common import timeutils
+from heat.db import query_stats
 from heat.engine import attributes
 from heat.engine.cfn import template as cfn_tmpl
 from heat.engine import clients
+from heat.engine.clients import rate_limit
 from heat.engine import environment
 from heat.engine import event
 from heat.engine import function
@@ -60,6 +65,23 @@ def _register_class(resource_type, resource_class):
     resources.global_env().register_class(resource_type, resource_class)
 
 
+def _poll_backoff_ceiling(resource_type):
+    """Return the maximum poll period configured for a resource type.
+
+    Returns None if no period is configured for the type in particular.
+    """
+    for entry in cfg.CONF.poll_backoff_max_periods:
+        type_pattern, sep, period = entry.rpartition('=')
+        if not sep or not fnmatch.fnmatchcase(resource_type, type_pattern):
+            continue
+        try:
+            return int(period)
+        except ValueError:
+            LOG.warning(_LW('Ignoring invalid poll_backoff_max_periods '
+                            'entry "%s"'), entry)
+    return None
+
+
 class PollDelay(Exception):
     """Exception to delay polling of the resource.
 
@@ -74,6 +96,98 @@ class PollDelay(Exception):
         self.period = period
 
 
+class StoredAttributes(object):
+    """Resolved attribute values of a resource, persisted in its data.
+
+    Stored values are only used while the resource and its stack remain in
+    the state in which they were stored, so any change of state of either
+    invalidates them. The values resolved during an action are collected
+    whenever the resolved values of the stack's resources are reset, and
+    saved when the stack completes the action, only while both it and the
+    resource are COMPLETE.
+    """
+
+    DATA_KEY = '_stored_attributes'
+
+    def __init__(self, resource):
+        self._resource = weakref.ref(resource)
+        self._state_key = None
+        self._values = {}
+        self._collected = {}
+
+    def _current_state_key(self):
+        res = self._resource()
+        stk = res.stack
+        stack_time = stk.updated_time or stk.created_time
+        if stack_time is not None:
+            # compare to the precision the database stores
+            stack_time = stack_time.strftime('%Y-%m-%dT%H:%M:%S')
+        return '%s:%s:%s:%s:%s:%s' % (stk.action, stk.status,
+                                      stk.current_traversal, stack_time,
+                                      res.action, res.status)
+
+    def load(self, data):
+        """Load the stored values from the serialised resource data."""
+        self._state_key = None
+        self._values = {}
+        if data:
+            try:
+                self._state_key, self._values = jsonutils.loads(data)
+            except ValueError:
+                LOG.warning(_LW('Ignoring invalid stored attributes of %s'),
+                            six.text_type(self._resource()))
+
+    def get(self, key):
+        if (not self._values or
+                self._state_key != self._current_state_key()):
+            return None
+        return self._values.get(key)
+
+    def collect(self, values):
+        """Keep resolved values, to be saved when the stack completes."""
+        self._collected.update(values)
+
+    def discard_collected(self):
+        """Forget the values collected, which may no longer be current."""
+        self._collected = {}
+
+    def save(self):
+        """Store the values collected, along with any stored before."""
+        res = self._resource()
+        stk = res.stack
+        collected, self._collected = self._collected, {}
+        if (not collected or res.id is None or res.status != res.COMPLETE or
+                res.action in (res.INIT, res.DELETE) or
+                stk.status != stk.COMPLETE):
+            return
+
+        state_key = self._current_state_key()
+        values = dict(self._values) if state_key == self._state_key else {}
+        values.update(collected)
+        if state_key == self._state_key and values == self._values:
+            return
+        try:
+            data = jsonutils.dumps([state_key, values])
+        except (TypeError, ValueError):
+            return
+        resource_data_objects.ResourceData.set(res, self.DATA_KEY, data,
+                                               redact=True)
+        self._state_key, self._values = state_key, values
+
+    def clear(self):
+        """Delete any stored values."""
+        self._collected = {}
+        if self._state_key is None:
+            return
+        self._state_key = None
+        self._values = {}
+        try:
+            resource_data_objects.ResourceData.delete(self._resource(),
+                                                      self.DATA_KEY)
+        except exception.NotFound:
+            pass
+
+
 @six.python_2_unicode_compatible
 class Resource(object):
     ACTIONS = (
@@ -139,6 +253,19 @@ class Resource(object):
     # a signal to this resource
     signal_needs_metadata_updates = True
 
+    # Whether resolved attribute values are persisted in the resource data
+    persist_attributes = True
+
+    # Whether attribute values change only with the state of the resource,
+    # so that stack outputs using them may be stored
+    stable_attributes = True
+
+    # Resource implementations may set this in check_*_complete() to the
+    # status observed in the backend; polls back off while it is unchanged.
+    # Those that do not are polled every second, unless a maximum poll
+    # period is configured for the type in poll_backoff_max_periods.
+    poll_status = None
+
     def __new__(cls, name, definition, stack):
         """Create a new Resource of the appropriate class for its type."""
 
@@ -214,7 +341,10 @@ class Resource(object):
         self.update_policy = self.t.update_policy(self.update_policy_schema,
                                                   self.context)
         self.attributes_schema.update(self.base_attributes_schema)
+        self._stored_attributes = StoredAttributes(self)
         self.attributes = self._init_attributes()
+        if self.persist_attributes:
+            self.attributes.set_store(self._stored_attributes)
 
         self.abandon_in_progress = False
 
@@ -272,6 +402,8 @@ class Resource(object):
                 self, resource.data)
         except exception.NotFound:
             self._data = {}
+        self._stored_attributes.load(
+            self._data.pop(StoredAttributes.DATA_KEY, None))
         self._rsrc_metadata = resource.rsrc_metadata
         self._stored_properties_data = resource.properties_data
         self.created_time = resource.created_at
@@ -639,6 +771,14 @@ class Resource(object):
         assert client_name, "Must specify client name"
         return self.stack.clients.client_plugin(client_name)
 
+    def backend_service(self):
+        """Return the name of the service this resource is managed through.
+
+        This is the service that operations on the resource make requests
+        to, and which the number of concurrent operations is bounded for.
+        """
+        return self.default_client_name
+
     @classmethod
     def is_service_available(cls, context):
         # NOTE(kanagaraj-manickam): return True to satisfy the cases like
@@ -723,6 +863,7 @@ class Resource(object):
                      {"action": action,
                       "info": six.text_type(self)},
                      exc_info=True)
+            self._rate_limit_feedback(ex)
             failure = exception.ResourceFailure(ex, self, action)
             self.state_set(action, self.FAILED, six.text_type(failure))
             raise failure
@@ -733,8 +874,26 @@ class Resource(object):
                 except Exception:
                     LOG.exception(_LE('Error marking resource as failed'))
         else:
+            self._rate_limit_feedback()
             self.state_set(action, self.COMPLETE)
 
+    def _rate_limit_feedback(self, ex=None):
+        """Report the outcome of an action to the service's rate limiter."""
+        service = self.backend_service()
+        if service is None:
+            return
+        service_bucket = rate_limit.bucket(service, self.context.tenant_id)
+        if ex is None:
+            service_bucket.succeeded()
+            return
+        plugin = self.stack.clients.client_plugin(service)
+        if plugin is not None and plugin.is_over_limit(ex):
+            LOG.warning(_LW('%(service)s is over its limit; backing off '
+                            'new actions for tenant %(tenant)s'),
+                        {'service': service,
+                         'tenant': self.context.tenant_id})
+            service_bucket.over_limit()
+
     def action_handler_task(self, action, args=None, action_prefix=None):
         """A task to call the Resource subclass's handler methods for action.
 
@@ -749,6 +908,7 @@ class Resource(object):
         """
         args = args or []
         handler_action = action.lower()
+        check_metric = 'resource.check_%s_complete' % handler_action
         check = getattr(self, 'check_%s_complete' % handler_action, None)
 
         if action_prefix:
@@ -756,19 +916,40 @@ class Resource(object):
         handler = getattr(self, 'handle_%s' % handler_action, None)
 
         if callable(handler):
-            handler_data = handler(*args)
+            # Deleting a resource that was never created calls no service
+            if action != self.DELETE or self.resource_id is not None:
+                while not rate_limit.limiter.acquire(self):
+                    yield
+            with metrics.timer('resource.handle_%s' % handler_action), \
+                    query_stats.resource(self.name):
+                handler_data = handler(*args)
             yield
             if callable(check):
+                self.poll_status = None
+                ceiling = _poll_backoff_ceiling(self.type())
+                backoff = scheduler.PollBackoff(
+                    ceiling or cfg.CONF.poll_backoff_max_period,
+                    jitter=cfg.CONF.poll_backoff_jitter,
+                    key=self.type(),
+                    require_status=ceiling is None)
                 while True:
                     try:
-                        done = check(handler_data)
+                        with metrics.timer(check_metric), \
+                                query_stats.resource(self.name):
+                            done = check(handler_data)
                     except PollDelay as delay:
+                        backoff.period(self.poll_status)
                         yield delay.period
                     else:
+                        period = backoff.period(self.poll_status)
                         if done:
                             break
                         else:
-                            yield
+                            yield period
+                LOG.debug('%(name)s: %(action)s checked %(polls)d times',
+                          {'name': six.text_type(self),
+                           'action': handler_action,
+                           'polls': backoff.polls})
 
     @scheduler.wrappertask
     def _do_action(self, action, pre_func=None, resource_data=None):
@@ -997,6 +1178,39 @@ class Resource(object):
         except ValueError:
             return True
 
+    def attributes_stable(self, names):
+        """Return True if the given attributes change only with the state.
+
+        Attributes that are never cached, which include secrets, are not
+        stable, nor are any attributes of a resource whose attributes may
+        change without any change to its state.
+        """
+        if not self.stable_attributes:
+            return False
+        for name in names:
+            if isinstance(name, tuple):
+                name = name[0]
+            if not self.attributes.cacheable(name):
+                return False
+        return True
+
+    def can_skip_unchanged_update(self):
+        """Return True if updating to an identical definition does nothing.
+
+        StackUpdate does not call update() at all for a resource whose
+        template snippet, dependencies and parameters are unchanged when this
+        returns True, so it must only do so when update() would have found no
+        changes. Resources that always act on update must override it.
+        """
+        if self.status == self.FAILED:
+            return False
+        if (self.action, self.status) == (self.INIT, self.COMPLETE):
+            return False
+        if cfg.CONF.observe_on_update:
+            return False
+        return not self.stack.env.registry.matches_hook(
+            self.name, environment.HOOK_PRE_UPDATE)
+
     def _check_for_convergence_replace(self, restricted_actions):
         if 'replace' in restricted_actions:
             ex = exception.ResourceActionRestricted(action='replace')
@@ -1802,10 +2016,17 @@ class Resource(object):
 
         old_state = (self.action, self.status)
         new_state = (action, status)
+        if status == self.IN_PROGRESS:
+            # Values resolved before the action may be changed by it
+            self.attributes.reset_resolved_values()
+            self._stored_attributes.discard_collected()
+            if action in (self.UPDATE, self.DELETE):
+                self._stored_attributes.clear()
         self._store_or_update(action, status, reason)
 
         if new_state != old_state:
             self._add_event(action, status, reason)
+            self.stack.invalidate_cached_outputs(self, parents=False)
 
         self.stack.reset_resource_attributes()
 
@@ -1855,6 +2076,26 @@ class Resource(object):
 
         return attributes.select_from_attribute(attribute, path)
 
+    def collect_attributes(self):
+        """Keep the attribute values resolved so far, to be stored later.
+
+        This is called before the resolved values are reset, so that the
+        values resolved at any point during an action are stored when it
+        completes.
+        """
+        if self.persist_attributes and self.status == self.COMPLETE:
+            self._stored_attributes.collect(self.attributes.resolved_values())
+
+    def store_attributes(self):
+        """Persist the attribute values resolved during the action.
+
+        This is called when the stack completes an action, so that other
+        engines loading the resource need not resolve the values again.
+        """
+        if self.persist_attributes:
+            self.collect_attributes()
+            self._stored_attributes.save()
+
     def FnGetAtt(self, key, *path):
         """For the intrinsic function Fn::GetAtt.
 
@@ -1947,6 +2188,9 @@ class Resource(object):
 
         try:
             signal_result = self.handle_signal(details)
+            # The signal may have changed the values of attributes
+            self._stored_attributes.clear()
+            self.stack.invalidate_cached_outputs(self)
             if signal_result:
                 reason_string = "Signal: %s" % signal_result
             else:
@@ -1989,6 +2233,16 @@ class Resource(object):
             LOG.warning(_LW("Resource %s does not implement metadata update"),
                         self.name)
 
+    def refreshed_metadata(self, metadata):
+        """Return the metadata to store when refreshing the resource metadata.
+
+        Resources which refresh their metadata in metadata_update() should
+        override this to return the metadata it would write, given the
+        current metadata, so that Stack.metadata_refresh() can update many
+        resources at once. Returning None leaves the metadata unchanged.
+        """
+        return None
+
     @classmethod
     def resource_to_template(cls, resource_type, template_type='cfn'):
         """Generate a provider template that mirrors the resource.
@@ -2051,6 +2305,8 @@ class Resource(object):
                 self._data = resource_data_objects.ResourceData.get_all(self)
             except exception.NotFound:
                 pass
+            else:
+                self._data.pop(StoredAttributes.DATA_KEY, None)
 
         return self._data or {}
 
@@ -772,6 +772,9 @@ class Instance(resource.Resource, sh.SchedulerHintsMixin):
         if new_metadata is None:
             self.metadata_set(self.t.metadata())
 
+    def refreshed_metadata(self, metadata):
+        return self.t.metadata()
+
     def validate(self):
         """Validate any of the provided params."""
         res = super(Instance, self).validate()
@@ -148,7 +148,7 @@ class RemoteStack(resource.Resource):
             tmpl = template_format.parse(self.properties[self.TEMPLATE])
             args = {
                 'template': tmpl,
-                'files': self.stack.t.files,
+                'files': self.stack.t.files.to_dict(),
                 'environment': env.user_env_as_dict(),
             }
             self.heat().stacks.validate(**args)
@@ -169,7 +169,7 @@ class RemoteStack(resource.Resource):
             'timeout_mins': self.properties[self.TIMEOUT],
             'disable_rollback': True,
             'parameters': params,
-            'files': self.stack.t.files,
+            'files': self.stack.t.files.to_dict(),
             'environment': env.user_env_as_dict(),
         }
         remote_stack_id = self.heat().stacks.create(**args)['stack']['id']
@@ -224,6 +224,9 @@ class RemoteStack(resource.Resource):
         # resources in it decide if they need updating.
         return True
 
+    def can_skip_unchanged_update(self):
+        return False
+
     def handle_update(self, json_snippet, tmpl_diff, prop_diff):
         # Always issue an update to the remote stack and let the individual
         # resources in it decide if they need updating.
@@ -240,7 +243,7 @@ class RemoteStack(resource.Resource):
                 'template': tmpl,
                 'timeout_mins': self.properties[self.TIMEOUT],
                 'disable_rollback': self.stack.disable_rollback,
-                'files': self.stack.t.files,
+                'files': self.stack.t.files.to_dict(),
                 'environment': env.user_env_as_dict(),
             }
             self.heat().stacks.update(**fields)
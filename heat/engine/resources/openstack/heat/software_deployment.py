@@ -193,6 +193,10 @@ class SoftwareDeployment(signal_responder.SignalResponder):
     # dedicated API for changing state on signals
     signal_needs_metadata_updates = False
 
+    # Outputs of the deployment are signalled through that API, without any
+    # change to the resource
+    stable_attributes = False
+
     def _signal_transport_cfn(self):
         return self.properties[
             self.SIGNAL_TRANSPORT] == self.CFN_SIGNAL
@@ -572,6 +576,8 @@ class SoftwareDeploymentGroup(resource_group.ResourceGroup):
 
     support_status = support.SupportStatus(version='5.0.0')
 
+    stable_attributes = False
+
     PROPERTIES = (
         SERVERS,
         CONFIG,
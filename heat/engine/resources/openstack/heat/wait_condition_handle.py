@@ -232,6 +232,9 @@ class UpdateWaitConditionHandle(aws_wch.WaitConditionHandle):
     def update(self, after, before=None, prev_resource=None):
         raise exception.UpdateReplace(self.name)
 
+    def can_skip_unchanged_update(self):
+        return False
+
 
 def resource_mapping():
     return {
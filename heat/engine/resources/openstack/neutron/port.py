@@ -489,6 +489,11 @@ class Port(neutron.NeutronResource):
         """Mandatory replace based on props."""
         return after_props.get(self.REPLACEMENT_POLICY) == 'REPLACE_ALWAYS'
 
+    def can_skip_unchanged_update(self):
+        if self.needs_replace(self.properties):
+            return False
+        return super(Port, self).can_skip_unchanged_update()
+
     def handle_update(self, json_snippet, tmpl_diff, prop_diff):
         if prop_diff:
             self.prepare_update_properties(prop_diff)
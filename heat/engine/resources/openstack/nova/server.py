@@ -900,7 +900,13 @@ class Server(stack_user.StackUser, sh.SchedulerHintsMixin,
         return server.id
 
     def check_create_complete(self, server_id):
-        check = self.client_plugin()._check_active(server_id)
+        cp = self.client_plugin()
+        server = cp.fetch_server(server_id)
+        if server is None:
+            return False
+        self.poll_status = (cp.get_status(server),
+                            getattr(server, 'OS-EXT-STS:task_state', None))
+        check = cp._check_active(server, refresh=False)
         if check:
             self.store_external_ports()
             # Addresses binds to server not immediately, so we need to wait
@@ -1282,11 +1288,15 @@ class Server(stack_user.StackUser, sh.SchedulerHintsMixin,
             # attributes referenced in the template metadata may change
             # and the resource itself adds keys to the metadata which
             # are not specified in the template (e.g the deployments data)
-            meta = self.metadata_get(refresh=True) or {}
-            tmpl_meta = self.t.metadata()
-            meta.update(tmpl_meta)
+            meta = self.refreshed_metadata(self.metadata_get(refresh=True))
             self.metadata_set(meta)
 
+    def refreshed_metadata(self, metadata):
+        meta = dict(metadata or {})
+        tmpl_meta = self.t.metadata()
+        meta.update(tmpl_meta)
+        return meta
+
     @staticmethod
     def _check_maximum(count, maximum, msg):
         """Check a count against a maximum.
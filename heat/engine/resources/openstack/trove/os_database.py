@@ -397,6 +397,7 @@ class OSDBInstance(resource.Resource):
         instance = self._refresh_instance(instance_id)  # refresh attributes
         if instance is None:
             return False
+        self.poll_status = instance.status
         if instance.status in self.BAD_STATUSES:
             raise exception.ResourceInError(
                 resource_status=instance.status,
@@ -53,6 +53,10 @@ class StackResource(resource.Resource):
     # template parsing.
     requires_deferred_auth = True
 
+    # Attribute values come from the nested stack, which may change without
+    # any change to the state of this resource or its stack
+    persist_attributes = False
+
     def __init__(self, name, json_snippet, stack):
         super(StackResource, self).__init__(name, json_snippet, stack)
         self._nested = None
@@ -112,6 +116,11 @@ class StackResource(resource.Resource):
 
         return True
 
+    def can_skip_unchanged_update(self):
+        # The nested stack is always updated, so that its resources can
+        # decide for themselves whether they need updating.
+        return False
+
     @scheduler.wrappertask
     def update(self, after, before=None, prev_resource=None):
         try:
@@ -331,7 +340,7 @@ class StackResource(resource.Resource):
             return {
                 'template': parsed_template.t,
                 'params': child_env.user_env_as_dict(),
-                'files': parsed_template.files,
+                'files': parsed_template.files.to_dict(),
             }
 
     def raise_local_exception(self, ex):
@@ -377,6 +386,7 @@ class StackResource(resource.Resource):
             return False
 
         action, status, status_reason, updated_time = data
+        self.poll_status = (action, status, updated_time)
 
         if action != expected_action:
             return False
@@ -470,13 +480,33 @@ class StackResource(resource.Resource):
         return self._check_status_complete(self.UPDATE,
                                            cookie=cookie)
 
-    def delete_nested(self):
-        """Delete the nested stack."""
+    def backend_service(self):
+        # Nested stacks are managed by the engines through RPC
+        return 'heat'
+
+    def _nested_identity(self):
+        if self._nested is None and self.resource_id is not None:
+            # The record is enough to identify the nested stack. Its
+            # template and resources are loaded by whichever engine handles
+            # the RPC call, so there is no need to load them here too.
+            st = stack_object.Stack.get_by_id(self.context, self.resource_id,
+                                              show_deleted=True)
+            if st is None:
+                return None
+            return identifier.HeatIdentifier(st.tenant, st.name, st.id)
+
         stack = self.nested()
         if stack is None:
+            return None
+        return stack.identifier()
+
+    def delete_nested(self):
+        """Delete the nested stack."""
+        nested_identity = self._nested_identity()
+        if nested_identity is None:
             return
 
-        stack_identity = dict(stack.identifier())
+        stack_identity = dict(nested_identity)
 
         try:
             if self.abandon_in_progress:
@@ -287,6 +287,9 @@ class TemplateResource(stack_resource.StackResource):
         if new_metadata is None:
             self.metadata_set(self.t.metadata())
 
+    def refreshed_metadata(self, metadata):
+        return self.t.metadata()
+
     def handle_update(self, json_snippet, tmpl_diff, prop_diff):
         return self.update_with_template(self.child_template(),
                                          self.child_params())
@@ -43,6 +43,7 @@ class BaseVolume(resource.Resource):
 
     def check_create_complete(self, vol_id):
         vol = self.client().volumes.get(vol_id)
+        self.poll_status = vol.status
 
         if vol.status == 'available':
             return True
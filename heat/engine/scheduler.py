@@ -11,6 +11,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import math
+import random
 import sys
 import types
 
@@ -32,6 +35,9 @@ LOG = logging.getLogger(__name__)
 # Whether TaskRunner._sleep actually does an eventlet sleep when called.
 ENABLE_SLEEP = True
 
+# Number of polls made by PollBackoff instances in this process, by key.
+_poll_counts = collections.Counter()
+
 
 def task_description(task):
     """Return a human-readable string description of a task.
@@ -348,13 +354,112 @@ def wrappertask(task):
     return wrapper
 
 
+class ConcurrencyLimiter(object):
+    """Bound the number of tasks running at once for each of a set of keys.
+
+    A limiter may be shared by any number of task groups running in the same
+    process, in which case the bound applies across all of them. The key of
+    each task is given by the key function; tasks with a key of None are not
+    limited. The limit may be a callable, so that it is read each time a task
+    is started.
+    """
+
+    def __init__(self, limit, key):
+        self._limit = limit
+        self.key = key
+        self._running = collections.Counter()
+
+    @property
+    def limit(self):
+        return self._limit() if callable(self._limit) else self._limit
+
+    def acquire(self, obj):
+        """Take a slot for the task on obj, if one is free.
+
+        Returns True if the task may start. Each successful acquire must be
+        matched by a release once the task is done.
+        """
+        key = self.key(obj)
+        if key is None:
+            return True
+        limit = self.limit
+        if limit and self._running[key] >= limit:
+            return False
+        self._running[key] += 1
+        return True
+
+    def release(self, obj):
+        key = self.key(obj)
+        if key is None or not self._running[key]:
+            return
+        self._running[key] -= 1
+        if not self._running[key]:
+            del self._running[key]
+
+    def running(self, key):
+        """Return the number of tasks running for a key."""
+        return self._running[key]
+
+
+def poll_counts():
+    """Return the number of polls made in this process, by key."""
+    return dict(_poll_counts)
+
+
+class PollBackoff(object):
+    """Adaptive period between polls of a task waiting on something else.
+
+    The period, in steps of the TaskRunner, starts at one and doubles after
+    each poll that observes no change in status, up to the ceiling. Any
+    change in the observed status resets the period to a single step. A
+    random jitter of up to the given fraction of any longer period, rounded
+    up to a whole step, is added so that tasks started together do not keep
+    polling in lockstep.
+
+    If require_status is set, polls that observe no status at all are not
+    backed off, since nothing is known about how long the wait may be.
+
+    Each poll is counted against the key, if one is given.
+    """
+
+    def __init__(self, ceiling, jitter=0.0, key=None, require_status=False):
+        self.ceiling = max(int(ceiling), 1)
+        self.jitter = jitter
+        self.key = key
+        self.require_status = require_status
+        self.polls = 0
+        self._attempt = 0
+        self._status = None
+
+    def period(self, status=None):
+        """Record a poll and return the number of steps until the next one."""
+        self.polls += 1
+        if self.key is not None:
+            _poll_counts[self.key] += 1
+
+        if status != self._status:
+            self._status = status
+            self._attempt = 0
+        if status is None and self.require_status:
+            return 1
+
+        period = int(min(timeutils.retry_backoff_delay(self._attempt),
+                         self.ceiling))
+        if period < self.ceiling:
+            self._attempt += 1
+        if self.jitter and period > 1:
+            # Periods are whole steps, so the jitter must be too
+            period += random.randint(0, int(math.ceil(self.jitter * period)))
+        return max(period, 1)
+
+
 @repr_wrapper
 class DependencyTaskGroup(object):
     """Task which manages group of subtasks that have ordering dependencies."""
 
     def __init__(self, dependencies, task=lambda o: o(),
                  reverse=False, name=None, error_wait_time=None,
-                 aggregate_exceptions=False):
+                 aggregate_exceptions=False, limiter=None):
         """Initialise with the task dependencies.
 
         A task to run on each dependency may optionally be specified.  If no
@@ -371,12 +476,18 @@ class DependencyTaskGroup(object):
         will not be cancelled in the event of an error (operations downstream
         of the error will be cancelled). Once all chains are complete, any
         errors will be rolled up into an ExceptionGroup exception.
+
+        If a ConcurrencyLimiter is specified, ready tasks are started only
+        while the limiter has a slot free for them; the others wait until a
+        running task completes.
         """
         self._keys = list(dependencies)
         self._runners = dict((o, TaskRunner(task, o)) for o in self._keys)
         self._graph = dependencies.graph(reverse=reverse)
         self.error_wait_time = error_wait_time
         self.aggregate_exceptions = aggregate_exceptions
+        self.limiter = limiter
+        self._limited = set()
 
         if name is None:
             name = '(%s) %s' % (getattr(task, '__name__',
@@ -392,28 +503,44 @@ class DependencyTaskGroup(object):
     def __call__(self):
         """Return a co-routine which runs the task group."""
         raised_exceptions = []
-        while any(six.itervalues(self._runners)):
-            try:
-                for k, r in self._ready():
-                    r.start()
-                    if not r:
-                        del self._graph[k]
-
-                yield
-
-                for k, r in self._running():
-                    if r.step():
-                        del self._graph[k]
-            except Exception:
-                exc_info = sys.exc_info()
-                if self.aggregate_exceptions:
-                    self._cancel_recursively(k, r)
-                else:
-                    self.cancel_all(grace_period=self.error_wait_time)
-                raised_exceptions.append(exc_info)
-            except:  # noqa
-                with excutils.save_and_reraise_exception():
-                    self.cancel_all()
+        try:
+            while any(six.itervalues(self._runners)):
+                # The subtask being started or stepped, if any
+                current = None
+                try:
+                    for k, r in self._ready():
+                        if not self._acquire(k):
+                            continue
+                        current = k, r
+                        r.start()
+                        if not r:
+                            self._release(k)
+                            del self._graph[k]
+                        current = None
+
+                    yield
+
+                    for k, r in self._running():
+                        current = k, r
+                        if r.step():
+                            self._release(k)
+                            del self._graph[k]
+                        current = None
+                except Exception:
+                    exc_info = sys.exc_info()
+                    if current is not None:
+                        self._release(current[0])
+                    if self.aggregate_exceptions and current is not None:
+                        self._cancel_recursively(*current)
+                    else:
+                        self.cancel_all(grace_period=self.error_wait_time)
+                    raised_exceptions.append(exc_info)
+                except:  # noqa
+                    with excutils.save_and_reraise_exception():
+                        self.cancel_all()
+        finally:
+            for k in list(self._limited):
+                self._release(k)
 
         if raised_exceptions:
             try:
@@ -425,6 +552,19 @@ class DependencyTaskGroup(object):
             finally:
                 del raised_exceptions
 
+    def _acquire(self, key):
+        if self.limiter is None:
+            return True
+        if not self.limiter.acquire(key):
+            return False
+        self._limited.add(key)
+        return True
+
+    def _release(self, key):
+        if key in self._limited:
+            self._limited.remove(key)
+            self.limiter.release(key)
+
     def cancel_all(self, grace_period=None):
         for r in six.itervalues(self._runners):
             r.cancel(grace_period=grace_period)
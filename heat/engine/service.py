@@ -42,6 +42,7 @@ from heat.common import identifier
 from heat.common import messaging as rpc_messaging
 from heat.common import policy
 from heat.common import service_utils
+from heat.db import query_stats
 from heat.engine import api
 from heat.engine import attributes
 from heat.engine.cfn import template as cfntemplate
@@ -61,6 +62,7 @@ from heat.engine import template as templatem
 from heat.engine import update
 from heat.engine import watchrule
 from heat.engine import worker
+from heat.objects import engine_lease as engine_lease_object
 from heat.objects import event as event_object
 from heat.objects import resource as resource_objects
 from heat.objects import service as service_objects
@@ -79,10 +81,19 @@ cfg.CONF.import_opt('max_stacks_per_tenant', 'heat.common.config')
 cfg.CONF.import_opt('enable_stack_abandon', 'heat.common.config')
 cfg.CONF.import_opt('enable_stack_adopt', 'heat.common.config')
 cfg.CONF.import_opt('convergence_engine', 'heat.common.config')
+cfg.CONF.import_opt('event_prune_interval', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
 
+class SignalQueue(object):
+    """Signals to the resources of a loaded stack, waiting to be processed."""
+
+    def __init__(self, stack):
+        self.stack = stack
+        self.signals = collections.deque()
+
+
 class ThreadGroupManager(object):
 
     def __init__(self):
@@ -119,7 +130,8 @@ class ThreadGroupManager(object):
             profiler.init(**trace)
         if cnxt is not None:
             cnxt.update_store()
-        return func(*args, **kwargs)
+        with query_stats.inherit(kwargs.pop('_query_stats', None)):
+            return func(*args, **kwargs)
 
     def start(self, stack_id, func, *args, **kwargs):
         """Run the given method in a sub-thread."""
@@ -135,9 +147,11 @@ class ThreadGroupManager(object):
                 pass
 
         req_cnxt = oslo_context.get_current()
+        stats = query_stats.current()
         th = self.groups[stack_id].add_thread(self._start_with_trace, req_cnxt,
                                               self._serialize_profile_info(),
-                                              func, *args, **kwargs)
+                                              func, *args,
+                                              _query_stats=stats, **kwargs)
         th.link(log_exceptions)
         return th
 
@@ -298,7 +312,10 @@ class EngineService(service.Service):
     by the RPC caller.
     """
 
-    RPC_API_VERSION = '1.29'
+    RPC_API_VERSION = '1.31'
+
+    EVENT_PRUNE_LEASE = 'event_prune'
+    RESOURCE_COUNT_LEASE = 'resource_count_reconcile'
 
     def __init__(self, host, topic):
         super(EngineService, self).__init__()
@@ -320,6 +337,8 @@ class EngineService(service.Service):
         self.manage_thread_grp = None
         self._rpc_server = None
         self.software_config = service_software_config.SoftwareConfigService()
+        # Queues of asynchronous signals, keyed by stack ID
+        self._signal_queues = {}
         self.resource_enforcer = policy.ResourceEnforcer()
 
         if cfg.CONF.trusts_delegated_roles:
@@ -336,19 +355,14 @@ class EngineService(service.Service):
         if self.thread_group_mgr is None:
             self.thread_group_mgr = ThreadGroupManager()
         self.stack_watch = service_stack_watch.StackWatch(
-            self.thread_group_mgr)
+            self.thread_group_mgr, self.host)
 
         def create_watch_tasks():
             while True:
                 try:
-                    # Create a periodic_watcher_task per-stack
+                    # Create the engine-wide periodic_watcher_task
                     admin_context = context.get_admin_context()
-                    stacks = stack_object.Stack.get_all(
-                        admin_context,
-                        tenant_safe=False,
-                        show_hidden=True)
-                    for s in stacks:
-                        self.stack_watch.start_watch_task(s.id, admin_context)
+                    self.stack_watch.start_all(admin_context)
                     LOG.info(_LI("Watch tasks created"))
                     return
                 except Exception as e:
@@ -394,6 +408,13 @@ class EngineService(service.Service):
         self.manage_thread_grp.add_timer(cfg.CONF.periodic_interval,
                                          self.service_manage_report)
         self.manage_thread_grp.add_thread(self.reset_stack_status)
+        if cfg.CONF.event_prune_interval:
+            self.manage_thread_grp.add_timer(cfg.CONF.event_prune_interval,
+                                             self.prune_events)
+        if cfg.CONF.resource_count_reconcile_interval:
+            self.manage_thread_grp.add_timer(
+                cfg.CONF.resource_count_reconcile_interval,
+                self.reconcile_resource_counts)
 
         super(EngineService, self).start()
 
@@ -502,7 +523,8 @@ class EngineService(service.Service):
         return s
 
     @context.request_context
-    def show_stack(self, cnxt, stack_identity, resolve_outputs=True):
+    def show_stack(self, cnxt, stack_identity, resolve_outputs=True,
+                   resolve_live=False):
         """Return detailed information about one or all stacks.
 
         :param cnxt: RPC context.
@@ -510,6 +532,8 @@ class EngineService(service.Service):
             to show all
         :param resolve_outputs: If True, outputs for given stack/stacks will
             be resolved
+        :param resolve_live: If True, outputs are resolved even if values
+            stored with the stack are still current
         """
         if stack_identity is not None:
             db_stack = self._get_stack(cnxt, stack_identity, show_deleted=True)
@@ -518,8 +542,16 @@ class EngineService(service.Service):
         else:
             stacks = parser.Stack.load_all(cnxt, resolve_data=resolve_outputs)
 
-        return [api.format_stack(
-            stack, resolve_outputs=resolve_outputs) for stack in stacks]
+        def format_stack(stack):
+            info = api.format_stack(stack, resolve_outputs=resolve_outputs,
+                                    resolve_live=resolve_live)
+            # Only a single stack is worth the write; a listing of every
+            # stack would store outputs that may never be read again
+            if stack_identity is not None:
+                stack.store_cached_outputs()
+            return info
+
+        return [format_stack(stack) for stack in stacks]
 
     def get_revision(self, cnxt):
         return cfg.CONF.revision['heat_revision']
@@ -538,7 +570,7 @@ class EngineService(service.Service):
 
         :param cnxt: RPC context
         :param limit: the number of stacks to list (integer or string)
-        :param marker: the ID of the last item in the previous page
+        :param marker: the cursor or ID of the last item in the previous page
         :param sort_keys: an array of fields used to sort the list
         :param sort_dir: the direction of the sort ('asc' or 'desc')
         :param filters: a dict with attribute:value to filter the list
@@ -567,7 +599,12 @@ class EngineService(service.Service):
                                        tags=tags, tags_any=tags_any,
                                        not_tags=not_tags,
                                        not_tags_any=not_tags_any)
-        return [api.format_stack(stack) for stack in stacks]
+        results = []
+        for stack in stacks:
+            result = api.format_stack(stack)
+            result[rpc_api.LIST_CURSOR] = api.stack_cursor(stack)
+            results.append(result)
+        return results
 
     @context.request_context
     def count_stacks(self, cnxt, filters=None, tenant_safe=True,
@@ -1295,12 +1332,15 @@ class EngineService(service.Service):
         return api.format_stack_outputs(stack, stack.t[stack.t.OUTPUTS])
 
     @context.request_context
-    def show_output(self, cntx, stack_identity, output_key):
+    def show_output(self, cntx, stack_identity, output_key,
+                    resolve_live=False):
         """Returns dict with specified output key, value and description.
 
         :param cntx: RPC context.
         :param stack_identity: Name of the stack you want to see.
         :param output_key: key of desired stack output.
+        :param resolve_live: If True, the output is resolved even if a value
+            stored with the stack is still current.
         :return: dict with output key, value and description in defined format.
         """
         s = self._get_stack(cntx, stack_identity)
@@ -1316,7 +1356,10 @@ class EngineService(service.Service):
         if not stack.outputs:
             stack.outputs.update({output_key: output})
 
-        return api.format_stack_output(stack, {output_key: output}, output_key)
+        result = api.format_stack_output(stack, {output_key: output},
+                                         output_key, resolve_live=resolve_live)
+        stack.store_cached_outputs()
+        return result
 
     def _remote_call(self, cnxt, lock_engine_id, call, **kwargs):
         timeout = cfg.CONF.engine_life_check_timeout
@@ -1565,7 +1608,8 @@ class EngineService(service.Service):
         :param stack_identity: Name of the stack you want to get events for
         :param filters: a dict with attribute:value to filter the list
         :param limit: the number of events to list (integer or string)
-        :param marker: the ID of the last event in the previous page
+        :param marker: the cursor or ID of the last event in the previous
+                       page
         :param sort_keys: an array of fields used to sort the list
         :param sort_dir: the direction of the sort ('asc' or 'desc').
         """
@@ -1596,10 +1640,13 @@ class EngineService(service.Service):
                 stacks[stack_id] = parser.Stack.load(cnxt, stack_id)
             return stacks[stack_id]
 
-        return [api.format_event(evt.Event.load(cnxt,
-                                                e.id, e,
-                                                get_stack(e.stack_id)))
-                for e in events]
+        results = []
+        for e in events:
+            event = evt.Event.load(cnxt, e.id, e, get_stack(e.stack_id))
+            result = api.format_event(event)
+            result[rpc_api.LIST_CURSOR] = api.event_cursor(event)
+            results.append(result)
+        return results
 
     def _authorize_stack_user(self, cnxt, stack, resource_name):
         """Filter access to describe_stack_resource for in-instance users.
@@ -1660,29 +1707,19 @@ class EngineService(service.Service):
                           implementation.
         """
 
-        def _resource_signal(stack, rsrc, details, need_check):
-            LOG.debug("signaling resource %s:%s" % (stack.name, rsrc.name))
-            needs_metadata_updates = rsrc.signal(details, need_check)
-
-            if not needs_metadata_updates:
-                return
-
-            # Refresh the metadata for all other resources, since signals can
-            # update metadata which is used by other resources, e.g
-            # when signalling a WaitConditionHandle resource, and other
-            # resources may refer to WaitCondition Fn::GetAtt Data
-            for r in stack.dependencies:
-                if (r.name != rsrc.name and r.id is not None and
-                        r.action != r.INIT):
-                    r.metadata_update()
-
         s = self._get_stack(cnxt, stack_identity)
 
-        # This is not "nice" converting to the stored context here,
-        # but this happens because the keystone user associated with the
-        # signal doesn't have permission to read the secret key of
-        # the user associated with the cfn-credentials file
-        stack = parser.Stack.load(cnxt, stack=s, use_stored_context=True)
+        # Signals sent while earlier signals to the stack are still queued
+        # are checked against, and processed with, the already loaded stack.
+        queue = None if sync_call else self._signal_queues.get(s.id)
+        if queue is not None:
+            stack = queue.stack
+        else:
+            # This is not "nice" converting to the stored context here,
+            # but this happens because the keystone user associated with the
+            # signal doesn't have permission to read the secret key of
+            # the user associated with the cfn-credentials file
+            stack = parser.Stack.load(cnxt, stack=s, use_stored_context=True)
         self._verify_stack_resource(stack, resource_name)
 
         rsrc = stack[resource_name]
@@ -1691,11 +1728,86 @@ class EngineService(service.Service):
             rsrc._signal_check_action()
             rsrc._signal_check_hook(details)
             if sync_call:
-                _resource_signal(stack, rsrc, details, False)
+                LOG.debug("signaling resource %s:%s" % (stack.name,
+                                                        rsrc.name))
+                if rsrc.signal(details, False):
+                    self._refresh_signalled_metadata(stack, [rsrc])
                 return rsrc.metadata_get()
             else:
-                self.thread_group_mgr.start(stack.id, _resource_signal,
-                                            stack, rsrc, details, False)
+                self._queue_signal(stack, rsrc.name, details)
+
+    def _queue_signal(self, stack, resource_name, details):
+        """Queue a signal to be processed asynchronously.
+
+        Signals queued for a stack before the queue has been processed are
+        all processed with the same loaded stack.
+        """
+        queue = self._signal_queues.get(stack.id)
+        if queue is None:
+            queue = SignalQueue(stack)
+            self._signal_queues[stack.id] = queue
+            th = self.thread_group_mgr.start(stack.id,
+                                             self._process_signal_queue,
+                                             queue)
+            th.link(lambda gt: self._remove_signal_queue(queue))
+        queue.signals.append((resource_name, details))
+
+    def _remove_signal_queue(self, queue):
+        if self._signal_queues.get(queue.stack.id) is queue:
+            del self._signal_queues[queue.stack.id]
+
+    def _refresh_queued_stack(self, queue):
+        """Reload the stack of a signal queue if it has changed since loaded.
+
+        Returns None if the stack no longer exists.
+        """
+        stack = queue.stack
+        s = stack_object.Stack.get_by_id(stack.context, stack.id)
+        if s is None:
+            return None
+        if (s.raw_template_id != stack.t.id or
+                s.current_traversal != stack.current_traversal or
+                s.updated_at != stack.updated_time):
+            LOG.debug('Reloading stack %s to process queued signals',
+                      stack.name)
+            queue.stack = parser.Stack.load(stack.context, stack=s)
+        return queue.stack
+
+    def _process_signal_queue(self, queue):
+        stack = queue.stack
+        signalled = []
+        while queue.signals:
+            name, details = queue.signals.popleft()
+            # The stack may have been updated since the signal was queued
+            stack = self._refresh_queued_stack(queue)
+            if stack is None or name not in stack:
+                LOG.warning(_LW('Resource %(name)s of stack %(stack)s no '
+                                'longer exists; discarding its signal'),
+                            {'name': name, 'stack': queue.stack.name})
+                continue
+            rsrc = stack[name]
+            LOG.debug("signaling resource %s:%s" % (stack.name, rsrc.name))
+            try:
+                if rsrc.signal(details, False):
+                    signalled.append(name)
+            except Exception:
+                LOG.exception(_LE('Failed to signal resource %s'),
+                              six.text_type(rsrc))
+
+        # Signals received from now on are queued for a fresh stack
+        self._remove_signal_queue(queue)
+        if stack is not None:
+            self._refresh_signalled_metadata(
+                stack, [stack[n] for n in signalled if n in stack])
+
+    def _refresh_signalled_metadata(self, stack, signalled):
+        # Signals can update metadata which is used by other resources, e.g
+        # when signalling a WaitConditionHandle resource, and other resources
+        # may refer to WaitCondition Fn::GetAtt Data. Refresh the metadata of
+        # those resources only.
+        dependents = stack.metadata_dependents(signalled)
+        if dependents:
+            stack.metadata_refresh(dependents)
 
     @context.request_context
     def resource_mark_unhealthy(self, cnxt, stack_identity, resource_name,
@@ -1931,7 +2043,14 @@ class EngineService(service.Service):
             if watch_name:
                 yield watchrule.WatchRule.load(cnxt, watch_name)
             else:
-                for wr in watch_rule.WatchRule.get_all(cnxt):
+                index = watchrule.rule_index
+                for wid in index.candidates(cnxt, stats_data):
+                    wr = watch_rule.WatchRule.get_by_id(cnxt, wid)
+                    if wr is None:
+                        index.remove(wid)
+                        continue
+                    # Resync the entry in case another engine changed it
+                    index.add(wr.id, wr.rule)
                     if watchrule.rule_can_use_sample(wr, stats_data):
                         yield watchrule.WatchRule.load(cnxt, watch=wr)
 
@@ -2056,6 +2175,12 @@ class EngineService(service.Service):
         return self.software_config.metadata_software_deployments(
             cnxt, server_id)
 
+    @context.request_context
+    def poll_metadata_software_deployments(self, cnxt, server_id, etag=None,
+                                           timeout=0):
+        return self.software_config.poll_metadata_software_deployments(
+            cnxt, server_id, etag, timeout)
+
     @context.request_context
     def show_software_deployment(self, cnxt, deployment_id):
         return self.software_config.show_software_deployment(
@@ -2161,6 +2286,53 @@ class EngineService(service.Service):
                 LOG.debug('Service %s was aborted' % service_ref['id'])
                 service_objects.Service.delete(cnxt, service_ref['id'])
 
+    def prune_events(self):
+        """Enforce the event retention limits across all stacks.
+
+        Only the engine holding the event pruning lease does any work; the
+        lease is renewed on every run and lapses if that engine goes away.
+        """
+        max_events = cfg.CONF.max_events_per_stack
+        retention_days = cfg.CONF.event_retention_days
+        if not (max_events or retention_days):
+            return
+        lease_time = 2 * cfg.CONF.event_prune_interval
+        if not engine_lease_object.EngineLease.acquire(
+                self.EVENT_PRUNE_LEASE, self.engine_id, lease_time):
+            return
+        max_age = None
+        if retention_days:
+            max_age = datetime.timedelta(days=retention_days)
+        try:
+            deleted = event_object.Event.prune(
+                context.get_admin_context(),
+                max_events=max_events, max_age=max_age,
+                batch_size=cfg.CONF.event_purge_batch_size)
+        except Exception:
+            LOG.exception(_LE('Failed to prune events'))
+            return
+        if deleted:
+            LOG.info(_LI('Pruned %d events'), deleted)
+
+    def reconcile_resource_counts(self):
+        """Correct any drift in the cached resource counts of root stacks.
+
+        Only the engine holding the reconciliation lease does any work.
+        """
+        lease_time = 2 * cfg.CONF.resource_count_reconcile_interval
+        if not engine_lease_object.EngineLease.acquire(
+                self.RESOURCE_COUNT_LEASE, self.engine_id, lease_time):
+            return
+        try:
+            corrected = stack_object.Stack.reconcile_resource_counts(
+                context.get_admin_context())
+        except Exception:
+            LOG.exception(_LE('Failed to reconcile resource counts'))
+            return
+        if corrected:
+            LOG.warning(_LW('Corrected the resource counts of %d stacks'),
+                        corrected)
+
     def set_stack_and_resource_to_failed(self, stack):
         for name, rsrc in six.iteritems(stack.resources):
             if rsrc.status == rsrc.IN_PROGRESS:
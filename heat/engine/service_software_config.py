@@ -11,8 +11,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+import collections
 import uuid
 
+import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_service import service
@@ -24,6 +28,7 @@ from six.moves.urllib import parse as urlparse
 from heat.common import crypt
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common.i18n import _LE
 from heat.common.i18n import _LI
 from heat.db import api as db_api
 from heat.engine import api
@@ -33,11 +38,29 @@ from heat.objects import software_config as software_config_object
 from heat.objects import software_deployment as software_deployment_object
 from heat.rpc import api as rpc_api
 
+cfg.CONF.import_opt('deployment_metadata_push_delay', 'heat.common.config')
+cfg.CONF.import_opt('deployment_metadata_max_wait', 'heat.common.config')
+cfg.CONF.import_opt('deployment_metadata_max_waiters', 'heat.common.config')
+
 LOG = logging.getLogger(__name__)
 
 
 class SoftwareConfigService(service.Service):
 
+    # Seconds between reads of the metadata of a server while waiting for it
+    # to change
+    METADATA_RECHECK_INTERVAL = 5
+
+    def __init__(self):
+        super(SoftwareConfigService, self).__init__()
+        # IDs of servers with a metadata push waiting to be sent
+        self._pending_pushes = set()
+        # Events sent when the deployments metadata of a server changes,
+        # keyed by server ID
+        self._metadata_waiters = {}
+        # Number of requests waiting for the metadata of each server
+        self._metadata_polls = collections.Counter()
+
     def show_software_config(self, cnxt, config_id):
         sc = software_config_object.SoftwareConfig.get_by_id(cnxt, config_id)
         return api.format_software_config(sc)
@@ -86,26 +109,169 @@ class SoftwareConfigService(service.Service):
         flt_sd = six.moves.filterfalse(lambda sd: sd.config is None,
                                        all_sd)
         # sort the configs by config name, to give the list of metadata a
-        # deterministic and controllable order.
-        flt_sd_s = sorted(flt_sd, key=lambda sd: sd.config.name)
+        # deterministic and controllable order. Unnamed configs sort first.
+        flt_sd_s = sorted(flt_sd, key=lambda sd: sd.config.name or '')
         result = [api.format_software_config(sd.config) for sd in flt_sd_s]
         return result
 
+    def _stored_deployments_metadata(self, cnxt, server_id):
+        """Return the stored deployments metadata of a server and its ETag.
+
+        The metadata is read from the server's resource row, so no stack is
+        loaded. If the server has no stored deployments metadata it is built
+        from the deployments and no ETag is returned.
+        """
+        rs = db_api.resource_get_by_physical_resource_id(cnxt, server_id)
+        md = rs.rsrc_metadata if rs is not None else None
+        if not md or 'deployments' not in md:
+            return self.metadata_software_deployments(cnxt, server_id), None
+        return md['deployments'], '%s-%s' % (rs.id, rs.rsrc_metadata_version)
+
+    def poll_metadata_software_deployments(self, cnxt, server_id, etag=None,
+                                           timeout=0):
+        """Return the deployments metadata of a server if it has changed.
+
+        If etag matches the current ETag of the metadata, wait for up to
+        timeout seconds (capped at deployment_metadata_max_wait) for the
+        metadata to change, returning None as the metadata if it doesn't.
+        Once deployment_metadata_max_waiters requests are waiting, further
+        requests are answered immediately.
+        """
+        if not server_id:
+            raise ValueError(_('server_id must be specified'))
+        timeout = min(timeout or 0, cfg.CONF.deployment_metadata_max_wait)
+        # Each waiting request holds one of the engine's RPC workers
+        if (etag is None or sum(six.itervalues(self._metadata_polls)) >=
+                cfg.CONF.deployment_metadata_max_waiters):
+            timeout = 0
+        if not timeout:
+            return self._poll_metadata(cnxt, server_id, etag, timeout)
+
+        self._metadata_polls[server_id] += 1
+        try:
+            return self._poll_metadata(cnxt, server_id, etag, timeout)
+        finally:
+            self._metadata_polls[server_id] -= 1
+            if not self._metadata_polls[server_id]:
+                del self._metadata_polls[server_id]
+                self._metadata_waiters.pop(server_id, None)
+
+    def _poll_metadata(self, cnxt, server_id, etag, timeout):
+        watch = timeutils.StopWatch(duration=timeout).start()
+        while True:
+            # Register for changes before reading the metadata, so that a
+            # change made while it is being read is not missed.
+            if timeout:
+                waiter = self._metadata_waiters.setdefault(
+                    server_id, eventlet.event.Event())
+            metadata, current = self._stored_deployments_metadata(cnxt,
+                                                                  server_id)
+            if etag is None or current != etag:
+                break
+            if not timeout or watch.expired():
+                metadata = None
+                break
+            # Changes made by other engines are not notified, so re-read
+            # the metadata periodically while waiting.
+            with eventlet.Timeout(min(watch.leftover(),
+                                      self.METADATA_RECHECK_INTERVAL),
+                                  False):
+                waiter.wait()
+        return {rpc_api.SOFTWARE_DEPLOYMENT_METADATA: metadata,
+                rpc_api.SOFTWARE_DEPLOYMENT_METADATA_ETAG: current}
+
+    def _notify_metadata_waiters(self, server_id):
+        waiter = self._metadata_waiters.pop(server_id, None)
+        if waiter is not None:
+            waiter.send()
+
+    @staticmethod
+    def _merge_deployments_metadata(deployments, remove_config_id=None,
+                                    add_config=None):
+        """Apply a single deployment change to a deployments metadata list.
+
+        The list is kept sorted by config name, as built by
+        metadata_software_deployments().
+        """
+        deployments = list(deployments)
+        if remove_config_id is not None:
+            for i, config in enumerate(deployments):
+                if config.get(rpc_api.SOFTWARE_CONFIG_ID) == remove_config_id:
+                    del deployments[i]
+                    break
+        if add_config is not None:
+            names = [c.get(rpc_api.SOFTWARE_CONFIG_NAME) or ''
+                     for c in deployments]
+            index = bisect.bisect_right(
+                names, add_config.get(rpc_api.SOFTWARE_CONFIG_NAME) or '')
+            deployments.insert(index, add_config)
+        return deployments
+
     @resource_objects.retry_on_conflict
     def _push_metadata_software_deployments(
-            self, cnxt, server_id, stack_user_project_id):
+            self, cnxt, server_id, stack_user_project_id,
+            remove_config_id=None, add_config=None):
+        """Update the deployments in a server's metadata and push them.
+
+        When the ID of a config to remove or a formatted config to add is
+        given, only that change is applied to the deployments already in the
+        server metadata; otherwise the list is rebuilt from all of the
+        server's deployments.
+        """
         rs = db_api.resource_get_by_physical_resource_id(cnxt, server_id)
         if not rs:
             return
-        deployments = self.metadata_software_deployments(cnxt, server_id)
         md = rs.rsrc_metadata or {}
+        if ('deployments' in md and
+                (remove_config_id is not None or add_config is not None)):
+            deployments = self._merge_deployments_metadata(
+                md['deployments'], remove_config_id, add_config)
+        else:
+            deployments = self.metadata_software_deployments(cnxt, server_id)
         md['deployments'] = deployments
         rows_updated = db_api.resource_update(
             cnxt, rs.id, {'rsrc_metadata': md}, rs.atomic_key)
         if not rows_updated:
             action = _('deployments of server %s') % server_id
             raise exception.ConcurrentTransaction(action=action)
+        self._notify_metadata_waiters(server_id)
+
+        delay = cfg.CONF.deployment_metadata_push_delay
+        if delay > 0:
+            self._schedule_metadata_push(cnxt, server_id,
+                                         stack_user_project_id, delay)
+        else:
+            self._push_metadata(cnxt, rs, md, stack_user_project_id)
 
+    def _schedule_metadata_push(self, cnxt, server_id, stack_user_project_id,
+                                delay):
+        """Push the server metadata after a delay.
+
+        Any other changes to the server's deployments made before the push
+        is sent are included in the same push.
+        """
+        if server_id in self._pending_pushes:
+            return
+        self._pending_pushes.add(server_id)
+
+        def push():
+            eventlet.sleep(delay)
+            # Remove the pending entry before reading the metadata, so that
+            # any later change schedules a new push.
+            self._pending_pushes.discard(server_id)
+            try:
+                rs = db_api.resource_get_by_physical_resource_id(cnxt,
+                                                                 server_id)
+                if rs:
+                    self._push_metadata(cnxt, rs, rs.rsrc_metadata or {},
+                                        stack_user_project_id)
+            except Exception:
+                LOG.exception(_LE('Failed to push metadata for server %s'),
+                              server_id)
+
+        self.tg.add_thread(push)
+
+    def _push_metadata(self, cnxt, rs, md, stack_user_project_id):
         metadata_put_url = None
         metadata_queue_id = None
         for rd in rs.data:
@@ -246,7 +412,8 @@ class SoftwareConfigService(service.Service):
             'status': status,
             'status_reason': status_reason})
         self._push_metadata_software_deployments(
-            cnxt, server_id, stack_user_project_id)
+            cnxt, server_id, stack_user_project_id,
+            add_config=api.format_software_config(sd.config))
         return api.format_software_deployment(sd)
 
     def signal_software_deployment(self, cnxt, deployment_id, details,
@@ -332,6 +499,11 @@ class SoftwareConfigService(service.Service):
         else:
             update_data['updated_at'] = timeutils.utcnow()
 
+        if config_id:
+            old_config_id = (
+                software_deployment_object.SoftwareDeployment.get_by_id(
+                    cnxt, deployment_id).config_id)
+
         sd = software_deployment_object.SoftwareDeployment.update_by_id(
             cnxt, deployment_id, update_data)
 
@@ -339,7 +511,9 @@ class SoftwareConfigService(service.Service):
         # changing, since metadata is just a list of configs
         if config_id:
             self._push_metadata_software_deployments(
-                cnxt, sd.server_id, sd.stack_user_project_id)
+                cnxt, sd.server_id, sd.stack_user_project_id,
+                remove_config_id=old_config_id,
+                add_config=api.format_software_config(sd.config))
 
         return api.format_software_deployment(sd)
 
@@ -349,4 +523,5 @@ class SoftwareConfigService(service.Service):
         software_deployment_object.SoftwareDeployment.delete(
             cnxt, deployment_id)
         self._push_metadata_software_deployments(
-            cnxt, sd.server_id, sd.stack_user_project_id)
+            cnxt, sd.server_id, sd.stack_user_project_id,
+            remove_config_id=sd.config_id)
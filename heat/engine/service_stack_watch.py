@@ -11,25 +11,39 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import zlib
+
 from oslo_log import log as logging
+from oslo_utils import encodeutils
 from oslo_utils import timeutils
-import six
 
 from heat.common import context
-from heat.common.i18n import _LE
 from heat.common.i18n import _LW
-from heat.engine import stack
+from heat.common import service_utils
 from heat.engine import watchrule
+from heat.objects import service as service_objects
 from heat.objects import stack as stack_object
 from heat.objects import watch_rule as watch_rule_object
 from heat.rpc import api as rpc_api
 
 LOG = logging.getLogger(__name__)
 
+# Key for the engine-wide watcher timer in the ThreadGroupManager
+WATCH_TASK_GROUP = 'stack_watch'
+
 
 class StackWatch(object):
-    def __init__(self, thread_group_mgr):
+    def __init__(self, thread_group_mgr, host=None):
         self.thread_group_mgr = thread_group_mgr
+        self.host = host
+        self._started = False
+
+    def start(self):
+        """Start the engine-wide periodic watcher task, if not running."""
+        if not self._started:
+            self.thread_group_mgr.add_timer(WATCH_TASK_GROUP,
+                                            self.periodic_watcher_task)
+            self._started = True
 
     def start_watch_task(self, stack_id, cnxt):
 
@@ -56,60 +70,98 @@ class StackWatch(object):
             return start_watch_thread
 
         if stack_has_a_watchrule(stack_id):
-            self.thread_group_mgr.add_timer(
-                stack_id,
-                self.periodic_watcher_task,
-                sid=stack_id)
-
-    def check_stack_watches(self, sid):
-        # Retrieve the stored credentials & create context
-        # Require tenant_safe=False to the stack_get to defeat tenant
-        # scoping otherwise we fail to retrieve the stack
-        LOG.debug("Periodic watcher task for stack %s" % sid)
-        admin_context = context.get_admin_context()
-        db_stack = stack_object.Stack.get_by_id(admin_context,
-                                                sid,
-                                                tenant_safe=False,
-                                                eager_load=True)
-        if not db_stack:
-            LOG.error(_LE("Unable to retrieve stack %s for periodic task"),
-                      sid)
-            return
-        stk = stack.Stack.load(admin_context, stack=db_stack,
-                               use_stored_context=True)
+            self.start()
 
-        # recurse into any nested stacks.
-        children = stack_object.Stack.get_all_by_owner_id(admin_context, sid)
-        for child in children:
-            self.check_stack_watches(child.id)
+    def start_all(self, cnxt):
+        """Reset all watch rules and start the periodic watcher task.
+
+        The last_evaluated time of every rule is reset so that we don't fire
+        off alarms for the time the engine has not been running.
+        """
+        now = timeutils.utcnow()
+        for wr in watch_rule_object.WatchRule.get_all(cnxt):
+            watch_rule_object.WatchRule.update_by_id(
+                cnxt, wr.id,
+                {'last_evaluated': now})
+        self.start()
+
+    def _engine_hosts(self, cnxt):
+        hosts = set([self.host])
+        for srv in service_objects.Service.get_all(cnxt):
+            srv = service_utils.format_service(srv)
+            if (srv['binary'] == 'heat-engine' and
+                    srv['status'] == 'up' and srv['host']):
+                hosts.add(srv['host'])
+        return sorted(hosts)
+
+    def _get_shard(self, cnxt):
+        """Return a predicate selecting the stacks watched by this engine.
+
+        Watched stacks are spread over the hosts with a running engine by
+        hashing the stack ID, so that each rule is evaluated by one host.
+        """
+        if self.host is None:
+            return lambda sid: True
 
-        # Get all watchrules for this stack and evaluate them
         try:
-            wrs = watch_rule_object.WatchRule.get_all_by_stack(admin_context,
-                                                               sid)
+            hosts = self._engine_hosts(cnxt)
         except Exception as ex:
-            LOG.warning(_LW('periodic_task db error watch rule'
-                            ' removed? %(ex)s'),
-                        ex)
-            return
+            LOG.warning(_LW('Unable to list engines, watching all stacks: '
+                            '%s'), ex)
+            return lambda sid: True
+
+        index = hosts.index(self.host)
 
+        def in_shard(sid):
+            digest = zlib.crc32(encodeutils.safe_encode(sid)) & 0xffffffff
+            return digest % len(hosts) == index
+
+        return in_shard
+
+    def check_stack_watches(self, cnxt, watches):
+        """Evaluate the given watch rules.
+
+        Rules are evaluated from their DB rows alone; the owning stack is only
+        loaded, with its stored context, if an alarm action has to be run.
+        """
         def run_alarm_action(stk, actions, details):
             for action in actions:
                 action(details=details)
-            for res in six.itervalues(stk):
-                res.metadata_update()
-
-        for wr in wrs:
-            rule = watchrule.WatchRule.load(stk.context, watch=wr)
-            actions = rule.evaluate()
+            stk.metadata_refresh()
+
+        for wr in watches:
+            if wr.state in (rpc_api.WATCH_STATE_CEILOMETER_CONTROLLED,
+                            rpc_api.WATCH_STATE_SUSPENDED):
+                continue
+            rule = watchrule.WatchRule.load(cnxt, watch=wr,
+                                            use_stored_context=True)
+            try:
+                actions = rule.evaluate()
+            except Exception as ex:
+                LOG.warning(_LW('Evaluation of watch %(name)s failed: '
+                                '%(ex)s'), {'name': wr.name, 'ex': ex})
+                continue
             if actions:
-                self.thread_group_mgr.start(sid, run_alarm_action, stk,
-                                            actions, rule.get_details())
+                self.thread_group_mgr.start(wr.stack_id, run_alarm_action,
+                                            rule.stack, actions,
+                                            rule.get_details())
 
-    def periodic_watcher_task(self, sid):
-        """Evaluate all watch-rules defined for stack ID.
+    def periodic_watcher_task(self):
+        """Evaluate the watch rules of all stacks watched by this engine.
 
-        Periodic task, created for each stack, triggers watch-rule evaluation
-        for all rules defined for the stack sid = stack ID.
+        Periodic task, created once per engine, which triggers watch-rule
+        evaluation for the stacks in this engine's shard.
         """
-        self.check_stack_watches(sid)
+        LOG.debug("Periodic watcher task")
+        admin_context = context.get_admin_context()
+        try:
+            wrs = watch_rule_object.WatchRule.get_all(admin_context)
+        except Exception as ex:
+            LOG.warning(_LW('periodic_task db error watch rule'
+                            ' removed? %(ex)s'),
+                        ex)
+            return
+
+        in_shard = self._get_shard(admin_context)
+        self.check_stack_watches(admin_context,
+                                 [wr for wr in wrs if in_shard(wr.stack_id)])
@@ -20,6 +20,7 @@ import re
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import encodeutils
 from oslo_utils import excutils
 from oslo_utils import timeutils as oslo_timeutils
@@ -36,6 +37,7 @@ from heat.common.i18n import _LI
 from heat.common.i18n import _LW
 from heat.common import identifier
 from heat.common import lifecycle_plugin_utils
+from heat.common import metrics
 from heat.common import timeutils
 from heat.engine import dependencies
 from heat.engine import environment
@@ -100,6 +102,25 @@ def reset_state_on_error(func):
     return handle_exceptions
 
 
+def _delete_limit_key(res):
+    """Return the key that concurrent deletes of a resource are bounded by.
+
+    Deleting a nested stack waits for the resources inside it to be deleted,
+    so deletes made through the engines are bounded separately at each level
+    of nesting. Otherwise parent stacks could take every slot that their
+    nested stacks need.
+    """
+    service = res.backend_service()
+    if service == 'heat':
+        return service, res.stack.nested_depth
+    return service
+
+
+# Shared by all of the stacks this engine deletes in parallel mode
+_delete_limiter = scheduler.ConcurrencyLimiter(
+    lambda: cfg.CONF.max_concurrent_deletes_per_service, _delete_limit_key)
+
+
 @six.python_2_unicode_compatible
 class Stack(collections.Mapping):
 
@@ -127,7 +148,7 @@ class Stack(collections.Mapping):
                  nested_depth=0, strict_validate=True, convergence=False,
                  current_traversal=None, tags=None, prev_raw_template_id=None,
                  current_deps=None, cache_data=None, resource_validate=True,
-                 service_check_defer=False):
+                 service_check_defer=False, cached_outputs=None):
 
         """Initialise the Stack.
 
@@ -138,6 +159,10 @@ class Stack(collections.Mapping):
         Creating a stack with cache_data creates a lightweight stack which
         will not load any resources from the database and resolve the
         functions from the cache_data specified.
+
+        The cached_outputs are the output values stored with the stack by
+        store_cached_outputs(); they are used by output() while the stack
+        remains in the state in which they were stored.
         """
 
         def _validate_stack_name(name):
@@ -184,6 +209,9 @@ class Stack(collections.Mapping):
         self.prev_raw_template_id = prev_raw_template_id
         self.current_deps = current_deps
         self.cache_data = cache_data
+        self._cached_outputs = cached_outputs
+        self._resolved_outputs = {}
+        self._ancestor_ids = None
         self._worker_client = None
         self._convg_deps = None
         self.thread_group_mgr = None
@@ -419,6 +447,7 @@ class Stack(collections.Mapping):
         return set(itertools.chain.from_iterable(attr_lists))
 
     @staticmethod
+    @metrics.timer('stack.dependencies')
     def _get_dependencies(resources, ignore_errors=True):
         """Return the dependency graph for a list of resources."""
         deps = dependencies.Dependencies()
@@ -439,6 +468,7 @@ class Stack(collections.Mapping):
         return deps
 
     @classmethod
+    @metrics.timer('stack.load')
     def load(cls, context, stack_id=None, stack=None, show_deleted=True,
              use_stored_context=False, force_reload=False, cache_data=None,
              resolve_data=True):
@@ -514,7 +544,8 @@ class Stack(collections.Mapping):
                    username=stack.username, convergence=stack.convergence,
                    current_traversal=stack.current_traversal, tags=tags,
                    prev_raw_template_id=stack.prev_raw_template_id,
-                   current_deps=stack.current_deps, cache_data=cache_data)
+                   current_deps=stack.current_deps, cache_data=cache_data,
+                   cached_outputs=stack.cached_outputs)
 
     def get_kwargs_for_cloning(self, keep_status=False, only_db=False):
         """Get common kwargs for calling Stack() for cloning.
@@ -841,6 +872,12 @@ class Stack(collections.Mapping):
         self.action = action
         self.status = status
         self.status_reason = reason
+        self._cached_outputs = None
+        self._resolved_outputs = {}
+
+        if status == self.COMPLETE and action != self.DELETE:
+            self._store_resource_attributes()
+        self._invalidate_parent_outputs()
 
         if self.convergence and action in (
                 self.UPDATE, self.DELETE, self.CREATE,
@@ -865,6 +902,13 @@ class Stack(collections.Mapping):
                 self.UPDATE, self.DELETE, self.ROLLBACK):
             self._persist_state()
 
+    def _store_resource_attributes(self):
+        """Persist the attribute values resolved by the loaded resources."""
+        if self._resources is None:
+            return
+        for res in six.itervalues(self._resources):
+            res.store_attributes()
+
     def _persist_state(self):
         """Persist stack state to database"""
         if self.id is None:
@@ -873,7 +917,8 @@ class Stack(collections.Mapping):
         if stack is not None:
             values = {'action': self.action,
                       'status': self.status,
-                      'status_reason': self.status_reason}
+                      'status_reason': self.status_reason,
+                      'cached_outputs': None}
             self._send_notification_and_add_event()
             if self.convergence:
                 # do things differently for convergence
@@ -902,7 +947,8 @@ class Stack(collections.Mapping):
         if stack is not None:
             values = {'action': self.action,
                       'status': self.status,
-                      'status_reason': self.status_reason}
+                      'status_reason': self.status_reason,
+                      'cached_outputs': None}
             self._send_notification_and_add_event()
             stack.persist_state_and_release_lock(self.context, self.id,
                                                  engine_id, values)
@@ -1356,6 +1402,7 @@ class Stack(collections.Mapping):
         # newstack.t may have been pre-stored, so save with that one
         bu_tmpl, newstack.t = newstack.t, copy.deepcopy(newstack.t)
         self.prev_raw_template_id = bu_tmpl.store()
+        existing_state = self.state
         self.action = action
         self.status = self.IN_PROGRESS
         self.status_reason = 'Stack %s started' % action
@@ -1380,7 +1427,8 @@ class Stack(collections.Mapping):
         update_task = update.StackUpdate(
             self, newstack, backup_stack,
             rollback=action == self.ROLLBACK,
-            error_wait_time=cfg.CONF.error_wait_time)
+            error_wait_time=cfg.CONF.error_wait_time,
+            existing_state=existing_state)
         try:
             updater = scheduler.TaskRunner(update_task)
 
@@ -1456,6 +1504,9 @@ class Stack(collections.Mapping):
                 backup_stack.t.env = existing_params
                 backup_stack.t.store(self.context)
             self.store()
+            if self.status == self.COMPLETE:
+                self._store_resource_attributes()
+            self._invalidate_parent_outputs()
 
             if previous_template_id is not None:
                 raw_template_object.RawTemplate.delete(self.context,
@@ -1668,9 +1719,17 @@ class Stack(collections.Mapping):
                                'Failed stack pre-ops: %s' % six.text_type(e))
                 return
 
-        action_task = scheduler.DependencyTaskGroup(self.dependencies,
-                                                    resource.Resource.destroy,
-                                                    reverse=True)
+        if cfg.CONF.parallel_stack_delete:
+            action_task = scheduler.DependencyTaskGroup(
+                self.dependencies,
+                self._destroy_with_progress(action),
+                reverse=True,
+                limiter=_delete_limiter)
+        else:
+            action_task = scheduler.DependencyTaskGroup(
+                self.dependencies,
+                resource.Resource.destroy,
+                reverse=True)
         try:
             scheduler.TaskRunner(action_task)(timeout=self.timeout_secs())
         except exception.ResourceFailure as ex:
@@ -1706,6 +1765,28 @@ class Stack(collections.Mapping):
                              "%s "), self.id)
             self.id = None
 
+    def _destroy_with_progress(self, action):
+        """Return a task to destroy a resource and report on the progress.
+
+        An event is added to the stack each time another tenth of its
+        resources has been deleted.
+        """
+        total = len(self.resources)
+        interval = max(1, total // 10)
+        deleted = [0]
+
+        @scheduler.wrappertask
+        def destroy(res):
+            yield res.destroy()
+
+            deleted[0] += 1
+            if deleted[0] < total and not deleted[0] % interval:
+                self._add_event(action, self.IN_PROGRESS,
+                                'Deleted %d of %d resources' % (deleted[0],
+                                                                total))
+
+        return destroy
+
     @profiler.trace('Stack.suspend', hide_args=False)
     @reset_state_on_error
     def suspend(self):
@@ -1812,14 +1893,153 @@ class Stack(collections.Mapping):
         updater()
 
     @profiler.trace('Stack.output', hide_args=False)
-    def output(self, key):
-        """Get the value of the specified stack output."""
+    def output(self, key, resolve_live=False):
+        """Get the value of the specified stack output.
+
+        Unless resolve_live is True, a value stored by store_cached_outputs()
+        in the current state of the stack is returned without resolving the
+        output.
+        """
+        if not resolve_live:
+            cached = self._current_cached_outputs()
+            if key in cached:
+                return cached[key]
+
         value = self.outputs[key].get('Value', '')
         try:
-            return function.resolve(value)
+            result = function.resolve(value)
         except Exception as ex:
             self.outputs[key]['error_msg'] = six.text_type(ex)
             return None
+        if self._output_cacheable(value, result):
+            self._resolved_outputs[key] = result
+        return result
+
+    def _output_cacheable(self, value, result):
+        """Return whether the resolved value of an output may be stored.
+
+        Values are not stored if they use attributes that are never cached,
+        which include secrets such as generated passwords and private keys,
+        or attributes that may change without any change to the state of
+        their resource. Nor are values containing a hidden parameter.
+        """
+        try:
+            for res in function.dependencies(value):
+                if not res.attributes_stable(function.dep_attrs(value,
+                                                                res.name)):
+                    return False
+        except Exception:
+            return False
+
+        hidden = [six.text_type(p.value()) for p in
+                  six.itervalues(self.parameters.params) if p.hidden()]
+        if hidden:
+            try:
+                data = jsonutils.dumps(result)
+            except (TypeError, ValueError):
+                return False
+            if any(v in data for v in hidden if v):
+                return False
+        return True
+
+    def _cached_outputs_state(self):
+        return '%s:%s:%s:%s' % (self.action, self.status, self.t.id,
+                                self.current_traversal)
+
+    def _current_cached_outputs(self):
+        cached = self._cached_outputs
+        if not cached or cached.get('state') != self._cached_outputs_state():
+            return {}
+        return cached.get('outputs', {})
+
+    def store_cached_outputs(self):
+        """Store the output values resolved since the stack was loaded.
+
+        Values are only stored when the stack is COMPLETE, and are discarded
+        by any subsequent change of state of the stack or by
+        invalidate_cached_outputs().
+        """
+        if (not self._resolved_outputs or self.id is None or
+                self.status != self.COMPLETE or self.action == self.DELETE):
+            return
+
+        outputs = dict(self._current_cached_outputs())
+        outputs.update(self._resolved_outputs)
+        cached = {'state': self._cached_outputs_state(), 'outputs': outputs}
+        try:
+            jsonutils.dumps(cached)
+        except (TypeError, ValueError):
+            LOG.debug('Unable to store the outputs of stack %s', self.name)
+            return
+        stack_object.Stack.update_by_id(self.context, self.id,
+                                        {'cached_outputs': cached})
+        self._cached_outputs = cached
+        self._resolved_outputs = {}
+
+    def invalidate_cached_outputs(self, resource=None, parents=True):
+        """Discard the stored output values of this stack and its parents.
+
+        If a resource is given, the values of this stack are only discarded
+        if its outputs depend on it. Values are only stored while a stack is
+        COMPLETE. The values of the parents are discarded unless parents is
+        False, as for changes of state of a resource, around which the state
+        of this stack changes too.
+        """
+        if self.id is None:
+            return
+
+        stack_ids = []
+        if self.status == self.COMPLETE:
+            depends = True
+            if resource is not None:
+                try:
+                    outputs = self.outputs or self.resolve_static_data(
+                        self.t[self.t.OUTPUTS])
+                    depends = resource in function.dependencies(outputs)
+                except Exception:
+                    # If the dependencies can't be determined, assume the
+                    # worst
+                    pass
+            if depends:
+                self._cached_outputs = None
+                self._resolved_outputs = {}
+                stack_ids.append(self.id)
+        if parents:
+            stack_ids.extend(self._get_ancestor_ids())
+
+        if stack_ids:
+            stack_object.Stack.clear_cached_outputs(self.context, stack_ids)
+
+    def _invalidate_parent_outputs(self):
+        """Discard the stored output values of all parents of this stack.
+
+        The outputs of a parent stack may depend on any change to this one,
+        through the attributes of the nested stack resource, without any
+        change to the state of the parent.
+        """
+        ancestor_ids = self._get_ancestor_ids()
+        if ancestor_ids:
+            stack_object.Stack.clear_cached_outputs(self.context,
+                                                    ancestor_ids)
+
+    def _get_ancestor_ids(self):
+        """Return the IDs of the parent stack and its own ancestors."""
+        if self._ancestor_ids is None:
+            if self.owner_id is None:
+                self._ancestor_ids = []
+            elif self._parent_stack is not None:
+                self._ancestor_ids = ([self.owner_id] +
+                                      self._parent_stack._get_ancestor_ids())
+            else:
+                ancestor_ids = []
+                stack_id = self.owner_id
+                while stack_id is not None:
+                    ancestor_ids.append(stack_id)
+                    db_stack = stack_object.Stack.get_by_id(self.context,
+                                                            stack_id)
+                    stack_id = db_stack and db_stack.owner_id
+                self._ancestor_ids = ancestor_ids
+        return self._ancestor_ids
 
     def restart_resource(self, resource_name):
         """Restart the resource specified by resource_name.
@@ -1878,7 +2098,7 @@ class Stack(collections.Mapping):
             'id': self.id,
             'action': self.action,
             'environment': self.env.user_env_as_dict(),
-            'files': self.t.files,
+            'files': self.t.files.to_dict(),
             'status': self.status,
             'template': self.t.t,
             'resources': dict((res.name, res.prepare_abandon())
@@ -1904,8 +2124,87 @@ class Stack(collections.Mapping):
         # a change in some resource may have side-effects in the attributes
         # of other resources, so ensure that attributes are re-calculated
         for res in six.itervalues(self.resources):
+            res.collect_attributes()
             res.attributes.reset_resolved_values()
 
+    def metadata_dependents(self, resources):
+        """Return the resources whose metadata refers to the given ones.
+
+        A resource is included if its metadata references the given resources,
+        or any resource that depends on them, through intrinsic functions.
+        The given resources themselves are not included.
+        """
+        names = set(res.name for res in resources)
+        affected = set()
+        pending = list(resources)
+        while pending:
+            res = pending.pop()
+            if res.name not in affected:
+                affected.add(res.name)
+                pending.extend(self.dependencies.required_by(res))
+
+        return [res for res in six.itervalues(self)
+                if res.name not in names and
+                any(dep.name in affected
+                    for dep in res.t.metadata_dependencies())]
+
+    def metadata_refresh(self, resources=None):
+        """Refresh the metadata of resources in the stack in bulk.
+
+        The refreshed metadata of each resource is calculated first, and all
+        of the metadata that changed is then written in a single transaction.
+        Resources that only implement metadata_update(), or whose metadata was
+        changed concurrently, fall back to calling metadata_update().
+
+        :param resources: the resources to refresh; defaults to all of the
+                          resources in the stack.
+        """
+        if resources is None:
+            resources = six.itervalues(self)
+
+        def overrides(res, method):
+            return (six.get_unbound_function(getattr(type(res), method)) is not
+                    six.get_unbound_function(getattr(resource.Resource,
+                                                     method)))
+
+        refreshable = {}
+        legacy = []
+        for res in resources:
+            if res.id is None or res.action == res.INIT:
+                continue
+            if overrides(res, 'refreshed_metadata'):
+                refreshable[res.id] = res
+            elif overrides(res, 'metadata_update'):
+                legacy.append(res)
+
+        current = {}
+        if refreshable:
+            current = resource_objects.Resource.get_all_metadata(
+                self.context, list(refreshable))
+        updates = {}
+        for res_id, (metadata, atomic_key) in six.iteritems(current):
+            res = refreshable[res_id]
+            new_metadata = res.refreshed_metadata(metadata)
+            if new_metadata is None or new_metadata == metadata:
+                res._rsrc_metadata = metadata
+            else:
+                updates[res_id] = (new_metadata, atomic_key)
+
+        if updates:
+            LOG.debug('Refreshing metadata for %(count)d resources in '
+                      'stack %(stack)s', {'count': len(updates),
+                                          'stack': self.name})
+            conflicts = resource_objects.Resource.update_all_metadata(
+                self.context, updates)
+            for res_id, (new_metadata, atomic_key) in six.iteritems(updates):
+                if res_id in conflicts:
+                    legacy.append(refreshable[res_id])
+                else:
+                    refreshable[res_id]._rsrc_metadata = new_metadata
+
+        for res in legacy:
+            res.metadata_update()
+
     def has_cache_data(self, resource_name):
         return (self.cache_data is not None and
                 self.cache_data.get(resource_name) is not None)
@@ -16,13 +16,16 @@ import collections
 import copy
 import functools
 import hashlib
+import weakref
 
+from oslo_serialization import jsonutils
 import six
 from stevedore import extension
 
 from heat.common import exception
 from heat.common.i18n import _
 from heat.engine import environment
+from heat.engine import template_files
 from heat.objects import raw_template as template_object
 
 __all__ = ['Template']
@@ -109,17 +112,83 @@ class Template(collections.Mapping):
         """Initialise the template with JSON object and set of Parameters."""
         self.id = template_id
         self.t = template
-        self.files = files or {}
+        self.files = files
         self.maps = self[self.MAPPINGS]
         self.env = env or environment.Environment({})
 
         self.version = get_version(self.t,
                                    list(six.iterkeys(_template_classes)))
         self.t_digest = None
+        self._shared = False
+        self._resource_digests = None
+        self._resource_defns = None
+
+    @property
+    def files(self):
+        """The files of the template, keyed by name."""
+        return self._files
+
+    @files.setter
+    def files(self, files):
+        if not isinstance(files, template_files.TemplateFiles):
+            files = template_files.TemplateFiles(files)
+        self._files = files
 
     def __deepcopy__(self, memo):
-        return Template(copy.deepcopy(self.t, memo), files=self.files,
-                        env=self.env)
+        """Return a copy of the template that shares the template data.
+
+        Resource snippets are only ever replaced in the template, never
+        modified in place, so the copies share all of the data until one of
+        them adds or removes a resource. That template then copies the top
+        level of the data and the resources section before changing them.
+        """
+        tmpl = Template(self.t, files=self.files, env=self.env)
+        tmpl._resource_digests = self._resource_digests
+        self._shared = tmpl._shared = True
+        return tmpl
+
+    def _mutable_resources(self):
+        """Return the resources section, copying any shared data first."""
+        self._resource_defns = None
+        if self._shared:
+            self.t = dict(self.t)
+            if self.t.get(self.RESOURCES) is not None:
+                self.t[self.RESOURCES] = dict(self.t[self.RESOURCES])
+            if self._resource_digests is not None:
+                self._resource_digests = dict(self._resource_digests)
+            self._shared = False
+        if self.t.get(self.RESOURCES) is None:
+            self.t[self.RESOURCES] = {}
+        return self.t[self.RESOURCES]
+
+    def _set_resource_snippet(self, name, snippet):
+        """Add or replace the snippet of a resource in the template."""
+        self._mutable_resources()[name] = snippet
+        if self._resource_digests is not None:
+            self._resource_digests[name] = snippet_digest(snippet)
+
+    def resource_digests(self):
+        """Return a dict of resource names to digests of their snippets.
+
+        The digests are computed once, when first needed, and are stored with
+        the template so that loading it again does not recompute them.
+        """
+        if self._resource_digests is None:
+            resources = self.t.get(self.RESOURCES) or {}
+            self._resource_digests = dict(
+                (name, snippet_digest(snippet))
+                for name, snippet in six.iteritems(resources))
+        return self._resource_digests
+
+    def sections_digest(self):
+        """Return a digest of all sections besides resources and outputs.
+
+        These are the sections that resource definitions may refer to, such
+        as parameters, mappings and conditions.
+        """
+        return snippet_digest(dict(
+            (k, v) for k, v in six.iteritems(self.t)
+            if k not in (self.RESOURCES, self.OUTPUTS)))
 
     @classmethod
     def load(cls, context, template_id, t=None):
@@ -127,20 +196,27 @@ class Template(collections.Mapping):
         if t is None:
             t = template_object.RawTemplate.get_by_id(context, template_id)
         env = environment.Environment(t.environment)
-        return cls(t.template, template_id=template_id, files=t.files, env=env)
+        files = template_files.TemplateFiles(digests=t.files, context=context)
+        tmpl = cls(t.template, template_id=template_id, files=files, env=env)
+        tmpl._resource_digests = t.resource_digests
+        return tmpl
 
     def store(self, context=None):
         """Store the Template in the database and return its ID."""
         rt = {
             'template': self.t,
-            'files': self.files,
-            'environment': self.env.user_env_as_dict()
+            'files': self.files.digests,
+            'environment': self.env.user_env_as_dict(),
+            'resource_digests': self.resource_digests(),
         }
+        file_contents = self.files.contents()
         if self.id is None:
-            new_rt = template_object.RawTemplate.create(context, rt)
+            new_rt = template_object.RawTemplate.create(
+                context, rt, file_contents=file_contents)
             self.id = new_rt.id
         else:
-            template_object.RawTemplate.update_by_id(context, self.id, rt)
+            template_object.RawTemplate.update_by_id(
+                context, self.id, rt, file_contents=file_contents)
         return self.id
 
     def __iter__(self):
@@ -197,9 +273,36 @@ class Template(collections.Mapping):
 
     @abc.abstractmethod
     def resource_definitions(self, stack):
-        """Return a dictionary of ResourceDefinition objects."""
+        """Return a mapping of resource names to ResourceDefinition objects.
+
+        Implementations may parse the resource snippets lazily, as each
+        definition is accessed.
+        """
         pass
 
+    def _lazy_resource_definitions(self, stack, make_defn):
+        """Return the lazily-parsed resource definitions for a stack.
+
+        The mapping is kept with the template and returned again for the same
+        stack, so that each snippet is parsed at most once however many times
+        the definitions are requested. It is discarded when a resource is
+        added or removed; the resources section must not be changed in place
+        once definitions have been requested.
+
+        make_defn is called with the stack, the name and the snippet of a
+        resource. Only a weak reference to the stack is held.
+        """
+        cached = self._resource_defns
+        if cached is not None and cached[0]() is stack:
+            return cached[1]
+
+        stack_ref = weakref.ref(stack)
+        defns = LazyResourceDefinitions(
+            self.t.get(self.RESOURCES) or {},
+            lambda name, snippet: make_defn(stack_ref(), name, snippet))
+        self._resource_defns = (stack_ref, defns)
+        return defns
+
     @abc.abstractmethod
     def add_resource(self, definition, name=None):
         """Add a resource to the template.
@@ -211,12 +314,21 @@ class Template(collections.Mapping):
 
     def remove_resource(self, name):
         """Remove a resource from the template."""
-        self.t.get(self.RESOURCES, {}).pop(name)
+        if self.RESOURCES not in self.t:
+            raise KeyError(name)
+        self._mutable_resources().pop(name)
+        if self._resource_digests is not None:
+            self._resource_digests.pop(name, None)
 
     def remove_all_resources(self):
         """Remove all the resources from the template."""
         if self.RESOURCES in self.t:
-            self.t.update({self.RESOURCES: {}})
+            if self._shared:
+                self.t = dict(self.t)
+                self._shared = False
+            self.t[self.RESOURCES] = {}
+            self._resource_digests = {}
+            self._resource_defns = None
 
     def parse(self, stack, snippet):
         return parse(self.functions, stack, snippet)
@@ -287,6 +399,40 @@ class Template(collections.Mapping):
             return cls(tmpl)
 
 
+class LazyResourceDefinitions(collections.Mapping):
+    """A mapping of resource names to ResourceDefinitions.
+
+    Each resource snippet is parsed only when its definition is first looked
+    up, and the definition is memoized, so that getting the definition of one
+    resource does not parse the rest of the template.
+    """
+
+    def __init__(self, snippets, make_defn):
+        self._snippets = dict(snippets)
+        self._make_defn = make_defn
+        self._defns = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._defns[name]
+        except KeyError:
+            defn = self._make_defn(name, self._snippets[name])
+            self._defns[name] = defn
+            return defn
+
+    def __iter__(self):
+        return iter(self._snippets)
+
+    def __len__(self):
+        return len(self._snippets)
+
+
+def snippet_digest(snippet):
+    """Return a digest of a parsed-JSON template snippet."""
+    data = jsonutils.dumps(snippet, sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
 def parse(functions, stack, snippet):
     recurse = functools.partial(parse, functions, stack)
 
@@ -0,0 +1,111 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import hashlib
+
+from oslo_serialization import jsonutils
+import six
+
+from heat.objects import raw_template_files as files_object
+
+__all__ = ['TemplateFiles', 'digest']
+
+
+def digest(contents):
+    """Return the content address of a file's contents."""
+    if not isinstance(contents, six.string_types):
+        contents = jsonutils.dumps(contents, sort_keys=True)
+    return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+
+class TemplateFiles(collections.MutableMapping):
+    """The files of a template, addressed by the digest of their contents.
+
+    Only the map of file names to digests is held per template; contents are
+    fetched from the database the first time each file is read. Copies share
+    a single cache of contents keyed by digest, so the files of a nested
+    stack are loaded at most once however many child templates refer to
+    them.
+    """
+
+    def __init__(self, files=None, digests=None, context=None,
+                 contents=None):
+        self.context = context
+        self.digests = dict(digests or {})
+        self._contents = contents if contents is not None else {}
+        if files:
+            self.update(files)
+
+    def __getitem__(self, name):
+        file_digest = self.digests[name]
+        if file_digest not in self._contents:
+            self._load([file_digest])
+        return self._contents[file_digest]
+
+    def __setitem__(self, name, contents):
+        file_digest = digest(contents)
+        self._contents[file_digest] = contents
+        self.digests[name] = file_digest
+
+    def __delitem__(self, name):
+        del self.digests[name]
+
+    def __iter__(self):
+        return iter(self.digests)
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, name):
+        return name in self.digests
+
+    def __eq__(self, other):
+        if isinstance(other, TemplateFiles):
+            return self.digests == other.digests
+        return super(TemplateFiles, self).__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'TemplateFiles(%r)' % self.digests
+
+    def _load(self, file_digests):
+        loaded = files_object.RawTemplateFiles.get_many(self.context,
+                                                        file_digests)
+        self._contents.update(loaded)
+
+    def copy(self):
+        """Return a copy that shares the cache of file contents."""
+        return TemplateFiles(digests=self.digests, context=self.context,
+                             contents=self._contents)
+
+    def contents(self):
+        """Return the cached contents of the files, keyed by digest.
+
+        These are the contents that a store of the template may have to
+        insert; files whose contents were never read are already stored.
+        """
+        wanted = set(six.itervalues(self.digests))
+        return dict((d, c) for d, c in six.iteritems(self._contents)
+                    if d in wanted)
+
+    def to_dict(self):
+        """Return a plain dict of file names to contents."""
+        missing = set(d for d in six.itervalues(self.digests)
+                      if d not in self._contents)
+        if missing:
+            self._load(missing)
+        return dict((name, self._contents[d])
+                    for name, d in six.iteritems(self.digests))
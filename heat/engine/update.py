@@ -29,8 +29,12 @@ class StackUpdate(object):
     """A Task to perform the update of an existing stack to a new template."""
 
     def __init__(self, existing_stack, new_stack, previous_stack,
-                 rollback=False, error_wait_time=None):
-        """Initialise with the existing stack and the new stack."""
+                 rollback=False, error_wait_time=None, existing_state=None):
+        """Initialise with the existing stack and the new stack.
+
+        The existing state is the state of the existing stack before the
+        update started; by default, its current state.
+        """
         self.existing_stack = existing_stack
         self.new_stack = new_stack
         self.previous_stack = previous_stack
@@ -38,8 +42,19 @@ class StackUpdate(object):
         self.rollback = rollback
         self.error_wait_time = error_wait_time
 
+        if existing_state is None:
+            existing_state = existing_stack.state
+        applied_states = ((existing_stack.CREATE, existing_stack.COMPLETE),
+                          (existing_stack.UPDATE, existing_stack.COMPLETE))
+        if existing_state in applied_states:
+            self.unchanged = self._unchanged_resources()
+        else:
+            # After a failed or interrupted action, the existing template
+            # and environment need not have been applied to every resource
+            self.unchanged = set()
         self.existing_snippets = dict((n, r.frozen_definition())
-                                      for n, r in self.existing_stack.items())
+                                      for n, r in self.existing_stack.items()
+                                      if n not in self.unchanged)
 
     def __repr__(self):
         if self.rollback:
@@ -47,6 +62,64 @@ class StackUpdate(object):
         else:
             return '%s Update' % str(self.existing_stack)
 
+    def _unchanged_resources(self):
+        """Return the names of the resources that the update can skip.
+
+        A resource is unchanged if its snippet has the same digest in both
+        templates and all of the resources it depends on are unchanged, while
+        the environment, the files and the other template sections that
+        snippets may refer to are identical. The definitions of these
+        resources are never resolved or compared, so a resource that gets
+        attributes which may have changed without any change to the state of
+        their resource is always updated.
+        """
+        existing_tmpl = self.existing_stack.t
+        new_tmpl = self.new_stack.t
+        if (type(existing_tmpl) is not type(new_tmpl) or
+                existing_tmpl.sections_digest() !=
+                new_tmpl.sections_digest() or
+                existing_tmpl.files != new_tmpl.files or
+                existing_tmpl.env.user_env_as_dict() !=
+                new_tmpl.env.user_env_as_dict()):
+            return set()
+
+        try:
+            new_deps = self.new_stack.dependencies
+        except Exception:
+            # Leave any error to be reported when the update runs
+            return set()
+        existing_digests = existing_tmpl.resource_digests()
+        new_digests = new_tmpl.resource_digests()
+
+        unchanged = set()
+        for new_res in new_deps:
+            name = new_res.name
+            digest = existing_digests.get(name)
+            if digest is None or digest != new_digests.get(name):
+                continue
+            existing_res = self.existing_stack.get(name)
+            if (existing_res is None or
+                    type(existing_res) is not type(new_res) or
+                    not existing_res.can_skip_unchanged_update()):
+                continue
+            required = list(new_deps.requires(new_res))
+            if (all(r.name in unchanged for r in required) and
+                    self._attributes_stable(new_res, required)):
+                unchanged.add(name)
+
+        if unchanged:
+            LOG.debug('%(count)d resources unchanged in %(update)s',
+                      {'count': len(unchanged), 'update': six.text_type(self)})
+        return unchanged
+
+    def _attributes_stable(self, new_res, required):
+        """Return whether the attributes a resource gets are all stable."""
+        try:
+            return all(self.existing_stack[r.name].attributes_stable(
+                new_res.t.dep_attrs(r.name)) for r in required)
+        except Exception:
+            return False
+
     @scheduler.wrappertask
     def __call__(self):
         """Return a co-routine that updates the stack."""
@@ -146,10 +219,28 @@ class StackUpdate(object):
                                     six.text_type(ex))
             raise failure
 
+    def _skip_unchanged_resource(self, res_name):
+        existing_res = self.existing_stack[res_name]
+        LOG.debug("Resource %s unchanged, not updating" % res_name)
+
+        # Make sure that the backup stack holds the same definition as the
+        # existing stack, as it would after an update in place.
+        prev_digest = self.previous_stack.t.resource_digests().get(res_name)
+        if prev_digest != self.existing_stack.t.resource_digests()[res_name]:
+            LOG.debug("Backing up unchanged Resource %s" % res_name)
+            definition = existing_res.t.reparse(self.previous_stack,
+                                                existing_res.stack.t)
+            self.previous_stack.t.add_resource(definition)
+            self.previous_stack.t.store(self.previous_stack.context)
+
     @scheduler.wrappertask
     def _process_new_resource_update(self, new_res):
         res_name = new_res.name
 
+        if res_name in self.unchanged:
+            self._skip_unchanged_resource(res_name)
+            return
+
         if res_name in self.existing_stack:
             if type(self.existing_stack[res_name]) is type(new_res):
                 existing_res = self.existing_stack[res_name]
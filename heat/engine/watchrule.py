@@ -12,10 +12,13 @@
 #    under the License.
 
 
+import collections
 import datetime
 
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
+import six
 
 from heat.common import exception
 from heat.common.i18n import _
@@ -56,8 +59,12 @@ class WatchRule(object):
 
     def __init__(self, context, watch_name, rule, stack_id=None,
                  state=NODATA, wid=None, watch_data=None,
-                 last_evaluated=timeutils.utcnow()):
+                 last_evaluated=timeutils.utcnow(),
+                 use_stored_context=False):
         self.context = context
+        self.use_stored_context = use_stored_context
+        # The stack loaded to run the rule's actions, if any were run
+        self.stack = None
         self.now = timeutils.utcnow()
         self.name = watch_name
         self.state = state
@@ -74,11 +81,13 @@ class WatchRule(object):
         self.last_evaluated = last_evaluated
 
     @classmethod
-    def load(cls, context, watch_name=None, watch=None):
+    def load(cls, context, watch_name=None, watch=None,
+             use_stored_context=False):
         """Load the watchrule object.
 
         The object can be loaded either from the DB by name or from an existing
-        DB object.
+        DB object. If use_stored_context is set, any actions are run with the
+        stored context of the stack, which need not belong to context's tenant.
         """
         if watch is None:
             try:
@@ -99,7 +108,8 @@ class WatchRule(object):
                        state=watch.state,
                        wid=watch.id,
                        watch_data=watch.watch_data,
-                       last_evaluated=watch.last_evaluated)
+                       last_evaluated=watch.last_evaluated,
+                       use_stored_context=use_stored_context)
 
     def store(self):
         """Store the watchrule in the database and return its ID.
@@ -120,11 +130,13 @@ class WatchRule(object):
         else:
             watch_rule_objects.WatchRule.update_by_id(self.context, self.id,
                                                       wr_values)
+        rule_index.add(self.id, self.rule)
 
     def destroy(self):
         """Delete the watchrule from the database."""
         if self.id:
             watch_rule_objects.WatchRule.delete(self.context, self.id)
+            rule_index.remove(self.id)
 
     def do_data_cmp(self, data, threshold):
         op = self.rule['ComparisonOperator']
@@ -266,8 +278,11 @@ class WatchRule(object):
             s = stack_object.Stack.get_by_id(
                 self.context,
                 self.stack_id,
+                tenant_safe=not self.use_stored_context,
                 eager_load=True)
-            stk = stack.Stack.load(self.context, stack=s)
+            stk = stack.Stack.load(self.context, stack=s,
+                                   use_stored_context=self.use_stored_context)
+            self.stack = stk
             if (stk.action != stk.DELETE
                     and stk.status == stk.COMPLETE):
                 for refid in self.rule[self.ACTION_MAP[new_state]]:
@@ -397,3 +412,106 @@ def rule_can_use_sample(wr, stats_data):
             if match_dimesions(rule_dims, data_dims):
                 return True
     return False
+
+
+def _rule_metrics(rule):
+    """Return (metric name, dimensions) pairs a rule could alarm on.
+
+    Both the CloudWatch and the Ceilometer forms of the rule are returned
+    where present, so that the result does not depend on the current state
+    of the watch.
+    """
+    metrics = []
+    if 'MetricName' in rule:
+        metrics.append((rule['MetricName'],
+                        dict((d['Name'], d['Value'])
+                             for d in rule.get('Dimensions', []))))
+    if 'meter_name' in rule:
+        metrics.append((rule['meter_name'],
+                        dict((k.split('.')[-1], v) for k, v in
+                             six.iteritems(rule.get('matching_metadata',
+                                                    {})))))
+    return metrics
+
+
+class WatchRuleIndex(object):
+    """Index of watch rules by the metric samples they may use.
+
+    Each rule is filed under its metric name and one of its dimension
+    (name, value) pairs - a sample can only be used by a rule if it carries
+    all of the rule's dimensions, so looking up each of the sample's
+    dimensions is sufficient to find every candidate. The index is only a
+    pre-filter; candidates must still be checked with rule_can_use_sample().
+
+    Rules created or deleted by other engines are picked up by reloading the
+    index from the database once every periodic_interval.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._index = collections.defaultdict(set)
+        self._loaded_at = None
+
+    @staticmethod
+    def _rule_keys(rule):
+        keys = set()
+        for metric, dims in _rule_metrics(rule):
+            try:
+                name, value = min(six.iteritems(dims))
+                hash(value)
+            except (ValueError, TypeError):
+                # No dimensions, or ones that can't be indexed, so the rule
+                # must be checked against every sample for the metric.
+                name, value = None, None
+            keys.add((metric, name, value))
+        return keys
+
+    def add(self, rule_id, rule):
+        """Add a rule to the index, replacing any existing entry for it."""
+        self.remove(rule_id)
+        keys = self._rule_keys(rule)
+        for key in keys:
+            self._index[key].add(rule_id)
+        self._keys[rule_id] = keys
+
+    def remove(self, rule_id):
+        """Remove a rule from the index, if present."""
+        for key in self._keys.pop(rule_id, ()):
+            self._index[key].discard(rule_id)
+            if not self._index[key]:
+                del self._index[key]
+
+    def _refresh(self, context):
+        now = timeutils.utcnow()
+        if self._loaded_at is not None:
+            interval = datetime.timedelta(seconds=cfg.CONF.periodic_interval)
+            if now < self._loaded_at + interval:
+                return
+
+        self._loaded_at = now
+        self._keys = {}
+        self._index = collections.defaultdict(set)
+        for wr in watch_rule_objects.WatchRule.get_all(context):
+            self.add(wr.id, wr.rule)
+
+    def candidates(self, context, stats_data):
+        """Return the sorted IDs of rules that may use the given sample."""
+        self._refresh(context)
+
+        rule_ids = set()
+        for metric, data in six.iteritems(stats_data):
+            if metric == 'Namespace' or not isinstance(data, dict):
+                continue
+            rule_ids |= self._index.get((metric, None, None), set())
+            data_dims = data.get('Dimensions', {})
+            if isinstance(data_dims, list):
+                data_dims = data_dims[0] if data_dims else {}
+            for name, value in six.iteritems(data_dims):
+                try:
+                    rule_ids |= self._index.get((metric, name, value), set())
+                except TypeError:
+                    continue
+        return sorted(rule_ids)
+
+
+rule_index = WatchRuleIndex()
@@ -22,6 +22,7 @@ from heat.common import context
 from heat.common.i18n import _LE
 from heat.common.i18n import _LI
 from heat.common import messaging as rpc_messaging
+from heat.db import query_stats
 from heat.engine import check_resource
 from heat.engine import sync_point
 from heat.rpc import worker_client as rpc_client
@@ -110,5 +111,6 @@ class WorkerService(service.Service):
         cr = check_resource.CheckResource(self.engine_id, self._rpc_client,
                                           self.thread_group_mgr)
 
-        cr.check(cnxt, resource_id, current_traversal, resource_data,
-                 is_update, adopt_stack_data, rsrc, stack)
+        with query_stats.resource(rsrc.name):
+            cr.check(cnxt, resource_id, current_traversal, resource_data,
+                     is_update, adopt_stack_data, rsrc, stack)
@@ -80,3 +80,8 @@ class Event(
     def create(cls, context, values):
         return cls._from_db_object(context, cls(),
                                    db_api.event_create(context, values))
+
+    @classmethod
+    def prune(cls, context, max_events=None, max_age=None, batch_size=1000):
+        return db_api.event_prune(context, max_events=max_events,
+                                  max_age=max_age, batch_size=batch_size)
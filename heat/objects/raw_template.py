@@ -42,6 +42,7 @@ class RawTemplate(
         'files': heat_fields.JsonField(nullable=True),
         'template': heat_fields.JsonField(),
         'environment': heat_fields.JsonField(),
+        'resource_digests': heat_fields.JsonField(nullable=True),
     }
 
     @staticmethod
@@ -57,18 +58,19 @@ class RawTemplate(
             encrypted_param_names = tpl.environment[
                 env_fmt.ENCRYPTED_PARAM_NAMES]
 
+            to_decrypt = []
             for param_name in encrypted_param_names:
                 if (isinstance(parameters[param_name], (list, tuple)) and
                         len(parameters[param_name]) == 2):
-                    method, enc_value = parameters[param_name]
-                    value = crypt.decrypt(method, enc_value)
+                    to_decrypt.append(param_name)
                 else:
-                    value = parameters[param_name]
                     LOG.warning(_LW(
                         'Encountered already-decrypted data while attempting '
                         'to decrypt parameter %s.  Please file a Heat bug so '
                         'this can be fixed.'), param_name)
-                parameters[param_name] = value
+            values = crypt.decrypt_many(parameters[param_name]
+                                        for param_name in to_decrypt)
+            parameters.update(zip(to_decrypt, values))
             tpl.environment[env_fmt.PARAMETERS] = parameters
 
         tpl._context = context
@@ -92,15 +94,18 @@ class RawTemplate(
                     tmpl.env.encrypted_param_names.append(param_name)
 
     @classmethod
-    def create(cls, context, values):
-        return cls._from_db_object(context, cls(),
-                                   db_api.raw_template_create(context, values))
+    def create(cls, context, values, file_contents=None):
+        return cls._from_db_object(
+            context, cls(),
+            db_api.raw_template_create(context, values,
+                                       file_contents=file_contents))
 
     @classmethod
-    def update_by_id(cls, context, template_id, values):
+    def update_by_id(cls, context, template_id, values, file_contents=None):
         return cls._from_db_object(
             context, cls(),
-            db_api.raw_template_update(context, template_id, values))
+            db_api.raw_template_update(context, template_id, values,
+                                       file_contents=file_contents))
 
     @classmethod
     def delete(cls, context, template_id):
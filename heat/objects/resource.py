@@ -59,6 +59,7 @@ class Resource(
         'status_reason': fields.StringField(nullable=True),
         'action': fields.StringField(nullable=True),
         'rsrc_metadata': heat_fields.JsonField(nullable=True),
+        'rsrc_metadata_version': fields.IntegerField(nullable=True),
         'properties_data': heat_fields.JsonField(nullable=True),
         'properties_data_encrypted': fields.BooleanField(default=False),
         'data': fields.ListOfObjectsField(
@@ -88,13 +89,12 @@ class Resource(
                 resource[field] = db_resource[field]
 
         if resource.properties_data_encrypted and resource.properties_data:
-            properties_data = {}
-            for prop_name, prop_value in resource.properties_data.items():
-                method, value = prop_value
-                decrypted_value = crypt.decrypt(method, value)
-                prop_string = jsonutils.loads(decrypted_value)
-                properties_data[prop_name] = prop_string
-            resource.properties_data = properties_data
+            prop_names = list(resource.properties_data)
+            decrypted = crypt.decrypt_many(resource.properties_data[name]
+                                           for name in prop_names)
+            resource.properties_data = dict(
+                (name, jsonutils.loads(value))
+                for name, value in zip(prop_names, decrypted))
 
         resource._context = context
         resource.obj_reset_changes()
@@ -124,8 +124,7 @@ class Resource(
 
     @classmethod
     def delete(cls, context, resource_id):
-        resource_db = db_api.resource_get(context, resource_id)
-        resource_db.delete()
+        db_api.resource_delete(context, resource_id)
 
     @classmethod
     def exchange_stacks(cls, context, resource_id1, resource_id2):
@@ -163,6 +162,14 @@ class Resource(
             physical_resource_id)
         return cls._from_db_object(cls(context), context, resource_db)
 
+    @classmethod
+    def get_all_metadata(cls, context, resource_ids):
+        return db_api.resource_metadata_get_all(context, resource_ids)
+
+    @classmethod
+    def update_all_metadata(cls, context, values):
+        return db_api.resource_metadata_update_all(context, values)
+
     @classmethod
     def update_by_id(cls, context, resource_id, values):
         resource_db = db_api.resource_get(context, resource_id)
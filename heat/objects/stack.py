@@ -61,6 +61,7 @@ class Stack(
         'prev_raw_template': fields.ObjectField('RawTemplate'),
         'tags': fields.ObjectField('StackTagList'),
         'parent_resource_name': fields.StringField(nullable=True),
+        'cached_outputs': heat_fields.JsonField(nullable=True),
     }
 
     @staticmethod
@@ -137,6 +138,10 @@ class Stack(
     def count_total_resources(cls, context, stack_id):
         return db_api.stack_count_total_resources(context, stack_id)
 
+    @classmethod
+    def reconcile_resource_counts(cls, context):
+        return db_api.resource_count_reconcile(context)
+
     @classmethod
     def create(cls, context, values):
         return cls._from_db_object(context, cls(context),
@@ -151,6 +156,10 @@ class Stack(
         """
         return db_api.stack_update(context, stack_id, values)
 
+    @classmethod
+    def clear_cached_outputs(cls, context, stack_ids):
+        return db_api.stack_clear_cached_outputs(context, stack_ids)
+
     @classmethod
     def select_and_update(cls, context, stack_id, values, exp_trvsl=None):
         """Update the stack by selecting on traversal ID.
@@ -60,6 +60,8 @@ class WatchRule(
     @classmethod
     def get_by_id(cls, context, rule_id):
         db_rule = db_api.watch_rule_get(context, rule_id)
+        if db_rule is None:
+            return None
         return cls._from_db_object(context, cls(), db_rule)
 
     @classmethod
@@ -20,14 +20,14 @@ PARAM_KEYS = (
     PARAM_CLEAR_PARAMETERS, PARAM_GLOBAL_TENANT, PARAM_LIMIT,
     PARAM_NESTED_DEPTH, PARAM_TAGS, PARAM_SHOW_HIDDEN, PARAM_TAGS_ANY,
     PARAM_NOT_TAGS, PARAM_NOT_TAGS_ANY, TEMPLATE_TYPE, PARAM_WITH_DETAIL,
-    RESOLVE_OUTPUTS, PARAM_IGNORE_ERRORS
+    RESOLVE_OUTPUTS, PARAM_IGNORE_ERRORS, RESOLVE_LIVE
 ) = (
     'timeout_mins', 'disable_rollback', 'adopt_stack_data',
     'show_deleted', 'show_nested', 'existing',
     'clear_parameters', 'global_tenant', 'limit',
     'nested_depth', 'tags', 'show_hidden', 'tags_any',
     'not_tags', 'not_tags_any', 'template_type', 'with_detail',
-    'resolve_outputs', 'ignore_errors'
+    'resolve_outputs', 'ignore_errors', 'resolve_live'
 )
 
 STACK_KEYS = (
@@ -99,6 +99,9 @@ EVENT_KEYS = (
     'resource_properties',
 )
 
+# Opaque keyset pagination marker included with each item in a listing
+LIST_CURSOR = 'cursor'
+
 NOTIFY_KEYS = (
     NOTIFY_TENANT_ID,
     NOTIFY_USER_ID,
@@ -247,6 +250,14 @@ SOFTWARE_DEPLOYMENT_KEYS = (
     'updated_time'
 )
 
+SOFTWARE_DEPLOYMENT_METADATA_KEYS = (
+    SOFTWARE_DEPLOYMENT_METADATA,
+    SOFTWARE_DEPLOYMENT_METADATA_ETAG,
+) = (
+    'metadata',
+    'etag',
+)
+
 SOFTWARE_DEPLOYMENT_STATUSES = (
     SOFTWARE_DEPLOYMENT_IN_PROGRESS,
     SOFTWARE_DEPLOYMENT_FAILED,
@@ -18,6 +18,7 @@
 from oslo_utils import reflection
 
 from heat.common import messaging
+from heat.common import metrics
 from heat.rpc import api as rpc_api
 
 
@@ -50,6 +51,8 @@ class EngineClient(object):
         1.27 - Add check_software_deployment
         1.28 - Add environment_show call
         1.29 - Add template_id to create_stack/update_stack
+        1.30 - Add poll_metadata_software_deployments call
+        1.31 - Add resolve_live to show_stack and show_output
     """
 
     BASE_RPC_API_VERSION = '1.0'
@@ -74,7 +77,8 @@ class EngineClient(object):
         if timeout is not None:
             client = client.prepare(timeout=timeout)
 
-        return client.call(ctxt, method, **kwargs)
+        with metrics.timer('rpc.call.%s' % method):
+            return client.call(ctxt, method, **kwargs)
 
     def cast(self, ctxt, msg, version=None):
         method, kwargs = msg
@@ -82,6 +86,7 @@ class EngineClient(object):
             client = self._client.prepare(version=version)
         else:
             client = self._client
+        metrics.incr('rpc.cast.%s' % method)
         return client.cast(ctxt, method, **kwargs)
 
     def local_error_name(self, error):
@@ -189,14 +194,24 @@ class EngineClient(object):
                                              not_tags_any=not_tags_any),
                          version='1.8')
 
-    def show_stack(self, ctxt, stack_identity, resolve_outputs=True):
+    def show_stack(self, ctxt, stack_identity, resolve_outputs=True,
+                   resolve_live=False):
         """Returns detailed information about one or all stacks.
 
         :param ctxt: RPC context.
         :param stack_identity: Name of the stack you want to show, or None to
         show all
         :param resolve_outputs: If True, stack outputs will be resolved
-        """
+        :param resolve_live: If True, stack outputs will be resolved even if
+        values stored with the stack are current
+        """
+        if resolve_live:
+            return self.call(ctxt,
+                             self.make_msg('show_stack',
+                                           stack_identity=stack_identity,
+                                           resolve_outputs=resolve_outputs,
+                                           resolve_live=resolve_live),
+                             version='1.31')
         return self.call(ctxt, self.make_msg('show_stack',
                                              stack_identity=stack_identity,
                                              resolve_outputs=resolve_outputs),
@@ -716,6 +731,18 @@ class EngineClient(object):
         return self.call(cnxt, self.make_msg('metadata_software_deployments',
                                              server_id=server_id))
 
+    def poll_metadata_software_deployments(self, cnxt, server_id, etag=None,
+                                           timeout=0):
+        # Allow for the usual response time on top of the time the engine
+        # may wait for the metadata to change.
+        rpc_timeout = timeout + 60 if timeout else None
+        return self.call(cnxt,
+                         self.make_msg('poll_metadata_software_deployments',
+                                       server_id=server_id,
+                                       etag=etag,
+                                       timeout=timeout),
+                         timeout=rpc_timeout, version='1.30')
+
     def show_software_deployment(self, cnxt, deployment_id):
         return self.call(cnxt, self.make_msg('show_software_deployment',
                                              deployment_id=deployment_id))
@@ -805,7 +832,15 @@ class EngineClient(object):
                                              stack_identity=stack_identity),
                          version='1.19')
 
-    def show_output(self, cntx, stack_identity, output_key):
+    def show_output(self, cntx, stack_identity, output_key,
+                    resolve_live=False):
+        if resolve_live:
+            return self.call(cntx,
+                             self.make_msg('show_output',
+                                           stack_identity=stack_identity,
+                                           output_key=output_key,
+                                           resolve_live=resolve_live),
+                             version='1.31')
         return self.call(cntx, self.make_msg('show_output',
                                              stack_identity=stack_identity,
                                              output_key=output_key),
@@ -393,6 +393,35 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         self.assertIsNone(engine_args['filters'])
         self.assertNotIn('balrog', engine_args)
 
+    @mock.patch.object(rpc_client.EngineClient, 'call')
+    def test_index_next_link_uses_cursor(self, mock_call, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'index', True)
+        stack_identity = identifier.HeatIdentifier(self.tenant,
+                                                   'wibble', '6')
+        res_identity = identifier.ResourceIdentifier(resource_name='res',
+                                                     **stack_identity)
+        ev_identity = identifier.EventIdentifier(event_id='42',
+                                                 **res_identity)
+        req = self._get(stack_identity._tenant_path() + '/events',
+                        params={'limit': 1})
+        mock_call.return_value = [{
+            u'event_time': u'2012-07-23T13:05:39Z',
+            u'resource_name': u'res',
+            u'event_identity': dict(ev_identity),
+            u'resource_action': u'CREATE',
+            u'resource_status': u'IN_PROGRESS',
+            u'cursor': u'fake_cursor',
+        }]
+
+        result = self.controller.index(req, tenant_id=self.tenant,
+                                       stack_name=stack_identity.stack_name,
+                                       stack_id=stack_identity.stack_id)
+
+        self.assertNotIn('cursor', result['events'][0])
+        self.assertEqual(1, len(result['links']))
+        self.assertEqual('next', result['links'][0]['rel'])
+        self.assertIn('marker=fake_cursor', result['links'][0]['href'])
+
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_index_limit_not_int(self, mock_call, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'index', True)
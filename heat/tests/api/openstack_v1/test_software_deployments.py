@@ -14,6 +14,7 @@
 import json
 
 import mock
+import webob
 import webob.exc
 
 import heat.api.middleware.fault as fault
@@ -62,6 +63,48 @@ class SoftwareDeploymentControllerTest(tools.ControllerTest,
             whitelist = mock_call.call_args[1]
             self.assertEqual({'server_id': server_id}, whitelist)
 
+    @mock.patch.object(policy.Enforcer, 'enforce')
+    def test_metadata(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'metadata')
+        server_id = 'fb322564-7927-473d-8aad-68ae7fbf2abf'
+        req = self._get('/software_deployments/metadata/%s' % server_id)
+        return_value = {'metadata': [{'id': 'abc'}], 'etag': '1-2'}
+        with mock.patch.object(
+                self.controller.rpc_client,
+                'poll_metadata_software_deployments',
+                return_value=return_value) as mock_call:
+            resp = self.controller.metadata(
+                req, server_id=server_id, tenant_id=self.tenant)
+            self.assertEqual(
+                {'metadata': [{'id': 'abc'}], 'etag': '1-2'}, resp)
+            mock_call.assert_called_once_with(
+                req.context, server_id=server_id, etag=None, timeout=0)
+
+        response = webob.Response()
+        software_deployments.SoftwareDeploymentSerializer().metadata(
+            response, resp)
+        self.assertEqual('"1-2"', response.headers['ETag'])
+        self.assertEqual({'metadata': [{'id': 'abc'}]},
+                         json.loads(response.body))
+
+    @mock.patch.object(policy.Enforcer, 'enforce')
+    def test_metadata_not_modified(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'metadata')
+        server_id = 'fb322564-7927-473d-8aad-68ae7fbf2abf'
+        req = self._get('/software_deployments/metadata/%s' % server_id,
+                        {'wait': 20})
+        req.headers['If-None-Match'] = '"1-2"'
+        return_value = {'metadata': None, 'etag': '1-2'}
+        with mock.patch.object(
+                self.controller.rpc_client,
+                'poll_metadata_software_deployments',
+                return_value=return_value) as mock_call:
+            self.assertRaises(
+                webob.exc.HTTPNotModified, self.controller.metadata,
+                req, server_id=server_id, tenant_id=self.tenant)
+            mock_call.assert_called_once_with(
+                req.context, server_id=server_id, etag='1-2', timeout=20)
+
     @mock.patch.object(policy.Enforcer, 'enforce')
     def test_show(self, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'show')
@@ -2546,6 +2546,33 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         self.assertEqual({'output': output}, response)
         self.m.VerifyAll()
 
+    def test_show_output_resolve_live(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'show_output', True)
+        identity = identifier.HeatIdentifier(self.tenant, 'wordpress', '6')
+        req = self._get('/stacks/%(stack_name)s/%(stack_id)s/key' % identity,
+                        params={'resolve_live': 'true'})
+        output = {'output_key': 'key',
+                  'output_value': 'val',
+                  'description': 'description'}
+
+        self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
+        rpc_client.EngineClient.call(
+            req.context,
+            ('show_output', {'output_key': 'key',
+                             'stack_identity': dict(identity),
+                             'resolve_live': True}),
+            version='1.31'
+        ).AndReturn(output)
+        self.m.ReplayAll()
+
+        response = self.controller.show_output(req, tenant_id=identity.tenant,
+                                               stack_name=identity.stack_name,
+                                               stack_id=identity.stack_id,
+                                               output_key='key')
+
+        self.assertEqual({'output': output}, response)
+        self.m.VerifyAll()
+
     def test_list_template_versions(self, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'list_template_versions', True)
         req = self._get('/template_versions')
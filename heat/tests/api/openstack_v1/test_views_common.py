@@ -46,6 +46,17 @@ class TestViewsCommon(common.HeatTestCase):
         self.assertEqual(url_path, self.request.path_url)
         self.assertEqual(expected_params, urlparse.parse_qs(url_params))
 
+    def test_get_collection_links_uses_cursor(self):
+        self.setUpGetCollectionLinks()
+        links = views_common.get_collection_links(self.request, self.items,
+                                                  'cursor2')
+
+        expected_params = {'marker': ['cursor2'], 'limit': ['2']}
+        next_link = list(filter(
+            lambda link: link['rel'] == 'next', links)).pop()
+        url_path, url_params = next_link['href'].split('?', 1)
+        self.assertEqual(expected_params, urlparse.parse_qs(url_params))
+
     def test_get_collection_links_doesnt_create_next_if_no_limit(self):
         self.setUpGetCollectionLinks()
         del self.request.params['limit']
@@ -150,6 +150,16 @@ class TestStacksViewBuilder(common.HeatTestCase):
         stack_view = stacks_view.collection(self.request, stacks)
         self.assertIn('links', stack_view)
 
+    @mock.patch.object(stacks_view.views_common, 'get_collection_links')
+    def test_collection_links_use_cursor(self, mock_get_collection_links):
+        self.stack1['cursor'] = 'fake cursor'
+        stacks = [self.stack1]
+        mock_get_collection_links.return_value = None
+        stack_view = stacks_view.collection(self.request, stacks)
+        mock_get_collection_links.assert_called_once_with(
+            self.request, stack_view['stacks'], 'fake cursor')
+        self.assertNotIn('cursor', stack_view['stacks'][0])
+
     @mock.patch.object(stacks_view.views_common, 'get_collection_links')
     def test_doesnt_append_collection_links(self, mock_get_collection_links):
         stacks = [self.stack1]
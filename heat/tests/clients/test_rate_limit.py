@@ -0,0 +1,116 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+
+from heat.common import timeutils
+from heat.engine.clients import rate_limit
+from heat.tests import common
+
+
+class TokenBucketTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(TokenBucketTest, self).setUp()
+        self.now = 1000.0
+        self.patchobject(timeutils, 'wallclock', side_effect=lambda: self.now)
+
+    def test_unlimited(self):
+        bucket = rate_limit.TokenBucket(0, 1)
+        self.assertTrue(all(bucket.consume() for i in range(100)))
+
+    def test_rate(self):
+        bucket = rate_limit.TokenBucket(2, 3)
+        self.assertEqual([True, True, True, False],
+                         [bucket.consume() for i in range(4)])
+        self.now += 0.5
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.now += 10
+        self.assertEqual([True, True, True, False],
+                         [bucket.consume() for i in range(4)])
+
+    def test_over_limit_backs_off(self):
+        bucket = rate_limit.TokenBucket(4, 1)
+        bucket.over_limit()
+        self.assertEqual(2, bucket.rate)
+        self.now += 0.9
+        self.assertFalse(bucket.consume())
+        self.now += 0.2
+        self.assertTrue(bucket.consume())
+
+        bucket.over_limit()
+        self.assertEqual(1, bucket.rate)
+        self.now += 1.5
+        self.assertFalse(bucket.consume())
+        self.now += 1
+        self.assertTrue(bucket.consume())
+
+        for i in range(20):
+            bucket.succeeded()
+        self.assertEqual(4, bucket.rate)
+
+    def test_over_limit_rate_floor(self):
+        bucket = rate_limit.TokenBucket(16, 1)
+        for i in range(10):
+            bucket.over_limit()
+        self.assertEqual(1, bucket.rate)
+
+    def test_over_limit_unlimited(self):
+        bucket = rate_limit.TokenBucket(0, 1)
+        bucket.over_limit()
+        self.assertFalse(bucket.consume())
+        self.now += 1
+        self.assertTrue(bucket.consume())
+
+
+class ServiceRateLimiterTest(common.HeatTestCase):
+
+    def _resource(self, service, tenant_id='tenant'):
+        res = mock.Mock()
+        res.backend_service.return_value = service
+        res.context.tenant_id = tenant_id
+        return res
+
+    def test_configured_per_service_and_tenant(self):
+        cfg.CONF.set_override('rate_limit', 5, group='clients_nova',
+                              enforce_type=True)
+        cfg.CONF.set_override('tenant_rate_limits', {'special': '20'},
+                              group='clients_nova', enforce_type=True)
+        self.assertEqual(5, rate_limit.bucket('nova', 'tenant').max_rate)
+        self.assertEqual(20, rate_limit.bucket('nova', 'special').max_rate)
+        self.assertEqual(0, rate_limit.bucket('cinder', 'tenant').max_rate)
+        self.assertIs(rate_limit.bucket('nova', 'tenant'),
+                      rate_limit.bucket('nova', 'tenant'))
+
+    def test_invalid_tenant_rate(self):
+        cfg.CONF.set_override('rate_limit', 5, group='clients_nova',
+                              enforce_type=True)
+        cfg.CONF.set_override('tenant_rate_limits',
+                              {'bad': 'fast', 'negative': '-1'},
+                              group='clients_nova', enforce_type=True)
+        self.assertEqual(5, rate_limit.bucket('nova', 'bad').max_rate)
+        self.assertEqual(5, rate_limit.bucket('nova', 'negative').max_rate)
+
+    def test_acquire(self):
+        cfg.CONF.set_override('rate_limit', 1, group='clients_nova',
+                              enforce_type=True)
+        cfg.CONF.set_override('rate_limit_burst', 1, group='clients_nova',
+                              enforce_type=True)
+        limiter = rate_limit.ServiceRateLimiter()
+        self.assertTrue(limiter.acquire(self._resource('nova')))
+        self.assertFalse(limiter.acquire(self._resource('nova')))
+        self.assertTrue(limiter.acquire(self._resource('nova', 'other')))
+        self.assertTrue(limiter.acquire(self._resource('cinder')))
+        self.assertTrue(limiter.acquire(self._resource(None)))
@@ -11,6 +11,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import os
 import sys
 
@@ -92,6 +93,12 @@ class HeatTestCase(testscenarios.WithScenarios,
         self.useFixture(fixtures.MonkeyPatch(
             'heat.common.exception._FATAL_EXCEPTION_FORMAT_ERRORS',
             True))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.clients.rate_limit._buckets', {}))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.scheduler._poll_counts', collections.Counter()))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.common.metrics._sink', None))
 
         def enable_sleep():
             scheduler.ENABLE_SLEEP = True
@@ -22,6 +22,7 @@ if possible.
 
 import datetime
 import fixtures
+import hashlib
 import os
 import uuid
 
@@ -747,6 +748,83 @@ class HeatMigrationsCheckers(test_migrations.WalkVersionsMixin,
         self.assertIndexMembers(engine, 'stack', 'ix_stack_owner_id',
                                 ['owner_id'])
 
+    def _check_072(self, engine, data):
+        self.assertColumnExists(engine, 'resource', 'rsrc_metadata_version')
+        self.assertColumnIsNullable(engine, 'resource',
+                                    'rsrc_metadata_version')
+
+    def _check_073(self, engine, data):
+        self.assertColumnExists(engine, 'stack', 'cached_outputs')
+        self.assertColumnIsNullable(engine, 'stack', 'cached_outputs')
+
+    def _check_074(self, engine, data):
+        self.assertColumnExists(engine, 'engine_lease', 'name')
+        self.assertColumnExists(engine, 'engine_lease', 'engine_id')
+        self.assertColumnExists(engine, 'engine_lease', 'expires_at')
+        self.assertColumnIsNotNullable(engine, 'engine_lease', 'engine_id')
+        self.assertColumnIsNotNullable(engine, 'engine_lease', 'expires_at')
+
+    def _check_075(self, engine, data):
+        self.assertColumnExists(engine, 'event', 'resource_properties_data')
+        self.assertColumnIsNullable(engine, 'event',
+                                    'resource_properties_data')
+        self.assertColumnExists(engine, 'event', 'resource_properties')
+
+    def _check_076(self, engine, data):
+        self.assertIndexMembers(engine, 'event',
+                                'ix_event_stack_id_created_at',
+                                ['stack_id', 'created_at', 'id'])
+        self.assertIndexMembers(engine, 'stack',
+                                'ix_stack_tenant_created_at',
+                                ['tenant', 'created_at', 'id'])
+
+    def _pre_upgrade_077(self, engine):
+        raw_template = utils.get_table(engine, 'raw_template')
+        templates = [
+            dict(id=770, template='{}',
+                 files=jsonutils.dumps({'a.yaml': 'shared', 'b.sh': 'one'})),
+            dict(id=771, template='{}',
+                 files=jsonutils.dumps({'a.yaml': 'shared',
+                                        'c.sh': 'shared'})),
+        ]
+        engine.execute(raw_template.insert(), templates)
+        return templates
+
+    def _check_077(self, engine, data):
+        self.assertColumnExists(engine, 'raw_template_files', 'digest')
+        self.assertColumnExists(engine, 'raw_template_files', 'contents')
+        self.assertColumnIsNotNullable(engine, 'raw_template_files',
+                                       'refcount')
+
+        def digest(contents):
+            return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+        raw_template = utils.get_table(engine, 'raw_template')
+        files = dict((row.id, jsonutils.loads(row.files))
+                     for row in engine.execute(raw_template.select().where(
+                         raw_template.c.id.in_([770, 771]))))
+        self.assertEqual({'a.yaml': digest('shared'), 'b.sh': digest('one')},
+                         files[770])
+        self.assertEqual({'a.yaml': digest('shared'),
+                          'c.sh': digest('shared')}, files[771])
+
+        raw_template_files = utils.get_table(engine, 'raw_template_files')
+        stored = dict((row.digest, (jsonutils.loads(row.contents),
+                                    row.refcount))
+                      for row in engine.execute(raw_template_files.select()))
+        self.assertEqual({digest('shared'): ('shared', 2),
+                          digest('one'): ('one', 1)}, stored)
+
+    def _check_078(self, engine, data):
+        self.assertColumnExists(engine, 'raw_template', 'resource_digests')
+        self.assertColumnIsNullable(engine, 'raw_template',
+                                    'resource_digests')
+
+    def _check_079(self, engine, data):
+        self.assertColumnExists(engine, 'resource_count', 'root_stack_id')
+        self.assertColumnExists(engine, 'resource_count', 'total')
+        self.assertColumnIsNotNullable(engine, 'resource_count', 'total')
+
 
 class TestHeatMigrationsMySQL(HeatMigrationsCheckers,
                               test_base.MySQLOpportunisticTestCase):
@@ -0,0 +1,117 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from oslo_config import cfg
+
+from heat.common import metrics
+from heat.db import query_stats
+from heat.engine import stack as parser
+from heat.tests import common
+from heat.tests import utils
+
+tmpl = {
+    'HeatTemplateFormatVersion': '2012-12-12',
+    'Resources': {
+        'A': {'Type': 'GenericResourceType'},
+        'B': {'Type': 'GenericResourceType'},
+    }
+}
+
+
+class QueryStatsTest(common.HeatTestCase):
+    def setUp(self):
+        super(QueryStatsTest, self).setUp()
+        cfg.CONF.set_override('query_accounting', True)
+        self.engine = utils.get_engine()
+        query_stats.install(self.engine)
+
+    def test_disabled(self):
+        cfg.CONF.set_override('query_accounting', False)
+        with query_stats.operation('stack_create') as stats:
+            self.assertIsNone(stats)
+            self.engine.execute('SELECT 1')
+        self.assertIsNone(query_stats.current())
+
+    def test_statements_tagged(self):
+        with query_stats.operation('stack_create', 'req-1234') as stats:
+            self.engine.execute('SELECT 1')
+            with query_stats.resource('my */ server'):
+                self.engine.execute('SELECT 2')
+            self.assertIs(stats, query_stats.current())
+        self.assertIsNone(query_stats.current())
+        self.assertEqual(2, stats.count)
+        statements = sorted(s for d, s in stats.slowest)
+        self.assertEqual(
+            ['SELECT 1 /* heat:stack_create req-1234 */',
+             'SELECT 2 /* heat:stack_create req-1234 '
+             'resource:my____server */'],
+            statements)
+
+    def test_nested_operation(self):
+        with query_stats.operation('stack_create') as outer:
+            with query_stats.operation('stack_update') as inner:
+                self.engine.execute('SELECT 1')
+        self.assertIs(outer, inner)
+        self.assertEqual(1, outer.count)
+
+    def test_slowest(self):
+        cfg.CONF.set_override('query_accounting_slowest', 2)
+        stats = query_stats.QueryStats('stack_create')
+        for duration in (0.3, 0.1, 0.5, 0.2):
+            stats.record('SELECT %s' % duration, duration)
+        self.assertEqual(4, stats.count)
+        self.assertEqual([(0.5, 'SELECT 0.5'), (0.3, 'SELECT 0.3')],
+                         sorted(stats.slowest, reverse=True))
+
+    def test_inherit(self):
+        with query_stats.operation('stack_create') as parent:
+            stats = query_stats.current()
+        with query_stats.inherit(stats) as child:
+            self.engine.execute('SELECT 1')
+        self.assertIsNot(parent, child)
+        self.assertEqual('stack_create', child.operation)
+        self.assertEqual(1, child.count)
+        self.assertEqual(0, parent.count)
+
+    def test_report(self):
+        sink = self.patchobject(metrics, '_sink')
+        with query_stats.operation('stack_create'):
+            self.engine.execute('SELECT 1')
+        sink.counter.assert_called_once_with('db.statements.stack_create', 1)
+        self.assertEqual('db.statement_time.stack_create',
+                         sink.timing.call_args[0][0])
+
+
+class QueryBudgetTest(common.HeatTestCase):
+    def setUp(self):
+        super(QueryBudgetTest, self).setUp()
+        self.ctx = utils.dummy_context()
+
+    def test_stack_store(self):
+        with utils.QueryBudget(self, 10):
+            utils.parse_stack(tmpl)
+
+    def test_stack_load(self):
+        stack_id = utils.parse_stack(tmpl).id
+        with utils.QueryBudget(self, 10):
+            parser.Stack.load(self.ctx, stack_id=stack_id)
+
+    def test_over_budget(self):
+        engine = utils.get_engine()
+
+        def over_budget():
+            with utils.QueryBudget(self, 1):
+                engine.execute('SELECT 1')
+                engine.execute('SELECT 2')
+
+        self.assertRaises(AssertionError, over_budget)
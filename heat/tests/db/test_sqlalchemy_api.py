@@ -16,6 +16,7 @@ import datetime
 import fixtures
 import json
 import logging
+import os
 import time
 import uuid
 
@@ -31,6 +32,7 @@ from sqlalchemy.orm import session
 
 from heat.common import context
 from heat.common import exception
+from heat.common import pagination
 from heat.common import template_format
 from heat.db.sqlalchemy import api as db_api
 from heat.db.sqlalchemy import models
@@ -42,6 +44,7 @@ from heat.engine.resources.aws.ec2 import instance as instances
 from heat.engine import scheduler
 from heat.engine import stack as parser
 from heat.engine import template as tmpl
+from heat.engine import template_files
 from heat.tests import common
 from heat.tests.openstack.nova import fakes as fakes_nova
 from heat.tests import utils
@@ -587,6 +590,30 @@ class SqlAlchemyTest(common.HeatTestCase):
         self.assertEqual(1, len(st_db))
         self.assertEqual(stacks[0].id, st_db[0].id)
 
+    def test_stack_get_all_cursor_marker(self):
+        stacks = [self._setup_test_stack('stack', x)[1] for x in UUIDs]
+        marker_stack = db_api.stack_get(self.ctx, stacks[1].id)
+        cursor = pagination.encode_cursor({
+            'name': marker_stack.name,
+            'status': marker_stack.status,
+            'created_at': marker_stack.created_at,
+            'updated_at': marker_stack.updated_at,
+            'id': marker_stack.id})
+
+        st_db = db_api.stack_get_all(self.ctx, marker=cursor)
+        self.assertEqual(1, len(st_db))
+        self.assertEqual(stacks[0].id, st_db[0].id)
+
+        st_db = db_api.stack_get_all(self.ctx, marker=cursor,
+                                     sort_keys='stack_name', sort_dir='asc')
+        self.assertEqual(1, len(st_db))
+        self.assertEqual(stacks[2].id, st_db[0].id)
+
+    def test_stack_get_all_invalid_cursor_marker(self):
+        cursor = pagination.encode_cursor({'id': UUID1})
+        self.assertRaises(exception.Invalid, db_api.stack_get_all,
+                          self.ctx, marker=cursor)
+
     def test_stack_get_all_non_existing_marker(self):
         [self._setup_test_stack('stack', x)[1] for x in UUIDs]
 
@@ -1377,12 +1404,14 @@ class SqlAlchemyTest(common.HeatTestCase):
 
 def create_raw_template(context, **kwargs):
     t = template_format.parse(wp_template)
+    bar_digest = template_files.digest('bar')
     template = {
         'template': t,
-        'files': {'foo': 'bar'}
+        'files': {'foo': bar_digest}
     }
     template.update(kwargs)
-    return db_api.raw_template_create(context, template)
+    return db_api.raw_template_create(context, template,
+                                      file_contents={bar_digest: 'bar'})
 
 
 def create_user_creds(ctx, **kwargs):
@@ -1508,7 +1537,33 @@ class DBAPIRawTemplateTest(common.HeatTestCase):
         tp = create_raw_template(self.ctx, template=t)
         self.assertIsNotNone(tp.id)
         self.assertEqual(t, tp.template)
-        self.assertEqual({'foo': 'bar'}, tp.files)
+        bar_digest = template_files.digest('bar')
+        self.assertEqual({'foo': bar_digest}, tp.files)
+        self.assertEqual({bar_digest: 'bar'},
+                         db_api.raw_template_files_get(self.ctx,
+                                                       [bar_digest]))
+
+    def test_raw_template_create_shares_files(self):
+        tp1 = create_raw_template(self.ctx)
+        tp2 = create_raw_template(self.ctx,
+                                  files={'foo': template_files.digest('bar'),
+                                         'baz': template_files.digest('bar')})
+        self.assertEqual({template_files.digest('bar'): 2},
+                         self._refcounts())
+        db_api.raw_template_delete(self.ctx, tp1.id)
+        self.assertEqual({template_files.digest('bar'): 1},
+                         self._refcounts())
+        db_api.raw_template_delete(self.ctx, tp2.id)
+        self.assertEqual({}, self._refcounts())
+
+    def test_raw_template_create_missing_file_contents(self):
+        self.assertRaises(exception.NotFound, create_raw_template, self.ctx,
+                          files={'foo': template_files.digest('qux')})
+        self.assertEqual({}, self._refcounts())
+
+    def _refcounts(self):
+        return dict((row.digest, row.refcount) for row in
+                    self.ctx.session.query(models.RawTemplateFiles))
 
     def test_raw_template_get(self):
         t = template_format.parse(wp_template)
@@ -1543,21 +1598,24 @@ class DBAPIRawTemplateTest(common.HeatTestCase):
         }
         '''
         new_t = template_format.parse(another_wp_template)
+        myfile_digest = template_files.digest('file:///home/somefile')
         new_files = {
-            'foo': 'bar',
-            'myfile': 'file:///home/somefile'
+            'myfile': myfile_digest
         }
         new_values = {
             'template': new_t,
             'files': new_files
         }
         orig_tp = create_raw_template(self.ctx)
-        updated_tp = db_api.raw_template_update(self.ctx,
-                                                orig_tp.id, new_values)
+        updated_tp = db_api.raw_template_update(
+            self.ctx, orig_tp.id, new_values,
+            file_contents={myfile_digest: 'file:///home/somefile'})
 
         self.assertEqual(orig_tp.id, updated_tp.id)
         self.assertEqual(new_t, updated_tp.template)
         self.assertEqual(new_files, updated_tp.files)
+        # the file no longer referenced is released
+        self.assertEqual({myfile_digest: 1}, self._refcounts())
 
     def test_raw_template_delete(self):
         t = template_format.parse(wp_template)
@@ -1731,6 +1789,28 @@ class DBAPIStackTest(common.HeatTestCase):
         self.assertRaises(exception.NotFound, db_api.stack_update, self.ctx,
                           UUID2, values)
 
+    def test_stack_clear_cached_outputs(self):
+        cached = {'state': 'x', 'outputs': {'foo': 'bar'}}
+        stack1 = create_stack(self.ctx, self.template, self.user_creds,
+                              cached_outputs=cached)
+        stack2 = create_stack(self.ctx, self.template, self.user_creds,
+                              cached_outputs=None)
+        stack3 = create_stack(self.ctx, self.template, self.user_creds,
+                              cached_outputs=cached)
+        updated_at = stack1.updated_at
+
+        self.assertEqual(1, db_api.stack_clear_cached_outputs(
+            self.ctx, [stack1.id, stack2.id]))
+        stack = db_api.stack_get(self.ctx, stack1.id)
+        self.assertIsNone(stack.cached_outputs)
+        self.assertEqual(updated_at, stack.updated_at)
+        self.assertIsNotNone(
+            db_api.stack_get(self.ctx, stack3.id).cached_outputs)
+
+        # stacks with no cached outputs are not written to
+        self.assertEqual(0, db_api.stack_clear_cached_outputs(
+            self.ctx, [stack1.id, stack2.id]))
+
     def test_stack_update_matches_traversal_id(self):
         stack = create_stack(self.ctx, self.template, self.user_creds)
         values = {
@@ -1986,6 +2066,52 @@ class DBAPIStackTest(common.HeatTestCase):
         self._deleted_stack_existance(utils.dummy_context(), stacks,
                                       (), (0, 1, 2, 3, 4))
 
+    def test_purge_deleted_releases_template_files(self):
+        now = timeutils.utcnow()
+        qux_digest = template_files.digest('qux')
+        template = db_api.raw_template_create(
+            self.ctx, {'template': {}, 'files': {'qux': qux_digest,
+                                                 'foo': self.template.files[
+                                                     'foo']}},
+            file_contents={qux_digest: 'qux'})
+        create_stack(self.ctx, template, self.user_creds,
+                     deleted_at=now - datetime.timedelta(days=2))
+
+        db_api.purge_deleted(age=1, granularity='days')
+
+        refcounts = dict((row.digest, row.refcount) for row in
+                         self.ctx.session.query(models.RawTemplateFiles))
+        self.assertEqual({template_files.digest('bar'): 1}, refcounts)
+
+    def test_purge_deleted_batched(self):
+        now = timeutils.utcnow()
+        delta = datetime.timedelta(seconds=3600 * 7)
+        deleted = [now - delta * i for i in range(1, 6)]
+        templates = [create_raw_template(self.ctx) for i in range(5)]
+        creds = [create_user_creds(self.ctx) for i in range(5)]
+        stacks = [create_stack(self.ctx, templates[i], creds[i],
+                               deleted_at=deleted[i]) for i in range(5)]
+        info_logger = self.useFixture(
+            fixtures.FakeLogger(level=logging.INFO, format="%(message)s"))
+        self.patchobject(time, 'sleep')
+
+        db_api.purge_deleted(age=1100, granularity='minutes', batch_size=2,
+                             batch_sleep=5)
+        self._deleted_stack_existance(utils.dummy_context(), stacks,
+                                      (0, 1), (2, 3, 4))
+        self.assertIn('Purged batch 1: event=0, raw_template=2, '
+                      'raw_template_files=0, resource=0, resource_count=0, '
+                      'resource_data=0, stack=2, stack_lock=0, stack_tag=0, '
+                      'sync_point=0, user_creds=2',
+                      info_logger.output)
+        self.assertIn('Purged batch 2: ', info_logger.output)
+        self.assertNotIn('Purged batch 3: ', info_logger.output)
+        time.sleep.assert_called_once_with(5)
+
+    def test_purge_deleted_invalid_batch_size(self):
+        self.assertRaises(exception.Error, db_api.purge_deleted,
+                          age=1, batch_size=0)
+
     def test_purge_deleted_prev_raw_template(self):
         now = timeutils.utcnow()
         templates = [create_raw_template(self.ctx) for i in range(2)]
@@ -2102,6 +2228,66 @@ class DBAPIStackTest(common.HeatTestCase):
         self.assertEqual(0, db_api.stack_count_total_resources(
             self.ctx, None))
 
+    def _stored_count(self, root_stack_id):
+        counter = self.ctx.session.query(models.ResourceCount).get(
+            root_stack_id)
+        return counter and counter.total
+
+    def test_resource_count_maintained(self):
+        root = create_stack(self.ctx, self.template, self.user_creds)
+        child = create_stack(self.ctx, self.template, self.user_creds,
+                             owner_id=root.id)
+        resources = [create_resource(self.ctx, root, root_stack_id=root.id)
+                     for i in range(3)]
+        for i in range(2):
+            create_resource(self.ctx, child, root_stack_id=root.id)
+        self.assertEqual(5, self._stored_count(root.id))
+
+        db_api.resource_delete(self.ctx, resources[0].id)
+        self.assertEqual(4, self._stored_count(root.id))
+        self.assertEqual(4, db_api.stack_count_total_resources(self.ctx,
+                                                               root.id))
+
+        db_api.stack_delete(self.ctx, child.id)
+        self.assertEqual(2, self._stored_count(root.id))
+        self.assertEqual(2, db_api.stack_count_total_resources(self.ctx,
+                                                               root.id))
+
+    def test_resource_count_reconcile(self):
+        root = create_stack(self.ctx, self.template, self.user_creds)
+        other = create_stack(self.ctx, self.template, self.user_creds)
+        for i in range(3):
+            create_resource(self.ctx, root, root_stack_id=root.id)
+        create_resource(self.ctx, other, root_stack_id=other.id)
+
+        self.ctx.session.query(models.ResourceCount).filter_by(
+            root_stack_id=root.id).update({'total': 7})
+        self.ctx.session.query(models.ResourceCount).filter_by(
+            root_stack_id=other.id).delete()
+        self.ctx.session.add(models.ResourceCount(root_stack_id='gone',
+                                                  total=4))
+        self.ctx.session.flush()
+        self.assertEqual(7, db_api.stack_count_total_resources(self.ctx,
+                                                               root.id))
+
+        self.assertEqual(3, db_api.resource_count_reconcile(self.ctx))
+        self.assertEqual(3, self._stored_count(root.id))
+        self.assertEqual(1, self._stored_count(other.id))
+        self.assertIsNone(self._stored_count('gone'))
+        self.assertEqual(0, db_api.resource_count_reconcile(self.ctx))
+
+    def test_purge_deleted_resource_count(self):
+        root = create_stack(self.ctx, self.template, self.user_creds)
+        child = create_stack(
+            self.ctx, self.template, self.user_creds, owner_id=root.id,
+            deleted_at=timeutils.utcnow() - datetime.timedelta(days=2))
+        create_resource(self.ctx, root, root_stack_id=root.id)
+        for i in range(2):
+            create_resource(self.ctx, child, root_stack_id=root.id)
+
+        db_api.purge_deleted(age=1, granularity='days')
+        self.assertEqual(1, self._stored_count(root.id))
+
 
 class DBAPIResourceTest(common.HeatTestCase):
     def setUp(self):
@@ -2209,6 +2395,31 @@ class DBAPIResourceTest(common.HeatTestCase):
         self.assertRaises(exception.NotFound, db_api.resource_get_all_by_stack,
                           self.ctx, self.stack2.id)
 
+    def test_resource_metadata_update_all(self):
+        res1 = create_resource(self.ctx, self.stack, name='res1')
+        res2 = create_resource(self.ctx, self.stack, name='res2')
+        res3 = create_resource(self.ctx, self.stack, name='res3')
+
+        current = db_api.resource_metadata_get_all(self.ctx,
+                                                   [res1.id, res2.id])
+        self.assertEqual({res1.id: ({'foo': '123'}, None),
+                          res2.id: ({'foo': '123'}, None)}, current)
+
+        # res2 is changed concurrently, so it should not be updated
+        db_api.resource_update(self.ctx, res2.id, {'status': 'failed'},
+                               None)
+        conflicts = db_api.resource_metadata_update_all(
+            self.ctx, {res1.id: ({'foo': 'bar'}, None),
+                       res2.id: ({'foo': 'bar'}, None)})
+
+        self.assertEqual([res2.id], conflicts)
+        current = db_api.resource_metadata_get_all(
+            self.ctx, [res1.id, res2.id, res3.id])
+        self.assertEqual({res1.id: ({'foo': 'bar'}, 1),
+                          res2.id: ({'foo': '123'}, 1),
+                          res3.id: ({'foo': '123'}, None)}, current)
+        self.assertEqual({}, db_api.resource_metadata_get_all(self.ctx, []))
+
 
 class DBAPIStackLockTest(common.HeatTestCase):
     def setUp(self):
@@ -2362,6 +2573,21 @@ class DBAPIEventTest(common.HeatTestCase):
         self.assertEqual('create_complete', ret_event.resource_status_reason)
         self.assertEqual({'name': 'foo'}, ret_event.resource_properties)
 
+    def test_event_create_compresses_properties(self):
+        event = create_event(self.ctx)
+        self.assertIsNone(event._resource_properties)
+        ret_event = db_api.event_get(self.ctx, event.id)
+        self.assertIsNone(ret_event._resource_properties)
+        self.assertEqual({'name': 'foo'}, ret_event.resource_properties_data)
+
+    def test_event_get_legacy_properties(self):
+        event = models.Event(stack_id='test_stack_id', resource_name='res')
+        event._resource_properties = {'name': 'legacy'}
+        event.save(self.ctx.session)
+        ret_event = db_api.event_get(self.ctx, event.id)
+        self.assertIsNone(ret_event.resource_properties_data)
+        self.assertEqual({'name': 'legacy'}, ret_event.resource_properties)
+
     def test_event_get_all(self):
         self.stack1 = create_stack(self.ctx, self.template, self.user_creds,
                                    tenant='tenant1')
@@ -2440,6 +2666,31 @@ class DBAPIEventTest(common.HeatTestCase):
         events = db_api.event_get_all_by_stack(self.ctx, self.stack2.id)
         self.assertEqual(1, len(events))
 
+    def test_event_get_all_by_stack_cursor_marker(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        events = [create_event(self.ctx, stack_id=self.stack1.id,
+                               resource_name='res%d' % i)
+                  for i in range(4)]
+        page = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                             limit=2)
+        self.assertEqual([events[3].uuid, events[2].uuid],
+                         [e.uuid for e in page])
+
+        cursor = pagination.encode_cursor({
+            'created_at': page[-1].created_at,
+            'resource_type': page[-1].resource_type,
+            'id': page[-1].id})
+        page = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                             limit=2, marker=cursor)
+        self.assertEqual([events[1].uuid, events[0].uuid],
+                         [e.uuid for e in page])
+
+        # IDs given out as markers before cursors existed still work
+        page = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                             limit=2, marker=events[2].uuid)
+        self.assertEqual([events[1].uuid, events[0].uuid],
+                         [e.uuid for e in page])
+
     def test_event_count_all_by_stack(self):
         self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
         self.stack2 = create_stack(self.ctx, self.template, self.user_creds)
@@ -2456,6 +2707,71 @@ class DBAPIEventTest(common.HeatTestCase):
         self.assertEqual(1, db_api.event_count_all_by_stack(self.ctx,
                                                             self.stack2.id))
 
+    def test_event_prune_max_events(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        self.stack2 = create_stack(self.ctx, self.template, self.user_creds)
+        for i in range(5):
+            create_event(self.ctx, stack_id=self.stack1.id,
+                         resource_name='res%d' % i)
+        create_event(self.ctx, stack_id=self.stack2.id, resource_name='res')
+
+        deleted = db_api.event_prune(self.ctx, max_events=2, batch_size=2)
+
+        self.assertEqual(3, deleted)
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id)
+        self.assertEqual(['res3', 'res4'],
+                         sorted(e.resource_name for e in events))
+        self.assertEqual(1, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack2.id))
+
+    def test_event_prune_max_age(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        old = timeutils.utcnow() - datetime.timedelta(days=10)
+        for i in range(3):
+            create_event(self.ctx, stack_id=self.stack1.id,
+                         resource_name='old%d' % i, created_at=old)
+        create_event(self.ctx, stack_id=self.stack1.id, resource_name='new')
+
+        deleted = db_api.event_prune(self.ctx,
+                                     max_age=datetime.timedelta(days=7),
+                                     batch_size=2)
+
+        self.assertEqual(3, deleted)
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id)
+        self.assertEqual(['new'], [e.resource_name for e in events])
+
+    def test_event_prune_unlimited(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        create_event(self.ctx, stack_id=self.stack1.id)
+
+        self.assertEqual(0, db_api.event_prune(self.ctx))
+        self.assertEqual(1, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack1.id))
+
+
+class DBAPIEngineLeaseTest(common.HeatTestCase):
+    def test_engine_lease_acquire(self):
+        self.assertTrue(db_api.engine_lease_acquire('prune', UUID1, 60))
+        # renewing a lease we hold succeeds
+        self.assertTrue(db_api.engine_lease_acquire('prune', UUID1, 60))
+
+    def test_engine_lease_acquire_held(self):
+        db_api.engine_lease_acquire('prune', UUID1, 60)
+        self.assertFalse(db_api.engine_lease_acquire('prune', UUID2, 60))
+        self.assertTrue(db_api.engine_lease_acquire('other', UUID2, 60))
+
+    def test_engine_lease_acquire_expired(self):
+        db_api.engine_lease_acquire('prune', UUID1, -1)
+        self.assertTrue(db_api.engine_lease_acquire('prune', UUID2, 60))
+        self.assertFalse(db_api.engine_lease_acquire('prune', UUID1, 60))
+
+    def test_engine_lease_release(self):
+        db_api.engine_lease_acquire('prune', UUID1, 60)
+        db_api.engine_lease_release('prune', UUID2)
+        self.assertFalse(db_api.engine_lease_acquire('prune', UUID2, 60))
+        db_api.engine_lease_release('prune', UUID1)
+        self.assertTrue(db_api.engine_lease_acquire('prune', UUID2, 60))
+
 
 class DBAPIWatchRuleTest(common.HeatTestCase):
     def setUp(self):
@@ -2990,7 +3306,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
         ''')
         template = {
             'template': self.t,
-            'files': {'foo': 'bar'},
+            'files': {},
             'environment': {
                 'parameters': {
                     'param1': 'foo',
@@ -3002,7 +3318,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
 
         return db_api.raw_template_create(self.ctx, template)
 
-    def _test_db_encrypt_decrypt(self, batch_size=50):
+    def _test_db_encrypt_decrypt(self, batch_size=50, **kwargs):
         session = db_api.get_session()
         hidden_params_dict = {
             'param2': 'bar',
@@ -3028,7 +3344,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
             if enc_key is None:
                 enc_key = cfg.CONF.auth_encryption_key
             self.assertEqual([], db_api.db_encrypt_parameters_and_properties(
-                self.ctx, enc_key, batch_size=batch_size))
+                self.ctx, enc_key, batch_size=batch_size, **kwargs))
             session = db_api.get_session()
             enc_raw_templates = session.query(models.RawTemplate).all()
             self.assertNotEqual([], enc_raw_templates)
@@ -3062,7 +3378,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
             if enc_key is None:
                 enc_key = cfg.CONF.auth_encryption_key
             self.assertEqual([], db_api.db_decrypt_parameters_and_properties(
-                self.ctx, enc_key, batch_size=batch_size))
+                self.ctx, enc_key, batch_size=batch_size, **kwargs))
             session = db_api.get_session()
             dec_templates = session.query(models.RawTemplate).all()
             self.assertNotEqual([], dec_templates)
@@ -3129,6 +3445,72 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
         self.addCleanup(self._delete_templates, [tmpl1, tmpl2])
         self._test_db_encrypt_decrypt(batch_size=1)
 
+    def test_db_encrypt_decrypt_streaming(self):
+        tmpl1 = self._create_template()
+        tmpl2 = self._create_template()
+        self.addCleanup(self._delete_templates, [tmpl1, tmpl2])
+        checkpoint = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                  'checkpoint')
+        self._test_db_encrypt_decrypt(batch_size=1, streaming=True,
+                                      checkpoint=checkpoint)
+
+    def test_db_encrypt_streaming_resume(self):
+        checkpoint = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                  'checkpoint')
+        with open(checkpoint, 'w') as f:
+            json.dump({'operation': 'encrypt',
+                       'markers': {'raw_template': self.template.id,
+                                   'resource': self.resources[0].id}}, f)
+        tmpl = self._create_template()
+        self.addCleanup(self._delete_templates, [tmpl])
+
+        self.assertEqual([], db_api.db_encrypt_parameters_and_properties(
+            self.ctx, cfg.CONF.auth_encryption_key, streaming=True,
+            checkpoint=checkpoint))
+
+        session = db_api.get_session()
+        # Only the template created after the checkpoint is encrypted
+        self.assertEqual(
+            'bar', session.query(models.RawTemplate).get(
+                self.template.id).environment['parameters']['param2'])
+        self.assertEqual(
+            'cryptography_decrypt_v1', session.query(models.RawTemplate).get(
+                tmpl.id).environment['parameters']['param2'][0])
+        self.assertFalse(session.query(models.Resource).get(
+            self.resources[0].id).properties_data_encrypted)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_db_encrypt_streaming_locked_resource(self):
+        locked = self.resources[0]
+        db_api.resource_update(self.ctx, locked.id, {'engine_id': 'engine'},
+                               locked.atomic_key)
+
+        excs = db_api.db_encrypt_parameters_and_properties(
+            self.ctx, cfg.CONF.auth_encryption_key, streaming=True)
+
+        self.assertEqual(1, len(excs))
+        self.assertIsInstance(excs[0], exception.UpdateInProgress)
+        session = db_api.get_session()
+        self.assertFalse(session.query(models.Resource).get(
+            locked.id).properties_data_encrypted)
+
+    def test_hidden_param_names(self):
+        cfn = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Parameters': {'a': {'Type': 'String', 'NoEcho': 'true'},
+                              'b': {'Type': 'String', 'NoEcho': 'false'},
+                              'c': {'Type': 'String'}}}
+        self.assertEqual(set(['a']), db_api._hidden_param_names(cfn))
+        hot = {'heat_template_version': '2013-05-23',
+               'parameters': {'a': {'type': 'string', 'hidden': 'true'},
+                              'b': {'type': 'string', 'hidden': 'false'},
+                              'c': {'type': 'string', 'hidden': False},
+                              'd': {'type': 'string'}}}
+        self.assertEqual(set(['a']), db_api._hidden_param_names(hot))
+        self.assertEqual(set(['param2', 'param3', 'param_string_default_int',
+                              'param_number', 'param_boolean', 'param_map',
+                              'param_comma_list']),
+                         db_api._hidden_param_names(self.t))
+
     def test_db_encrypt_decrypt_exception_continue(self):
         """Test that encryption and decryption proceed after an exception"""
         def create_malformed_template():
@@ -3154,7 +3536,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
             ''')
             template = {
                 'template': t,
-                'files': {'foo': 'bar'},
+                'files': {},
                 'environment': ''}  # <- environment should be a dict
 
             return db_api.raw_template_create(self.ctx, template)
@@ -3192,7 +3574,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
     def test_db_encrypt_no_env(self):
         template = {
             'template': self.t,
-            'files': {'foo': 'bar'},
+            'files': {},
             'environment': None}
         db_api.raw_template_create(self.ctx, template)
         self.assertEqual([], db_api.db_encrypt_parameters_and_properties(
@@ -3201,7 +3583,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
     def test_db_encrypt_no_env_parameters(self):
         template = {
             'template': self.t,
-            'files': {'foo': 'bar'},
+            'files': {},
             'environment': {'encrypted_param_names': ['a']}}
         db_api.raw_template_create(self.ctx, template)
         self.assertEqual([], db_api.db_encrypt_parameters_and_properties(
@@ -3288,7 +3670,7 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
         del(t['parameters']['param2'])
         template = {
             'template': t,
-            'files': {'foo': 'bar'},
+            'files': {},
             'environment': {'encrypted_param_names': [],
                             'parameters': {'param2': 'foo'}}}
         db_api.raw_template_create(self.ctx, template)
@@ -11,6 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import zlib
+
 from sqlalchemy.dialects.mysql import base as mysql_base
 from sqlalchemy.dialects.sqlite import base as sqlite_base
 from sqlalchemy import types
@@ -65,6 +67,43 @@ class JsonTest(common.HeatTestCase):
         self.assertIsNone(result)
 
 
+class CompressedJsonTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(CompressedJsonTest, self).setUp()
+        self.sqltype = db_types.CompressedJson()
+
+    def test_process_bind_param(self):
+        dialect = None
+        value = {'foo': 'bar'}
+        result = self.sqltype.process_bind_param(value, dialect)
+        self.assertEqual(b'{"foo": "bar"}', zlib.decompress(result))
+
+    def test_process_bind_param_serialised(self):
+        dialect = None
+        value = '{"foo": "bar"}'
+        result = self.sqltype.process_bind_param(value, dialect)
+        self.assertEqual(b'{"foo": "bar"}', zlib.decompress(result))
+
+    def test_process_bind_param_null(self):
+        dialect = None
+        value = None
+        result = self.sqltype.process_bind_param(value, dialect)
+        self.assertIsNone(result)
+
+    def test_process_result_value(self):
+        dialect = None
+        value = zlib.compress(b'{"foo": "bar"}')
+        result = self.sqltype.process_result_value(value, dialect)
+        self.assertEqual({'foo': 'bar'}, result)
+
+    def test_process_result_value_null(self):
+        dialect = None
+        value = None
+        result = self.sqltype.process_result_value(value, dialect)
+        self.assertIsNone(result)
+
+
 class ListTest(common.HeatTestCase):
 
     def setUp(self):
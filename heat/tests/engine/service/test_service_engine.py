@@ -40,7 +40,7 @@ class ServiceEngineTest(common.HeatTestCase):
 
     def test_make_sure_rpc_version(self):
         self.assertEqual(
-            '1.29',
+            '1.31',
             service.EngineService.RPC_API_VERSION,
             ('RPC version is changed, please update this test to new version '
              'and make sure additional test cases are added for RPC APIs '
@@ -211,10 +211,14 @@ class ServiceEngineTest(common.HeatTestCase):
         # Manage Thread group
         thread_group_class.assert_called_once_with()
         manage_thread_group = thread_group_class.return_value
-        manage_thread_group.add_timer.assert_called_once_with(
-            cfg.CONF.periodic_interval,
-            self.eng.service_manage_report
-        )
+        manage_thread_group.add_timer.assert_has_calls([
+            mock.call(cfg.CONF.periodic_interval,
+                      self.eng.service_manage_report),
+            mock.call(cfg.CONF.event_prune_interval,
+                      self.eng.prune_events),
+            mock.call(cfg.CONF.resource_count_reconcile_interval,
+                      self.eng.reconcile_resource_counts)
+        ])
 
     @mock.patch('heat.common.messaging.get_rpc_server',
                 return_value=mock.Mock())
@@ -385,6 +389,75 @@ class ServiceEngineTest(common.HeatTestCase):
         self.eng.reset()
         setup_logging_mock.assert_called_once_with(cfg.CONF, 'heat')
 
+    @mock.patch('heat.objects.event.Event.prune', return_value=3)
+    @mock.patch('heat.objects.engine_lease.EngineLease.acquire',
+                return_value=True)
+    def test_prune_events(self, lease_acquire, event_prune):
+        cfg.CONF.set_override('event_prune_interval', 60, enforce_type=True)
+        cfg.CONF.set_override('max_events_per_stack', 100, enforce_type=True)
+        cfg.CONF.set_override('event_retention_days', 7, enforce_type=True)
+        cfg.CONF.set_override('event_purge_batch_size', 50,
+                              enforce_type=True)
+        self.eng.engine_id = 'engine-1'
+
+        self.eng.prune_events()
+
+        lease_acquire.assert_called_once_with('event_prune', 'engine-1', 120)
+        event_prune.assert_called_once_with(
+            mock.ANY, max_events=100, max_age=datetime.timedelta(days=7),
+            batch_size=50)
+
+    @mock.patch('heat.objects.event.Event.prune')
+    @mock.patch('heat.objects.engine_lease.EngineLease.acquire',
+                return_value=False)
+    def test_prune_events_lease_held_elsewhere(self, lease_acquire,
+                                               event_prune):
+        self.eng.engine_id = 'engine-2'
+
+        self.eng.prune_events()
+
+        self.assertTrue(lease_acquire.called)
+        self.assertFalse(event_prune.called)
+
+    @mock.patch('heat.objects.event.Event.prune')
+    @mock.patch('heat.objects.engine_lease.EngineLease.acquire')
+    def test_prune_events_unlimited(self, lease_acquire, event_prune):
+        cfg.CONF.set_override('max_events_per_stack', 0, enforce_type=True)
+        cfg.CONF.set_override('event_retention_days', 0, enforce_type=True)
+
+        self.eng.prune_events()
+
+        self.assertFalse(lease_acquire.called)
+        self.assertFalse(event_prune.called)
+
+    @mock.patch('heat.objects.stack.Stack.reconcile_resource_counts',
+                return_value=2)
+    @mock.patch('heat.objects.engine_lease.EngineLease.acquire',
+                return_value=True)
+    def test_reconcile_resource_counts(self, lease_acquire, reconcile):
+        cfg.CONF.set_override('resource_count_reconcile_interval', 600,
+                              enforce_type=True)
+        self.eng.engine_id = 'engine-1'
+
+        self.eng.reconcile_resource_counts()
+
+        lease_acquire.assert_called_once_with('resource_count_reconcile',
+                                              'engine-1', 1200)
+        reconcile.assert_called_once_with(mock.ANY)
+
+    @mock.patch('heat.objects.stack.Stack.reconcile_resource_counts')
+    @mock.patch('heat.objects.engine_lease.EngineLease.acquire',
+                return_value=False)
+    def test_reconcile_resource_counts_lease_held_elsewhere(self,
+                                                            lease_acquire,
+                                                            reconcile):
+        self.eng.engine_id = 'engine-2'
+
+        self.eng.reconcile_resource_counts()
+
+        self.assertTrue(lease_acquire.called)
+        self.assertFalse(reconcile.called)
+
     @mock.patch('oslo_messaging.Target',
                 return_value=mock.Mock())
     @mock.patch('heat.common.messaging.get_rpc_client',
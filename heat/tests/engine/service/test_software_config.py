@@ -14,7 +14,9 @@
 import datetime
 import uuid
 
+import eventlet
 import mock
+from oslo_config import cfg
 from oslo_messaging.rpc import dispatcher
 from oslo_serialization import jsonutils as json
 from oslo_utils import timeutils
@@ -297,6 +299,104 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
             self.ctx, server_id=server_id)
         self.assertEqual(2, len(metadata))
 
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_poll_metadata_software_deployments(self, res_get):
+        rs = mock.Mock()
+        rs.id = 42
+        rs.rsrc_metadata = {'deployments': [{'id': 'a'}]}
+        rs.rsrc_metadata_version = 3
+        res_get.return_value = rs
+        md_sd = self.patchobject(self.engine.software_config,
+                                 'metadata_software_deployments')
+
+        result = self.engine.poll_metadata_software_deployments(
+            self.ctx, server_id='1234')
+        self.assertEqual({'metadata': [{'id': 'a'}], 'etag': '42-3'},
+                         result)
+        result = self.engine.poll_metadata_software_deployments(
+            self.ctx, server_id='1234', etag='42-2')
+        self.assertEqual({'metadata': [{'id': 'a'}], 'etag': '42-3'},
+                         result)
+        # unchanged, and not waiting
+        result = self.engine.poll_metadata_software_deployments(
+            self.ctx, server_id='1234', etag='42-3')
+        self.assertEqual({'metadata': None, 'etag': '42-3'}, result)
+        md_sd.assert_not_called()
+
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_poll_metadata_software_deployments_not_stored(self, res_get):
+        res_get.return_value = None
+        md_sd = self.patchobject(self.engine.software_config,
+                                 'metadata_software_deployments',
+                                 return_value=[{'id': 'a'}])
+
+        result = self.engine.poll_metadata_software_deployments(
+            self.ctx, server_id='1234', etag='42-3')
+        self.assertEqual({'metadata': [{'id': 'a'}], 'etag': None}, result)
+        md_sd.assert_called_once_with(self.ctx, '1234')
+
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_poll_metadata_software_deployments_wait(self, res_get):
+        svc = self.engine.software_config
+        rs = mock.Mock()
+        rs.id = 42
+        rs.rsrc_metadata = {'deployments': []}
+        rs.rsrc_metadata_version = 3
+
+        def changed():
+            rs.rsrc_metadata_version = 4
+            svc._notify_metadata_waiters('1234')
+
+        def get_resource(cnxt, server_id):
+            if rs.rsrc_metadata_version == 3:
+                eventlet.spawn_after(0.01, changed)
+            return rs
+
+        res_get.side_effect = get_resource
+        result = svc.poll_metadata_software_deployments(
+            self.ctx, '1234', etag='42-3', timeout=10)
+        self.assertEqual({'metadata': [], 'etag': '42-4'}, result)
+        self.assertEqual(2, res_get.call_count)
+        self.assertEqual({}, svc._metadata_waiters)
+        self.assertEqual({}, svc._metadata_polls)
+
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_poll_metadata_software_deployments_wait_timeout(self, res_get):
+        svc = self.engine.software_config
+        rs = mock.Mock()
+        rs.id = 42
+        rs.rsrc_metadata = {'deployments': []}
+        rs.rsrc_metadata_version = 3
+        res_get.return_value = rs
+        svc.METADATA_RECHECK_INTERVAL = 0.01
+        self.patchobject(timeutils.StopWatch, 'expired',
+                         side_effect=[False, True])
+
+        result = svc.poll_metadata_software_deployments(
+            self.ctx, '1234', etag='42-3', timeout=10)
+        self.assertEqual({'metadata': None, 'etag': '42-3'}, result)
+        self.assertEqual(2, res_get.call_count)
+        # the waiter of a server whose metadata never changed is discarded
+        self.assertEqual({}, svc._metadata_waiters)
+        self.assertEqual({}, svc._metadata_polls)
+
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_poll_metadata_software_deployments_max_waiters(self, res_get):
+        svc = self.engine.software_config
+        rs = mock.Mock()
+        rs.id = 42
+        rs.rsrc_metadata = {'deployments': []}
+        rs.rsrc_metadata_version = 3
+        res_get.return_value = rs
+        cfg.CONF.set_override('deployment_metadata_max_waiters', 1)
+        svc._metadata_polls['5678'] = 1
+
+        result = svc.poll_metadata_software_deployments(
+            self.ctx, '1234', etag='42-3', timeout=10)
+        self.assertEqual({'metadata': None, 'etag': '42-3'}, result)
+        self.assertEqual(1, res_get.call_count)
+        self.assertNotIn('1234', svc._metadata_waiters)
+
     def test_show_software_deployment(self):
         deployment_id = str(uuid.uuid4())
         ex = self.assertRaises(dispatcher.ExpectedException,
@@ -548,7 +648,9 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         self.assertEqual('DEPLOY', updated['action'])
         self.assertEqual('WAITING', updated['status'])
 
-        mock_push.assert_called_once_with(self.ctx, server_id, None)
+        mock_push.assert_called_once_with(
+            self.ctx, server_id, None,
+            add_config=mock.ANY)
 
     def test_update_software_deployment_fields(self):
 
@@ -599,8 +701,10 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
 
         # assert one call for the create, and one for the delete
         pmsd.assert_has_calls([
-            mock.call(self.ctx, deployment['server_id'], None),
-            mock.call(self.ctx, deployment['server_id'], None)
+            mock.call(self.ctx, deployment['server_id'], None,
+                      add_config=mock.ANY),
+            mock.call(self.ctx, deployment['server_id'], None,
+                      remove_config_id=deployment['config_id'])
         ])
 
         deployments = self.engine.list_software_deployments(
@@ -673,6 +777,7 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
     @mock.patch.object(service_software_config.requests, 'put')
     def test_push_metadata_software_deployments_temp_url(
             self, put, res_get, res_upd, md_sd):
+        cfg.CONF.set_override('deployment_metadata_push_delay', 0)
         rs = mock.Mock()
         rs.rsrc_metadata = {'original': 'metadata'}
         rs.id = '1234'
@@ -707,6 +812,7 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
     @mock.patch.object(zaqar.ZaqarClientPlugin, 'create_for_tenant')
     def test_push_metadata_software_deployments_queue(
             self, plugin, res_get, res_upd, md_sd):
+        cfg.CONF.set_override('deployment_metadata_push_delay', 0)
         rs = mock.Mock()
         rs.rsrc_metadata = {'original': 'metadata'}
         rs.id = '1234'
@@ -740,6 +846,93 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         queue.post.assert_called_once_with(
             {'body': result_metadata, 'ttl': 3600})
 
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(db_api, 'resource_update')
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_incremental(
+            self, res_get, res_upd, md_sd):
+        cfg.CONF.set_override('deployment_metadata_push_delay', 0)
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': [
+            {'id': 'a', 'name': 'config_a'},
+            {'id': 'c', 'name': 'config_c'}]}
+        rs.id = '1234'
+        rs.atomic_key = 1
+        rs.data = []
+        res_get.return_value = rs
+        res_upd.return_value = 1
+
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', None, remove_config_id='a',
+            add_config={'id': 'b', 'name': 'config_b'})
+
+        md_sd.assert_not_called()
+        result_metadata = {'deployments': [
+            {'id': 'b', 'name': 'config_b'},
+            {'id': 'c', 'name': 'config_c'}]}
+        res_upd.assert_called_once_with(
+            self.ctx, '1234', {'rsrc_metadata': result_metadata}, 1)
+
+    def test_merge_deployments_metadata(self):
+        merge = self.engine.software_config._merge_deployments_metadata
+        deployments = [{'id': '1', 'name': 'a'}, {'id': '2', 'name': 'b'}]
+        self.assertEqual(
+            [{'id': '1', 'name': 'a'}, {'id': '3', 'name': 'a'},
+             {'id': '2', 'name': 'b'}],
+            merge(deployments, add_config={'id': '3', 'name': 'a'}))
+        self.assertEqual([{'id': '2', 'name': 'b'}],
+                         merge(deployments, remove_config_id='1'))
+        self.assertEqual(deployments,
+                         merge(deployments, remove_config_id='4'))
+        # the original list is not modified
+        self.assertEqual(2, len(deployments))
+
+    def test_merge_deployments_metadata_unnamed(self):
+        merge = self.engine.software_config._merge_deployments_metadata
+        deployments = [{'id': '1', 'name': None}, {'id': '2', 'name': 'b'}]
+        self.assertEqual(
+            [{'id': '1', 'name': None}, {'id': '3', 'name': None},
+             {'id': '2', 'name': 'b'}],
+            merge(deployments, add_config={'id': '3', 'name': None}))
+        self.assertEqual(
+            [{'id': '1', 'name': None}, {'id': '3', 'name': 'a'},
+             {'id': '2', 'name': 'b'}],
+            merge(deployments, add_config={'id': '3', 'name': 'a'}))
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       '_push_metadata')
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(db_api, 'resource_update')
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_coalesced(
+            self, res_get, res_upd, md_sd, push):
+        rs = mock.Mock()
+        rs.rsrc_metadata = {}
+        rs.id = '1234'
+        rs.atomic_key = 1
+        rs.data = []
+        res_get.return_value = rs
+        res_upd.return_value = 1
+        md_sd.return_value = []
+        svc = self.engine.software_config
+        add_thread = self.patchobject(svc.tg, 'add_thread')
+
+        svc._push_metadata_software_deployments(self.ctx, '1234', None)
+        svc._push_metadata_software_deployments(self.ctx, '1234', None)
+
+        # both changes are stored, but only one push is scheduled
+        self.assertEqual(2, res_upd.call_count)
+        self.assertEqual(1, add_thread.call_count)
+        push.assert_not_called()
+
+        sleep = self.patchobject(service_software_config.eventlet, 'sleep')
+        add_thread.call_args[0][0]()
+        sleep.assert_called_once_with(1.0)
+        push.assert_called_once_with(self.ctx, rs, rs.rsrc_metadata, None)
+        self.assertEqual(set(), svc._pending_pushes)
+
     @mock.patch.object(service_software_config.SoftwareConfigService,
                        'signal_software_deployment')
     @mock.patch.object(swift.SwiftClientPlugin, '_create')
@@ -439,11 +439,12 @@ class StackResourcesServiceTest(common.HeatTestCase):
         self.assertEqual(exception.InvalidBreakPointHook,
                          ex.exc_info[0])
 
-    @mock.patch.object(res.Resource, 'metadata_update')
+    @mock.patch.object(stack.Stack, 'metadata_refresh')
+    @mock.patch.object(stack.Stack, 'metadata_dependents')
     @mock.patch.object(res.Resource, 'signal')
     @mock.patch.object(service.EngineService, '_get_stack')
     def test_signal_calls_metadata_update(self, mock_get, mock_signal,
-                                          mock_update):
+                                          mock_dependents, mock_refresh):
         # fake keystone client
         self.patchobject(keystone.KeystoneClientPlugin, '_create',
                          return_value=test_fakes.FakeKeystoneClient())
@@ -456,8 +457,8 @@ class StackResourcesServiceTest(common.HeatTestCase):
 
         mock_get.return_value = s
         mock_signal.return_value = True
-        # this will be called once for the Random resource
-        mock_update.return_value = None
+        dependent = mock.Mock()
+        mock_dependents.return_value = [dependent]
 
         self.eng.resource_signal(self.ctx,
                                  dict(self.stack.identifier()),
@@ -465,7 +466,78 @@ class StackResourcesServiceTest(common.HeatTestCase):
                                  sync_call=True)
         mock_get.assert_called_once_with(self.ctx, self.stack.identifier())
         mock_signal.assert_called_once_with(mock.ANY, False)
-        mock_update.assert_called_once_with()
+        (signalled,), _ = mock_dependents.call_args
+        self.assertEqual(['WebServerScaleDownPolicy'],
+                         [r.name for r in signalled])
+        mock_refresh.assert_called_once_with([dependent])
+
+    @mock.patch.object(stack.Stack, 'metadata_refresh')
+    @mock.patch.object(res.Resource, 'signal')
+    def test_signal_reception_async_coalesced(self, mock_signal,
+                                              mock_refresh):
+        self.eng.thread_group_mgr = tools.DummyThreadGroupMgrLogStart()
+        self.stack = self._stack_create('signal_reception_coalesced')
+        mock_load = self.patchobject(stack.Stack, 'load',
+                                     wraps=stack.Stack.load)
+        mock_signal.return_value = True
+
+        for data in ({'food': 'yum'}, {'food': 'yuck'}):
+            self.eng.resource_signal(self.ctx,
+                                     dict(self.stack.identifier()),
+                                     'WebServerScaleDownPolicy',
+                                     data)
+
+        # the second signal is queued with the stack loaded for the first
+        self.assertEqual(1, mock_load.call_count)
+        self.assertEqual([(self.stack.id, mock.ANY)],
+                         self.eng.thread_group_mgr.started)
+        self.assertEqual(0, mock_signal.call_count)
+
+        queue = self.eng._signal_queues[self.stack.id]
+        self.eng._process_signal_queue(queue)
+        mock_signal.assert_has_calls([mock.call({'food': 'yum'}, False),
+                                      mock.call({'food': 'yuck'}, False)])
+        self.assertNotIn(self.stack.id, self.eng._signal_queues)
+        # no other resource refers to the signalled one
+        mock_refresh.assert_not_called()
+
+    @mock.patch.object(res.Resource, 'signal')
+    def test_signal_queue_reloads_changed_stack(self, mock_signal):
+        self.eng.thread_group_mgr = tools.DummyThreadGroupMgrLogStart()
+        self.stack = self._stack_create('signal_reception_reload')
+        mock_signal.return_value = False
+
+        self.eng.resource_signal(self.ctx, dict(self.stack.identifier()),
+                                 'WebServerScaleDownPolicy', {'food': 'yum'})
+        queue = self.eng._signal_queues[self.stack.id]
+        queued_stack = queue.stack
+
+        # the stack is updated before the queued signal is processed
+        stack_object.Stack.update_by_id(self.ctx, self.stack.id,
+                                        {'current_traversal': 'new'})
+        mock_load = self.patchobject(stack.Stack, 'load',
+                                     wraps=stack.Stack.load)
+        self.eng._process_signal_queue(queue)
+
+        self.assertEqual(1, mock_load.call_count)
+        self.assertIsNot(queued_stack, queue.stack)
+        self.assertEqual('new', queue.stack.current_traversal)
+        mock_signal.assert_called_once_with({'food': 'yum'}, False)
+
+    @mock.patch.object(res.Resource, 'signal')
+    def test_signal_queue_resource_removed(self, mock_signal):
+        self.eng.thread_group_mgr = tools.DummyThreadGroupMgrLogStart()
+        self.stack = self._stack_create('signal_reception_removed')
+
+        self.eng.resource_signal(self.ctx, dict(self.stack.identifier()),
+                                 'WebServerScaleDownPolicy', {'food': 'yum'})
+        queue = self.eng._signal_queues[self.stack.id]
+        self.patchobject(self.eng, '_refresh_queued_stack',
+                         return_value=None)
+        self.eng._process_signal_queue(queue)
+
+        mock_signal.assert_not_called()
+        self.assertNotIn(self.stack.id, self.eng._signal_queues)
 
     @mock.patch.object(res.Resource, 'metadata_update')
     @mock.patch.object(res.Resource, 'signal')
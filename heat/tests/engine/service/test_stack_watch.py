@@ -19,7 +19,6 @@ from heat.engine import service
 from heat.engine import service_stack_watch
 from heat.engine import stack
 from heat.engine import watchrule
-from heat.objects import stack as stack_object
 from heat.objects import watch_data as watch_data_object
 from heat.objects import watch_rule as watch_rule_object
 from heat.rpc import api as rpc_api
@@ -41,25 +40,16 @@ class StackWatchTest(common.HeatTestCase):
         self.eng.create_periodic_tasks()
         self.eng.manage_thread_grp.wait()
 
-    @mock.patch.object(service_stack_watch.StackWatch, 'start_watch_task')
-    @mock.patch.object(stack_object.Stack, 'get_all')
+    @mock.patch.object(service_stack_watch.StackWatch, 'start_all')
     @mock.patch.object(service.service.Service, 'start')
-    def test_start_watches_all_stacks(self, mock_super_start, mock_get_all,
-                                      start_watch_task):
-        s1 = mock.Mock(id=1)
-        s2 = mock.Mock(id=2)
-        mock_get_all.return_value = [s1, s2]
-        start_watch_task.return_value = None
+    def test_start_watches_all_stacks(self, mock_super_start, start_all):
+        start_all.return_value = None
 
         self.eng.thread_group_mgr = None
         self._create_periodic_tasks()
 
-        mock_get_all.assert_called_once_with(mock.ANY, tenant_safe=False,
-                                             show_hidden=True)
-        calls = start_watch_task.call_args_list
-        self.assertEqual(2, start_watch_task.call_count)
-        self.assertIn(mock.call(1, mock.ANY), calls)
-        self.assertIn(mock.call(2, mock.ANY), calls)
+        start_all.assert_called_once_with(mock.ANY)
+        self.assertEqual('a-host', self.eng.stack_watch.host)
 
     @tools.stack_context('service_show_watch_test_stack', False)
     def test_show_watch(self):
@@ -162,6 +152,43 @@ class StackWatchTest(common.HeatTestCase):
         for key in rpc_api.WATCH_DATA_KEYS:
             self.assertIn(key, result[0])
 
+    @tools.stack_context('service_create_watch_data_test_stack', False)
+    def test_create_watch_data_unnamed(self):
+        self.patchobject(watchrule, 'rule_index',
+                         watchrule.WatchRuleIndex())
+        rule = {u'EvaluationPeriods': u'1',
+                u'Namespace': u'system/linux',
+                u'Period': u'300',
+                u'ComparisonOperator': u'GreaterThanThreshold',
+                u'Statistic': u'SampleCount',
+                u'Threshold': u'2',
+                u'MetricName': u'ServiceFailure'}
+        for name in ('create_data_1', 'create_data_2'):
+            watchrule.WatchRule(context=self.ctx,
+                                watch_name=name,
+                                rule=dict(rule, MetricName=name),
+                                watch_data=[],
+                                stack_id=self.stack.id,
+                                state='NORMAL').store()
+
+        data = {u'Namespace': u'system/linux',
+                u'create_data_2': {u'Units': u'Counter', u'Value': 1}}
+        self.eng.create_watch_data(self.ctx, None, data)
+
+        watch_1 = watch_rule_object.WatchRule.get_by_name(self.ctx,
+                                                          'create_data_1')
+        watch_2 = watch_rule_object.WatchRule.get_by_name(self.ctx,
+                                                          'create_data_2')
+        self.assertEqual([], watch_1.watch_data)
+        self.assertEqual(1, len(watch_2.watch_data))
+
+        data = {u'Namespace': u'system/linux',
+                u'unwatched': {u'Units': u'Counter', u'Value': 1}}
+        ex = self.assertRaises(dispatcher.ExpectedException,
+                               self.eng.create_watch_data,
+                               self.ctx, None, data)
+        self.assertEqual(exception.EntityNotFound, ex.exc_info[0])
+
     @tools.stack_context('service_show_watch_state_test_stack')
     @mock.patch.object(stack.Stack, 'resource_by_refid')
     def test_set_watch_state(self, mock_ref):
@@ -64,7 +64,7 @@ class ThreadGroupManagerTest(common.HeatTestCase):
         self.assertEqual(self.tg_mock, thm.groups['test'])
         self.tg_mock.add_thread.assert_called_with(
             thm._start_with_trace, context.get_current(), None,
-            self.f, *self.fargs, **self.fkwargs)
+            self.f, *self.fargs, _query_stats=None, **self.fkwargs)
         self.assertEqual(ret, self.tg_mock.add_thread())
 
     def test_tgm_add_timer(self):
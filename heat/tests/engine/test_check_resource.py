@@ -24,7 +24,9 @@ from heat.engine import resource
 from heat.engine import scheduler
 from heat.engine import stack
 from heat.engine import sync_point
+from heat.engine import template
 from heat.engine import worker
+from heat.objects import resource as resource_objects
 from heat.rpc import worker_client
 from heat.tests import common
 from heat.tests.engine import tools
@@ -647,3 +649,38 @@ class MiscMethodsTest(common.HeatTestCase):
             self.resource, self.resource.stack.t.id, {}, 'engine-id',
             self.stack.timeout_secs())
         self.assertTrue(mock_delete.called)
+
+
+class CheckResourceQueryBudgetTest(common.HeatTestCase):
+    def setUp(self):
+        super(CheckResourceQueryBudgetTest, self).setUp()
+        cfg.CONF.set_default('convergence_engine', True)
+        self.patchobject(worker_client.WorkerClient, 'check_resource')
+        self.worker = worker.WorkerService('host-1',
+                                           'topic-1',
+                                           'engine_id',
+                                           mock.Mock())
+        self.worker._rpc_client = worker_client.WorkerClient()
+        self.ctx = utils.dummy_context()
+
+    def _check_resource(self, num_resources, budget):
+        tmpl = {'heat_template_version': '2013-05-23',
+                'resources': dict(('R%d' % i, {'type': 'GenericResourceType'})
+                                  for i in range(num_resources))}
+        stk = stack.Stack(self.ctx, utils.random_name(),
+                          template.Template(tmpl), convergence=True)
+        stk.converge_stack(stk.t)
+        rsrc = stk['R0']
+        with utils.QueryBudget(self, budget, 'check_resource') as stats:
+            self.worker.check_resource(self.ctx, rsrc.id,
+                                       stk.current_traversal, {}, True, None)
+        db_res = resource_objects.Resource.get_obj(self.ctx, rsrc.id)
+        self.assertEqual((rsrc.CREATE, rsrc.COMPLETE),
+                         (db_res.action, db_res.status))
+        return stats.count
+
+    def test_check_resource(self):
+        # the stack is not complete after either check
+        small = self._check_resource(2, 80)
+        # checking a resource does not cost more in a larger stack
+        self._check_resource(6, small)
@@ -15,6 +15,7 @@ import contextlib
 import itertools
 
 import eventlet
+import mock
 import six
 
 from heat.common.i18n import repr_wrapper
@@ -318,6 +319,87 @@ class DependencyTaskGroupTest(common.HeatTestCase):
         exc = self.assertRaises(type(e1), run_tasks_with_exceptions)
         self.assertEqual(e1, exc)
 
+    def _limited_test(self, limiter, *edges):
+        running = set()
+        concurrency = []
+
+        def task(key):
+            running.add(key)
+            concurrency.append(len(running))
+            yield
+            yield
+            running.remove(key)
+
+        tg = scheduler.DependencyTaskGroup(dependencies.Dependencies(edges),
+                                           task, limiter=limiter)
+        scheduler.TaskRunner(tg)(wait_time=None)
+        return concurrency
+
+    def test_limiter(self):
+        limiter = scheduler.ConcurrencyLimiter(2, key=lambda k: 'service')
+
+        concurrency = self._limited_test(limiter, ('A', None), ('B', None),
+                                         ('C', None), ('D', None))
+
+        self.assertEqual(4, len(concurrency))
+        self.assertEqual(2, max(concurrency))
+        self.assertEqual(0, limiter.running('service'))
+
+    def test_limiter_per_key(self):
+        limiter = scheduler.ConcurrencyLimiter(1, key=lambda k: k.lower())
+
+        concurrency = self._limited_test(limiter, ('a', None), ('A', None),
+                                         ('b', None), ('B', None))
+
+        self.assertEqual(2, max(concurrency))
+
+    def test_limiter_unlimited_key(self):
+        limiter = scheduler.ConcurrencyLimiter(1, key=lambda k: None)
+
+        concurrency = self._limited_test(limiter, ('A', None), ('B', None),
+                                         ('C', None))
+
+        self.assertEqual(3, max(concurrency))
+
+    def test_limiter_released_on_error(self):
+        limiter = scheduler.ConcurrencyLimiter(1, key=lambda k: 'service')
+
+        def task(key):
+            yield
+            raise ValueError(key)
+
+        tg = scheduler.DependencyTaskGroup(
+            dependencies.Dependencies([('A', None), ('B', None)]), task,
+            limiter=limiter, aggregate_exceptions=True)
+
+        self.assertRaises(scheduler.ExceptionGroup,
+                          scheduler.TaskRunner(tg), wait_time=None)
+        self.assertEqual(0, limiter.running('service'))
+
+    def test_limiter_error_releases_only_acquired(self):
+        limiter = mock.Mock()
+        acquired = []
+
+        def acquire(key):
+            if key == 'B':
+                raise ValueError(key)
+            acquired.append(key)
+            return True
+
+        limiter.acquire.side_effect = acquire
+
+        def task(key):
+            yield
+
+        tg = scheduler.DependencyTaskGroup(
+            dependencies.Dependencies([('A', None), ('B', None)]), task,
+            limiter=limiter)
+
+        self.assertRaises(ValueError, scheduler.TaskRunner(tg),
+                          wait_time=None)
+        self.assertEqual([mock.call(k) for k in acquired],
+                         limiter.release.call_args_list)
+
 
 class TaskTest(common.HeatTestCase):
 
@@ -825,6 +907,56 @@ class TimeoutTest(common.HeatTestCase):
         self.assertNotEqual(earlier, later)
 
 
+class PollBackoffTest(common.HeatTestCase):
+    def test_exponential_up_to_ceiling(self):
+        backoff = scheduler.PollBackoff(10)
+        periods = [backoff.period() for i in range(7)]
+        self.assertEqual([1, 2, 4, 8, 10, 10, 10], periods)
+        self.assertEqual(7, backoff.polls)
+
+    def test_reset_on_status_change(self):
+        backoff = scheduler.PollBackoff(10)
+        periods = [backoff.period(s) for s in ('a', 'a', 'a', 'b', 'b')]
+        self.assertEqual([1, 2, 4, 1, 2], periods)
+
+    def test_ceiling_of_one(self):
+        backoff = scheduler.PollBackoff(1)
+        self.assertEqual([1, 1, 1], [backoff.period() for i in range(3)])
+
+    def test_jitter(self):
+        randint = self.patchobject(scheduler.random, 'randint',
+                                   side_effect=lambda a, b: b)
+        backoff = scheduler.PollBackoff(8, jitter=0.5)
+        periods = [backoff.period() for i in range(5)]
+        self.assertEqual([1, 3, 6, 12, 12], periods)
+        self.assertEqual([mock.call(0, 1), mock.call(0, 2),
+                          mock.call(0, 4), mock.call(0, 4)],
+                         randint.call_args_list)
+
+    def test_jitter_less_than_one_step(self):
+        self.patchobject(scheduler.random, 'randint',
+                         side_effect=lambda a, b: b)
+        backoff = scheduler.PollBackoff(10, jitter=0.1)
+        periods = [backoff.period() for i in range(5)]
+        self.assertEqual([1, 3, 5, 9, 11], periods)
+
+    def test_require_status(self):
+        backoff = scheduler.PollBackoff(10, jitter=0.5, require_status=True)
+        periods = [backoff.period(s) for s in (None, None, 'a', 'a', None)]
+        self.assertEqual([1, 1, 1, 2, 1], periods)
+        self.assertEqual(5, backoff.polls)
+
+    def test_poll_counts(self):
+        vol = scheduler.PollBackoff(10, key='OS::Cinder::Volume')
+        srv = scheduler.PollBackoff(10, key='OS::Nova::Server')
+        for i in range(3):
+            vol.period()
+        srv.period()
+        scheduler.PollBackoff(10).period()
+        self.assertEqual({'OS::Cinder::Volume': 3, 'OS::Nova::Server': 1},
+                         scheduler.poll_counts())
+
+
 class DescriptionTest(common.HeatTestCase):
 
     def setUp(self):
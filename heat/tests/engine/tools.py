@@ -360,3 +360,4 @@ class DummyThreadGroupMgrLogStart(DummyThreadGroupManager):
     def start(self, stack_id, func, *args, **kwargs):
         # Here we only store the started task so it can be checked
         self.started.append((stack_id, func))
+        return DummyThread()
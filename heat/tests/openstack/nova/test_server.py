@@ -516,6 +516,15 @@ class ServersTest(common.HeatTestCase):
         self.assertEqual('Server is not active - Unknown status BOGUS due to '
                          '"Unknown"', six.text_type(e))
 
+    def test_server_create_poll_status(self):
+        return_server = self.fc.servers.list()[1]
+        server = self._create_test_server(return_server,
+                                          'cr_poll_sts')
+        return_server.status = 'BUILD'
+        setattr(return_server, 'OS-EXT-STS:task_state', 'spawning')
+        self.assertFalse(server.check_create_complete(server.resource_id))
+        self.assertEqual(('BUILD', 'spawning'), server.poll_status)
+
     def test_server_create_error_status(self):
         # NOTE(pshchelo) checking is done only on check_create_complete
         # level so not to mock out all delete/retry logic that kicks in
@@ -1414,8 +1423,7 @@ class ServersTest(common.HeatTestCase):
         scheduler.TaskRunner(server.update, resource_defns['WebServer'])()
         self.assertEqual({'test': 123}, server.metadata_get())
 
-        ud_tmpl.t['Resources']['WebServer']['Metadata'] = {'test': 456}
-        server.t = ud_tmpl.resource_definitions(server.stack)['WebServer']
+        server.t = resource_defns['WebServer'].freeze(metadata={'test': 456})
 
         self.assertEqual({'test': 123}, server.metadata_get())
         server.metadata_update()
@@ -204,6 +204,33 @@ class AttributesTest(common.HeatTestCase):
         ]
         self.resolver.assert_has_calls(calls)
 
+    def test_caching_store(self):
+        self.resolver.side_effect = ["value1", "value3"]
+        stored = {'test2': 'stored2'}
+        store = mock.Mock()
+        store.get.side_effect = stored.get
+        attribs = attributes.Attributes('test resource',
+                                        self.attributes_schema,
+                                        self.resolver)
+        attribs.set_store(store)
+
+        self.assertEqual("value1", attribs['test1'])
+        self.assertEqual("stored2", attribs['test2'])
+        self.assertEqual("value3", attribs['test3'])
+        # CACHE_NONE attributes are never looked up in the store
+        self.assertEqual([mock.call('test1'), mock.call('test2')],
+                         store.get.call_args_list)
+        # reading never writes to the store
+        self.assertFalse(store.set.called)
+        self.assertEqual([mock.call('test1'), mock.call('test3')],
+                         self.resolver.call_args_list)
+        self.assertEqual({'test1': 'value1', 'test2': 'stored2'},
+                         attribs.resolved_values())
+
+        attribs.reset_resolved_values()
+        self.assertEqual("stored2", attribs['test2'])
+        self.assertEqual(2, self.resolver.call_count)
+
 
 class AttributesTypeTest(common.HeatTestCase):
     scenarios = [
@@ -0,0 +1,129 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+
+import fixtures
+import mock
+from oslo_config import cfg
+
+from heat.common import metrics
+from heat.common import timeutils
+from heat.db import api as db_api
+from heat.tests import common
+
+
+class MetricsTest(common.HeatTestCase):
+    def setUp(self):
+        super(MetricsTest, self).setUp()
+        self.sink = mock.Mock(spec=['counter', 'timing'])
+        self.patchobject(metrics, '_sink', self.sink)
+
+    def test_null_sink_default(self):
+        self.patchobject(metrics, '_sink', None)
+        self.assertIsInstance(metrics._get_sink(), metrics.NullSink)
+        self.assertFalse(metrics.enabled())
+
+    def test_unknown_sink(self):
+        self.patchobject(metrics, '_sink', None)
+        cfg.CONF.set_override('sink', 'nonexistent', group='metrics')
+        self.assertIsInstance(metrics._get_sink(), metrics.NullSink)
+
+    def test_incr(self):
+        metrics.incr('rpc.cast.stack_cancel_update')
+        self.sink.counter.assert_called_once_with(
+            'rpc.cast.stack_cancel_update', 1)
+
+    def test_timer(self):
+        self.patchobject(timeutils, 'wallclock', side_effect=[10.0, 10.25])
+        with metrics.timer('stack.load'):
+            pass
+        self.sink.timing.assert_called_once_with('stack.load', 250.0)
+
+    def test_timer_decorator(self):
+        self.patchobject(timeutils, 'wallclock',
+                         side_effect=[1.0, 1.5, 2.0, 2.125])
+
+        @metrics.timer('template.parse')
+        def parse(tmpl):
+            return tmpl
+
+        self.assertEqual('a', parse('a'))
+        self.assertEqual('b', parse('b'))
+        self.assertEqual([mock.call('template.parse', 500.0),
+                          mock.call('template.parse', 125.0)],
+                         self.sink.timing.call_args_list)
+
+    def test_timer_exception(self):
+        self.patchobject(timeutils, 'wallclock', side_effect=[1.0, 2.0])
+
+        def fail():
+            with metrics.timer('resource.handle_create'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.sink.timing.assert_called_once_with('resource.handle_create',
+                                                 1000.0)
+
+    def test_timer_disabled(self):
+        self.patchobject(metrics, '_sink', metrics.NullSink())
+        wallclock = self.patchobject(timeutils, 'wallclock')
+        with metrics.timer('stack.load'):
+            pass
+        self.assertFalse(wallclock.called)
+
+    def test_db_api_timed(self):
+        impl = mock.Mock(spec=['stack_get'])
+        self.patchobject(db_api.IMPL, '_impl', impl)
+        self.patchobject(timeutils, 'wallclock', side_effect=[1.0, 1.002])
+        db_api.stack_get('ctx', 'stack-id')
+        self.assertTrue(impl.stack_get.called)
+        self.assertEqual('db.stack_get', self.sink.timing.call_args[0][0])
+
+
+class SinkTest(common.HeatTestCase):
+    def test_statsd(self):
+        cfg.CONF.set_override('statsd_host', '192.0.2.1', group='metrics')
+        mock_socket = self.patchobject(metrics.socket, 'socket')
+        sink = metrics.StatsdSink()
+        sink.counter('rpc.cast.stack_delete', 1)
+        sink.timing('stack.load', 12.5)
+        sendto = mock_socket.return_value.sendto
+        self.assertEqual(
+            [mock.call(b'heat.rpc.cast.stack_delete:1|c', ('192.0.2.1', 8125)),
+             mock.call(b'heat.stack.load:12.500|ms', ('192.0.2.1', 8125))],
+            sendto.call_args_list)
+
+    def test_statsd_send_failure(self):
+        mock_socket = self.patchobject(metrics.socket, 'socket')
+        mock_socket.return_value.sendto.side_effect = metrics.socket.error
+        metrics.StatsdSink().counter('rpc.cast.stack_delete', 1)
+
+    def test_file(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'metrics.json')
+        cfg.CONF.set_override('file_path', path, group='metrics')
+        cfg.CONF.set_override('prefix', '', group='metrics')
+        self.patchobject(timeutils, 'wallclock', return_value=100.0)
+        sink = metrics.FileSink()
+        sink.counter('rpc.cast.stack_delete', 1)
+        sink.timing('stack.load', 12.5)
+        with open(path) as metrics_file:
+            lines = [json.loads(line) for line in metrics_file]
+        self.assertEqual(
+            [{'time': 100.0, 'name': 'rpc.cast.stack_delete',
+              'type': 'counter', 'value': 1},
+             {'time': 100.0, 'name': 'stack.load',
+              'type': 'timing', 'value': 12.5}],
+            lines)
@@ -0,0 +1,41 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+from heat.common import pagination
+from heat.tests import common
+
+
+class TestCursor(common.HeatTestCase):
+    def test_round_trip(self):
+        values = {'created_at': datetime.datetime(2016, 7, 1, 9, 30, 5, 42),
+                  'updated_at': None,
+                  'name': u'st\xe4ck',
+                  'id': 'f8bb6b39-35a8-4a9a-b7d0-e1b6b5e5ab04'}
+        cursor = pagination.encode_cursor(values)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(values, pagination.decode_cursor(cursor))
+
+    def test_decode_id(self):
+        self.assertIsNone(pagination.decode_cursor(
+            'f8bb6b39-35a8-4a9a-b7d0-e1b6b5e5ab04'))
+
+    def test_decode_invalid(self):
+        for marker in ('this is not a cursor', 'e30', '', None, 42):
+            self.assertIsNone(pagination.decode_cursor(marker))
+
+    def test_decode_unknown_version(self):
+        cursor = pagination.encode_cursor({'id': 1})
+        self.patchobject(pagination, 'CURSOR_VERSION', 2)
+        self.assertIsNone(pagination.decode_cursor(cursor))
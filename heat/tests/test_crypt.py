@@ -37,3 +37,17 @@ class CryptTest(common.HeatTestCase):
         exp_msg = ('heat.conf misconfigured, auth_encryption_key '
                    'must be 32 characters')
         self.assertIn(exp_msg, six.text_type(err))
+
+    def test_fernet_cipher_cached(self):
+        key = 'y' * 32
+        self.assertIs(crypt._fernet(key), crypt._fernet(key))
+        self.assertIsNot(crypt._fernet(key), crypt._fernet('z' * 32))
+
+    def test_decrypt_many(self):
+        key = 'x' * 32
+        encrypted = [crypt.encrypt('foo', key), (None, None),
+                     crypt.encrypt(u'b\xe4r', key)]
+        self.assertEqual(['foo', None, u'b\xe4r'],
+                         crypt.decrypt_many(encrypted, key))
+        self.assertEqual([crypt.decrypt(m, v, key) for m, v in encrypted],
+                         crypt.decrypt_many(iter(encrypted), key))
@@ -504,6 +504,7 @@ class StackServiceTest(common.HeatTestCase):
             self.assertIn('stack_status_reason', s)
             self.assertIn('description', s)
             self.assertIn('WordPress', s['description'])
+            self.assertIn('cursor', s)
 
         self.m.VerifyAll()
 
@@ -947,7 +948,11 @@ class StackServiceTest(common.HeatTestCase):
 
     @tools.stack_context('service_describe_all_test_stack', False)
     def test_stack_describe_all(self):
-        sl = self.eng.show_stack(self.ctx, None, resolve_outputs=True)
+        with mock.patch.object(parser.Stack,
+                               'store_cached_outputs') as mock_store:
+            sl = self.eng.show_stack(self.ctx, None, resolve_outputs=True)
+        # listing stacks never writes their outputs
+        self.assertFalse(mock_store.called)
 
         self.assertEqual(1, len(sl))
 
@@ -11,9 +11,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
+from oslo_utils import timeutils
 
 from heat.engine import service_stack_watch
+from heat.engine import watchrule
 from heat.rpc import api as rpc_api
 from heat.tests import common
 from heat.tests import utils
@@ -75,8 +79,8 @@ class StackServiceWatcherTest(common.HeatTestCase):
         sw.start_watch_task(stack_id, self.ctx)
 
         # assert that add_timer IS called.
-        self.assertEqual([mock.call(stack_id, sw.periodic_watcher_task,
-                                    sid=stack_id)],
+        self.assertEqual([mock.call(service_stack_watch.WATCH_TASK_GROUP,
+                                    sw.periodic_watcher_task)],
                          tg.add_timer.call_args_list)
 
     @mock.patch.object(service_stack_watch.stack_object.Stack,
@@ -113,6 +117,100 @@ class StackServiceWatcherTest(common.HeatTestCase):
         sw.start_watch_task(stack_id, self.ctx)
 
         # assert that add_timer IS called.
-        self.assertEqual([mock.call(stack_id, sw.periodic_watcher_task,
-                                    sid=stack_id)],
+        self.assertEqual([mock.call(service_stack_watch.WATCH_TASK_GROUP,
+                                    sw.periodic_watcher_task)],
+                         tg.add_timer.call_args_list)
+
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_all')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'update_by_id')
+    def test_start_all(self, watch_rule_update, watch_rule_get_all):
+        wr1 = mock.Mock(id=4)
+        watch_rule_get_all.return_value = [wr1]
+        tg = mock.Mock()
+        sw = service_stack_watch.StackWatch(tg)
+        sw.start_all(self.ctx)
+        sw.start_watch_task(90, self.ctx)
+
+        watch_rule_update.assert_called_once_with(
+            self.ctx, 4, {'last_evaluated': mock.ANY})
+        # Only one timer is created for all stacks
+        self.assertEqual([mock.call(service_stack_watch.WATCH_TASK_GROUP,
+                                    sw.periodic_watcher_task)],
                          tg.add_timer.call_args_list)
+
+    @mock.patch.object(service_stack_watch.service_objects.Service,
+                       'get_all')
+    def test_shard(self, service_get_all):
+        now = timeutils.utcnow()
+        old = now - datetime.timedelta(seconds=3600)
+
+        def service(host, updated_at, binary='heat-engine'):
+            return mock.Mock(host=host, binary=binary, updated_at=updated_at,
+                             created_at=updated_at, report_interval=60)
+
+        service_get_all.return_value = [
+            service('host-a', now), service('host-a', now),
+            service('host-b', now), service('host-c', old),
+            service('host-d', now, binary='heat-api')]
+
+        sids = ['stack-%d' % i for i in range(20)]
+        shards = []
+        for host in ('host-a', 'host-b'):
+            sw = service_stack_watch.StackWatch(mock.Mock(), host)
+            in_shard = sw._get_shard(self.ctx)
+            shards.append(set(sid for sid in sids if in_shard(sid)))
+
+        # Each stack is watched by exactly one live engine host
+        self.assertEqual(set(sids), shards[0] | shards[1])
+        self.assertEqual(set(), shards[0] & shards[1])
+
+    @mock.patch.object(watchrule.WatchRule, 'rule_actions')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_all')
+    def test_periodic_watcher_no_stack_load(self, watch_rule_get_all,
+                                            rule_actions):
+        rule = {'MetricName': 'test_metric',
+                'Period': '300',
+                'Statistic': 'SampleCount',
+                'ComparisonOperator': 'GreaterThanThreshold',
+                'Threshold': '2'}
+        last = timeutils.utcnow() - datetime.timedelta(seconds=600)
+        wr1 = mock.Mock(id=4, stack_id='stack-1', rule=rule,
+                        state=rpc_api.WATCH_STATE_NODATA, watch_data=[],
+                        last_evaluated=last)
+        wr1.name = 'wr1'
+        wr2 = mock.Mock(id=5, stack_id='stack-2', rule=rule,
+                        state=rpc_api.WATCH_STATE_CEILOMETER_CONTROLLED)
+        watch_rule_get_all.return_value = [wr1, wr2]
+        rule_actions.return_value = []
+        self.patchobject(watchrule.WatchRule, 'store')
+        tg = mock.Mock()
+        sw = service_stack_watch.StackWatch(tg)
+
+        sw.periodic_watcher_task()
+
+        rule_actions.assert_called_once_with(watchrule.WatchRule.NORMAL)
+        self.assertFalse(tg.start.called)
+
+    @mock.patch.object(watchrule.WatchRule, 'load')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_all')
+    def test_periodic_watcher_runs_actions(self, watch_rule_get_all,
+                                           watch_rule_load):
+        wr1 = mock.Mock(id=4, stack_id='stack-1',
+                        state=rpc_api.WATCH_STATE_NODATA)
+        watch_rule_get_all.return_value = [wr1]
+        rule = watch_rule_load.return_value
+        rule.evaluate.return_value = ['DummyAction']
+        tg = mock.Mock()
+        sw = service_stack_watch.StackWatch(tg)
+
+        sw.periodic_watcher_task()
+
+        watch_rule_load.assert_called_once_with(mock.ANY, watch=wr1,
+                                                use_stored_context=True)
+        tg.start.assert_called_once_with('stack-1', mock.ANY, rule.stack,
+                                         ['DummyAction'],
+                                         rule.get_details.return_value)
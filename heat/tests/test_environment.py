@@ -562,6 +562,49 @@ class ChildEnvTest(common.HeatTestCase):
         res = cenv.get_resource_info('OS::Food')
         self.assertEqual('apples.yaml', res.value)
 
+    def test_registry_inherited_not_copied(self):
+        env = {u'resource_registry': {u'OS::Food': u'fruity.yaml',
+                                      u'resources': {u'abc': {
+                                          u'OS::Food': u'nutty.yaml'}}}}
+        penv = environment.Environment(env=env)
+        with mock.patch.object(environment.ResourceRegistry,
+                               '_register_info') as register:
+            cenv = environment.get_child_environment(penv, {'foo': 'bar'})
+        self.assertFalse(register.called)
+        self.assertEqual(penv.user_env_as_dict()['resource_registry'],
+                         cenv.user_env_as_dict()['resource_registry'])
+        res = cenv.get_resource_info('OS::Food', resource_name='abc')
+        self.assertEqual('nutty.yaml', res.value)
+
+    def test_registry_inherited_mapping_uses_child(self):
+        env1 = {u'resource_registry': {u'OS::Food': u'OS::Fruit',
+                                       u'OS::Fruit': u'carrots.yaml'}}
+        env2 = {u'resource_registry': {u'OS::Fruit': u'apples.yaml'}}
+        penv = environment.Environment(env=env1)
+        cenv = environment.get_child_environment(penv, env2)
+        self.assertEqual('apples.yaml',
+                         cenv.get_resource_info('OS::Food').value)
+        self.assertEqual('carrots.yaml',
+                         penv.get_resource_info('OS::Food').value)
+
+    def test_registry_removal_in_grandchild(self):
+        env = {u'resource_registry': {u'OS::Food': u'fruity.yaml'}}
+        penv = environment.Environment(env=env)
+        cenv = environment.get_child_environment(penv, None)
+        gcenv = environment.get_child_environment(
+            cenv, {u'resource_registry': {u'OS::Food': None}})
+        self.assertRaises(exception.EntityNotFound,
+                          gcenv.get_resource_info, 'OS::Food')
+        self.assertIsNotNone(cenv.get_resource_info('OS::Food'))
+
+    def test_param_defaults_inherited(self):
+        penv = environment.Environment(
+            env={u'parameter_defaults': {u'a': 1, u'b': 2}})
+        cenv = environment.get_child_environment(
+            penv, {u'parameter_defaults': {u'b': 3}})
+        self.assertEqual({u'a': 1, u'b': 3}, cenv.param_defaults)
+        self.assertEqual({u'a': 1, u'b': 2}, penv.param_defaults)
+
     def test_item_to_remove_simple(self):
         env = {u'resource_registry': {u'OS::Food': u'fruity.yaml'}}
         penv = environment.Environment(env)
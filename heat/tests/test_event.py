@@ -27,7 +27,6 @@ from heat.tests import common
 from heat.tests import generic_resource as generic_rsrc
 from heat.tests import utils
 
-cfg.CONF.import_opt('event_purge_batch_size', 'heat.common.config')
 cfg.CONF.import_opt('max_events_per_stack', 'heat.common.config')
 
 tmpl = {
@@ -171,22 +170,21 @@ class EventTest(EventCommon):
         self.assertIsNotNone(loaded_e.timestamp)
         self.assertEqual({'Foo': 'goo'}, loaded_e.resource_properties)
 
-    def test_store_caps_events(self):
-        cfg.CONF.set_override('event_purge_batch_size', 1, enforce_type=True)
+    def test_store_does_not_prune_events(self):
         cfg.CONF.set_override('max_events_per_stack', 1, enforce_type=True)
         self.resource.resource_id_set('resource_physical_id')
 
-        e = event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS', 'Testing',
-                        'alabama', self.resource.properties,
-                        self.resource.name, self.resource.type())
-        e.store()
-        self.assertEqual(1, len(event_object.Event.get_all_by_stack(
+        for physical_id in ('alabama', 'arizona'):
+            e = event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS',
+                            'Testing', physical_id, self.resource.properties,
+                            self.resource.name, self.resource.type())
+            e.store()
+        self.assertEqual(2, len(event_object.Event.get_all_by_stack(
             self.ctx,
             self.stack.id)))
-        e = event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS', 'Testing',
-                        'arizona', self.resource.properties,
-                        self.resource.name, self.resource.type())
-        e.store()
+
+        self.assertEqual(1, event_object.Event.prune(
+            self.ctx, max_events=cfg.CONF.max_events_per_stack))
         events = event_object.Event.get_all_by_stack(self.ctx, self.stack.id)
         self.assertEqual(1, len(events))
         self.assertEqual('arizona', events[0].physical_resource_id)
@@ -30,6 +30,7 @@ from heat.db import api as db_api
 from heat.engine import attributes
 from heat.engine.cfn import functions as cfn_funcs
 from heat.engine import clients
+from heat.engine.clients import rate_limit
 from heat.engine import constraints
 from heat.engine import dependencies
 from heat.engine import environment
@@ -800,6 +801,117 @@ class ResourceTest(common.HeatTestCase):
         self.assertEqual((res.CREATE, res.COMPLETE), res.state)
         self.m.VerifyAll()
 
+    def test_create_over_limit_backs_off(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        self.patchobject(res, 'backend_service', return_value='nova')
+        over_limit = Exception('over limit')
+        self.patchobject(res, 'handle_create', side_effect=over_limit)
+        plugin = self.stack.clients.client_plugin('nova')
+        self.patchobject(plugin, 'is_over_limit',
+                         side_effect=lambda ex: ex is over_limit)
+        bucket = rate_limit.bucket('nova', res.context.tenant_id)
+        self.patchobject(bucket, 'over_limit')
+
+        create = scheduler.TaskRunner(res.create)
+        self.assertRaises(exception.ResourceFailure, create)
+        bucket.over_limit.assert_called_once_with()
+
+    def test_create_success_reported(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        self.patchobject(res, 'backend_service', return_value='nova')
+        bucket = rate_limit.bucket('nova', res.context.tenant_id)
+        self.patchobject(bucket, 'succeeded')
+
+        scheduler.TaskRunner(res.create)()
+        bucket.succeeded.assert_called_once_with()
+
+    def test_check_complete_polls_back_off(self):
+        cfg.CONF.set_override('poll_backoff_jitter', 0.5, enforce_type=True)
+        self.patchobject(scheduler.random, 'randint',
+                         side_effect=lambda a, b: b)
+        cfg.CONF.set_override('poll_backoff_max_periods',
+                              ['Bar=2', 'F*=4'], enforce_type=True)
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        statuses = iter(['BUILD'] * 4 + ['ATTACHING'] * 2)
+
+        def check_create_complete(cookie):
+            res.poll_status = next(statuses, 'ACTIVE')
+            return res.poll_status == 'ACTIVE'
+
+        res.check_create_complete = check_create_complete
+        task = res.action_handler_task(res.CREATE)
+        self.assertIsNone(next(task))
+        self.assertEqual([1, 3, 6, 6, 1, 3], list(task))
+        self.assertEqual({'Foo': 7}, scheduler.poll_counts())
+
+    def test_check_complete_no_status_not_backed_off(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        res.check_create_complete = mock.Mock(
+            side_effect=[False] * 4 + [True])
+        task = res.action_handler_task(res.CREATE)
+        self.assertIsNone(next(task))
+        self.assertEqual([1, 1, 1, 1], list(task))
+
+    def test_check_complete_status_backs_off_to_default(self):
+        cfg.CONF.set_override('poll_backoff_jitter', 0, enforce_type=True)
+        cfg.CONF.set_override('poll_backoff_max_period', 4,
+                              enforce_type=True)
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        statuses = iter(['BUILD'] * 5)
+
+        def check_create_complete(cookie):
+            res.poll_status = next(statuses, 'ACTIVE')
+            return res.poll_status == 'ACTIVE'
+
+        res.check_create_complete = check_create_complete
+        task = res.action_handler_task(res.CREATE)
+        self.assertIsNone(next(task))
+        self.assertEqual([1, 2, 4, 4, 4], list(task))
+
+    def test_check_complete_poll_delay_counted(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        res.check_create_complete = mock.Mock(
+            side_effect=[resource.PollDelay(5), True])
+        task = res.action_handler_task(res.CREATE)
+        self.assertIsNone(next(task))
+        self.assertEqual([5], list(task))
+        self.assertEqual({'Foo': 2}, scheduler.poll_counts())
+
+    def test_create_waits_for_rate_limit(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        acquire = self.patchobject(rate_limit.limiter, 'acquire',
+                                   side_effect=[False, True])
+        handle_create = self.patchobject(res, 'handle_create')
+
+        runner = scheduler.TaskRunner(res.create)
+        runner.start()
+        self.assertFalse(handle_create.called)
+        runner.run_to_completion()
+        handle_create.assert_called_once_with()
+        self.assertEqual(2, acquire.call_count)
+
+    def test_delete_uncreated_not_rate_limited(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        scheduler.TaskRunner(res.create)()
+        self.assertIsNone(res.resource_id)
+        acquire = self.patchobject(rate_limit.limiter, 'acquire')
+
+        scheduler.TaskRunner(res.delete)()
+        self.assertEqual((res.DELETE, res.COMPLETE), res.state)
+        self.assertFalse(acquire.called)
+
     def test_create_fail_retry_disabled(self):
         cfg.CONF.set_override('action_retry_limit', 0, enforce_type=True)
         tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo',
@@ -2140,6 +2252,62 @@ class ResourceTest(common.HeatTestCase):
                 self.assertIsNone(res.FnGetAtt('Foo'))
                 self.assertEqual(1, client_plugin.call_count)
 
+    def test_stored_attributes(self):
+        tmpl = template.Template({
+            'heat_template_version': '2013-05-23',
+            'resources': {
+                'res': {
+                    'type': 'GenericResourceType'
+                },
+                'dep': {
+                    'type': 'ResourceWithPropsType',
+                    'properties': {'Foo': {'get_attr': ['res', 'Foo']}}
+                }
+            }
+        })
+        ctx = utils.dummy_context()
+        stack = parser.Stack(ctx, 'test_stored_attrs', tmpl)
+        stack.store()
+        stack.create()
+        self.assertEqual((stack.CREATE, stack.COMPLETE), stack.state)
+
+        # the value resolved while creating the dependent resource is
+        # stored when the stack completes
+        stack = parser.Stack.load(ctx, stack_id=stack.id)
+        data = resource_data_object.ResourceData.get_val(
+            stack['res'], resource.StoredAttributes.DATA_KEY)
+        state_key, values = json.loads(data)
+        self.assertEqual({'Foo': 'res'}, values)
+
+        # a newly loaded resource uses the value stored when the stack
+        # completed, and reading attributes writes nothing
+        stack = parser.Stack.load(ctx, stack_id=stack.id)
+        res = stack['res']
+        self.assertNotIn(resource.StoredAttributes.DATA_KEY, res.data())
+        mock_set = self.patchobject(resource_data_object.ResourceData, 'set')
+        with mock.patch.object(res, '_resolve_attribute') as res_attr:
+            self.assertEqual('res', res.FnGetAtt('Foo'))
+            self.assertEqual(0, res_attr.call_count)
+            res_attr.return_value = 'live'
+            self.assertEqual('live', res.FnGetAtt('foo'))
+            self.assertEqual(1, res_attr.call_count)
+            self.assertFalse(mock_set.called)
+            res_attr.reset_mock()
+
+            # values stored in a different state are not used
+            res.attributes.reset_resolved_values()
+            res.action = res.CHECK
+            res_attr.return_value = 'live'
+            self.assertEqual('live', res.FnGetAtt('Foo'))
+            self.assertEqual(1, res_attr.call_count)
+
+        # starting an update deletes the stored values
+        res.state_set(res.UPDATE, res.IN_PROGRESS)
+        self.assertRaises(
+            exception.NotFound,
+            resource_data_object.ResourceData.get_val,
+            res, resource.StoredAttributes.DATA_KEY)
+
     def test_show_resource(self):
         # check default function _show_resource
         stack = self.create_resource_for_attributes_tests()
@@ -145,6 +145,11 @@ class EngineRpcAPITestCase(common.HeatTestCase):
         self._test_engine_api('show_stack', 'call', stack_identity='wordpress',
                               resolve_outputs=True)
 
+    def test_show_stack_resolve_live(self):
+        self._test_engine_api('show_stack', 'call', stack_identity='wordpress',
+                              resolve_outputs=True, resolve_live=True,
+                              version='1.31')
+
     def test_preview_stack(self):
         self._test_engine_api('preview_stack', 'call', stack_name='wordpress',
                               template={u'Foo': u'bar'},
@@ -329,6 +334,11 @@ class EngineRpcAPITestCase(common.HeatTestCase):
         self._test_engine_api('list_software_deployments', 'call',
                               server_id='9dc13236-d342-451f-a885-1c82420ba5ed')
 
+    def test_poll_metadata_software_deployments(self):
+        self._test_engine_api('poll_metadata_software_deployments', 'call',
+                              server_id='9dc13236-d342-451f-a885-1c82420ba5ed',
+                              etag='1-2', timeout=10)
+
     def test_show_software_deployment(self):
         deployment_id = '86729f02-4648-44d8-af44-d0ec65b6abc9'
         self._test_engine_api('show_software_deployment', 'call',
@@ -399,6 +409,11 @@ class EngineRpcAPITestCase(common.HeatTestCase):
             'show_output', 'call', stack_identity=self.identity,
             output_key='test', version='1.19')
 
+    def test_stack_show_output_resolve_live(self):
+        self._test_engine_api(
+            'show_output', 'call', stack_identity=self.identity,
+            output_key='test', resolve_live=True, version='1.31')
+
     def test_export_stack(self):
         self._test_engine_api('export_stack',
                               'call',
@@ -349,7 +349,8 @@ class StackTest(common.HeatTestCase):
                              current_traversal=self.stack.current_traversal,
                              tags=mox.IgnoreArg(),
                              prev_raw_template_id=None,
-                             current_deps=None, cache_data=None)
+                             current_deps=None, cache_data=None,
+                             cached_outputs=None)
 
         self.m.ReplayAll()
         stack.Stack.load(self.ctx, stack_id=self.stack.id)
@@ -1601,6 +1602,174 @@ class StackTest(common.HeatTestCase):
         self.assertEqual((self.stack.DELETE, self.stack.COMPLETE),
                          self.stack.state)
 
+    def test_cached_outputs(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {
+                    'Resource_attr': {
+                        'Value': {
+                            'Fn::GetAtt': ['AResource', 'Foo']}}}}
+
+        self.stack = stack.Stack(self.ctx, 'stack_with_cached_outputs',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.stack._persist_state()
+
+        self.stack = stack.Stack.load(self.ctx, stack_id=self.stack.id)
+        self.assertEqual('AResource', self.stack.output('Resource_attr'))
+        self.stack.store_cached_outputs()
+
+        self.stack = stack.Stack.load(self.ctx, stack_id=self.stack.id)
+        with mock.patch.object(function, 'resolve') as mock_resolve:
+            mock_resolve.return_value = 'live'
+            self.assertEqual('AResource', self.stack.output('Resource_attr'))
+            self.assertEqual(0, mock_resolve.call_count)
+            self.assertEqual('live',
+                             self.stack.output('Resource_attr',
+                                               resolve_live=True))
+            self.assertEqual(1, mock_resolve.call_count)
+
+        # a signal to a resource the outputs depend on discards the values
+        self.stack.invalidate_cached_outputs(self.stack['AResource'])
+        db_stack = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
+        self.assertIsNone(db_stack.cached_outputs)
+
+    def test_cached_outputs_state_change(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {
+                    'Resource_attr': {
+                        'Value': {
+                            'Fn::GetAtt': ['AResource', 'Foo']}}}}
+
+        self.stack = stack.Stack(self.ctx, 'stack_with_cached_outputs',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.stack._persist_state()
+        self.assertEqual('AResource', self.stack.output('Resource_attr'))
+        self.stack.store_cached_outputs()
+
+        self.stack.state_set(self.stack.CHECK, self.stack.IN_PROGRESS,
+                             'checking')
+        db_stack = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
+        self.assertIsNone(db_stack.cached_outputs)
+
+    def test_cached_outputs_nested_update(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {
+                    'Resource_attr': {
+                        'Value': {
+                            'Fn::GetAtt': ['AResource', 'Foo']}}}}
+
+        self.stack = stack.Stack(self.ctx, 'stack_with_cached_outputs',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.stack._persist_state()
+
+        nested = stack.Stack(self.ctx, 'nested_stack',
+                             template.Template(tmpl),
+                             owner_id=self.stack.id)
+        nested.store()
+        nested.create()
+        self.assertEqual((nested.CREATE, nested.COMPLETE), nested.state)
+
+        self.assertEqual('AResource', self.stack.output('Resource_attr'))
+        self.stack.store_cached_outputs()
+        db_stack = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
+        self.assertIsNotNone(db_stack.cached_outputs)
+
+        # an update of the nested stack leaves the parent COMPLETE, but its
+        # outputs may depend on the nested stack's attributes
+        nested.update(stack.Stack(self.ctx, 'nested_stack',
+                                  template.Template(tmpl)))
+        self.assertEqual((nested.UPDATE, nested.COMPLETE), nested.state)
+        self.assertEqual((self.stack.CREATE, self.stack.COMPLETE),
+                         self.stack.state)
+        db_stack = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
+        self.assertIsNone(db_stack.cached_outputs)
+
+    def test_cached_outputs_not_secret(self):
+        tmpl = {'heat_template_version': '2013-05-23',
+                'parameters': {
+                    'password': {'type': 'string', 'hidden': True}},
+                'resources': {
+                    'AResource': {'type': 'GenericResourceType'},
+                    'ARandom': {'type': 'OS::Heat::RandomString'}},
+                'outputs': {
+                    'attr': {'value': {'get_attr': ['AResource', 'Foo']}},
+                    'random': {'value': {'get_attr': ['ARandom', 'value']}},
+                    'password': {'value': {
+                        'str_replace': {
+                            'template': 'pw=PASSWORD',
+                            'params': {
+                                'PASSWORD': {'get_param': 'password'}}}}}}}
+
+        self.stack = stack.Stack(
+            self.ctx, 'stack_with_secret_outputs',
+            template.Template(tmpl, env=environment.Environment(
+                {'password': 'secret-password'})))
+        self.stack.store()
+        self.stack.create()
+        self.stack._persist_state()
+        self.assertEqual('AResource', self.stack.output('attr'))
+        self.assertIsNotNone(self.stack.output('random'))
+        self.assertEqual('pw=secret-password', self.stack.output('password'))
+        self.stack.store_cached_outputs()
+
+        db_stack = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
+        self.assertEqual({'attr': 'AResource'},
+                         db_stack.cached_outputs['outputs'])
+
+    def test_cached_outputs_resource_state_change(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {
+                    'Resource_attr': {
+                        'Value': {
+                            'Fn::GetAtt': ['AResource', 'Foo']}}}}
+
+        parent = stack.Stack(self.ctx, 'parent_stack',
+                             template.Template(tmpl))
+        parent.store()
+        parent.create()
+        parent._persist_state()
+        self.assertEqual('AResource', parent.output('Resource_attr'))
+        parent.store_cached_outputs()
+
+        self.stack = stack.Stack(self.ctx, 'nested_stack',
+                                 template.Template(tmpl),
+                                 owner_id=parent.id)
+        self.stack.store()
+        self.stack.create()
+        self.stack._persist_state()
+        parent = stack.Stack.load(self.ctx, stack_id=parent.id)
+        self.assertEqual('AResource', parent.output('Resource_attr'))
+        parent.store_cached_outputs()
+
+        # a change of state of a resource only discards the values of its
+        # own stack; its parents are left to the state of the stack
+        clear = self.patchobject(stack_object.Stack, 'clear_cached_outputs',
+                                 wraps=stack_object.Stack.clear_cached_outputs)
+        self.stack['AResource'].state_set('CHECK', 'COMPLETE')
+        clear.assert_called_once_with(self.ctx, [self.stack.id])
+        db_parent = stack_object.Stack.get_by_id(self.ctx, parent.id)
+        self.assertIsNotNone(db_parent.cached_outputs)
+
+        # a signal discards those of the parents too
+        clear.reset_mock()
+        self.stack.invalidate_cached_outputs(self.stack['AResource'])
+        clear.assert_called_once_with(self.ctx, [self.stack.id, parent.id])
+        db_parent = stack_object.Stack.get_by_id(self.ctx, parent.id)
+        self.assertIsNone(db_parent.cached_outputs)
+
     def test_incorrect_outputs(self):
         tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
                 'Resources': {
@@ -2769,6 +2938,95 @@ class StackTest(common.HeatTestCase):
         mock_sau.assert_called_once_with(mock.ANY, 1, mock.ANY,
                                          exp_trvsl='curr-traversal')
 
+    def _create_metadata_stack(self):
+        tmpl = template.Template({
+            'HeatTemplateFormatVersion': '2012-12-12',
+            'Resources': {
+                'A': {'Type': 'GenericResourceType',
+                      'Metadata': {'foo': 'a'}},
+                'B': {'Type': 'GenericResourceType',
+                      'Metadata': {'foo': 'b'}}
+            }
+        })
+        self.stack = stack.Stack(self.ctx, 'metadata_refresh', tmpl)
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+    def test_metadata_refresh(self):
+        self._create_metadata_stack()
+
+        def refreshed(metadata):
+            if metadata['foo'] == 'a':
+                return dict(metadata, bar='baz')
+            return metadata
+
+        self.patchobject(generic_rsrc.GenericResource, 'refreshed_metadata',
+                         side_effect=refreshed)
+        mock_update = self.patchobject(
+            resource_objects.Resource, 'update_all_metadata',
+            wraps=resource_objects.Resource.update_all_metadata)
+
+        self.stack.metadata_refresh()
+
+        res_a = self.stack['A']
+        mock_update.assert_called_once_with(
+            self.ctx, {res_a.id: ({'foo': 'a', 'bar': 'baz'}, mock.ANY)})
+        self.assertEqual({'foo': 'a', 'bar': 'baz'}, res_a.metadata_get())
+        self.assertEqual({'foo': 'a', 'bar': 'baz'},
+                         res_a.metadata_get(refresh=True))
+        self.assertEqual({'foo': 'b'},
+                         self.stack['B'].metadata_get(refresh=True))
+
+    def test_metadata_refresh_unsupported(self):
+        self._create_metadata_stack()
+        mock_update = self.patchobject(resource_objects.Resource,
+                                       'update_all_metadata')
+
+        self.stack.metadata_refresh()
+
+        self.assertFalse(mock_update.called)
+
+    def test_metadata_refresh_conflict(self):
+        self._create_metadata_stack()
+        res_a = self.stack['A']
+        self.patchobject(generic_rsrc.GenericResource, 'refreshed_metadata',
+                         side_effect=lambda md: dict(md, bar='baz'))
+        self.patchobject(resource_objects.Resource, 'update_all_metadata',
+                         return_value=[res_a.id])
+        mock_md_update = self.patchobject(generic_rsrc.GenericResource,
+                                          'metadata_update')
+
+        self.stack.metadata_refresh(resources=[res_a])
+
+        mock_md_update.assert_called_once_with()
+
+    def test_metadata_dependents(self):
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources': {
+                   'A': {'Type': 'GenericResourceType'},
+                   'B': {'Type': 'ResourceWithPropsType',
+                         'Properties': {'Foo': {'Ref': 'A'}}},
+                   'C': {'Type': 'GenericResourceType',
+                         'Metadata': {'data': {'Fn::GetAtt': ['B', 'foo']}}},
+                   'D': {'Type': 'GenericResourceType',
+                         'Metadata': {'data': {'Ref': 'A'}}},
+                   'E': {'Type': 'GenericResourceType',
+                         'Metadata': {'data': 'foo'}}}}
+        self.stack = stack.Stack(self.ctx, 'metadata_deps_test',
+                                 template.Template(tpl))
+
+        def dependents(*names):
+            resources = [self.stack[name] for name in names]
+            return sorted(r.name for r in
+                          self.stack.metadata_dependents(resources))
+
+        self.assertEqual(['C', 'D'], dependents('A'))
+        self.assertEqual(['C'], dependents('B'))
+        self.assertEqual(['D'], dependents('A', 'C'))
+        self.assertEqual([], dependents('E'))
+
 
 class StackKwargsForCloningTest(common.HeatTestCase):
     scenarios = [
@@ -2940,3 +3198,49 @@ class StackStateSetTest(common.HeatTestCase):
             self.assertEqual((self.action, self.status), self.stack.state)
             self.assertEqual('test', self.stack.status_reason)
         self.assertEqual(self.persist_count, persist_state.call_count)
+
+
+class StackQueryBudgetTest(common.HeatTestCase):
+    """The number of SQL statements issued for stacks of different sizes."""
+
+    def setUp(self):
+        super(StackQueryBudgetTest, self).setUp()
+        self.ctx = utils.dummy_context()
+
+    def _stack(self, num_resources):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': dict(('R%d' % i,
+                                   {'Type': 'GenericResourceType'})
+                                  for i in range(num_resources))}
+        stk = stack.Stack(self.ctx, utils.random_name(),
+                          template.Template(tmpl))
+        stk.store()
+        return stk
+
+    def _create(self, num_resources, budget):
+        stk = self._stack(num_resources)
+        with utils.QueryBudget(self, budget, 'stack_create') as stats:
+            stk.create()
+        self.assertEqual((stk.CREATE, stk.COMPLETE), stk.state)
+        return stk, stats.count
+
+    def _load(self, stack_id, budget):
+        with utils.QueryBudget(self, budget, 'stack_load') as stats:
+            stk = stack.Stack.load(self.ctx, stack_id=stack_id)
+            self.assertEqual(
+                len(stk.t[stk.t.RESOURCES]),
+                len([r for r in six.itervalues(stk.resources) if r.id]))
+        return stats.count
+
+    def test_create(self):
+        one = self._create(1, 60)[1]
+        two = self._create(2, 60)[1]
+        per_resource = two - one
+        # creating each further resource costs no more than the second did
+        self._create(6, one + 5 * per_resource)
+
+    def test_load(self):
+        small = self._load(self._create(2, 60)[0].id, 20)
+        # loading a stack and its resources does not cost more for each
+        # resource
+        self._load(self._create(6, 200)[0].id, small)
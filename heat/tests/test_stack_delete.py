@@ -18,6 +18,7 @@ import time
 
 from keystoneclient import exceptions as kc_exceptions
 import mock
+from oslo_config import cfg
 
 from heat.common import exception
 from heat.common import heat_keystoneclient as hkc
@@ -61,6 +62,38 @@ class StackTest(common.HeatTestCase):
         self.assertEqual((stack.Stack.DELETE, stack.Stack.COMPLETE),
                          self.stack.state)
 
+    def test_delete_parallel_mode(self):
+        cfg.CONF.set_override('parallel_stack_delete', True,
+                              enforce_type=True)
+        resources = dict(('r%d' % i, {'Type': 'GenericResourceType'})
+                         for i in range(20))
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': resources}
+        self.stack = stack.Stack(self.ctx, 'delete_test',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        add_event = self.patchobject(self.stack, '_add_event')
+
+        self.stack.delete()
+
+        self.assertEqual((stack.Stack.DELETE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        progress = [args[2] for args, kwargs in add_event.call_args_list
+                    if args[2].startswith('Deleted')]
+        self.assertEqual(['Deleted %d of 20 resources' % i
+                          for i in range(2, 20, 2)], progress)
+
+    def test_delete_limit_key(self):
+        self.stack = stack.Stack(self.ctx, 'delete_test', self.tmpl)
+        res = mock.Mock(stack=self.stack)
+        res.backend_service.return_value = 'nova'
+        self.assertEqual('nova', stack._delete_limit_key(res))
+        res.backend_service.return_value = 'heat'
+        self.assertEqual(('heat', 0), stack._delete_limit_key(res))
+
     def test_delete_with_snapshot(self):
         self.stack = stack.Stack(self.ctx, 'delete_test', self.tmpl)
         stack_id = self.stack.store()
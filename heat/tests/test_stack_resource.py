@@ -21,7 +21,9 @@ from oslo_serialization import jsonutils
 import six
 
 from heat.common import exception
+from heat.common import identifier
 from heat.common import template_format
+from heat.engine import resource
 from heat.engine.resources import stack_resource
 from heat.engine import stack as parser
 from heat.engine import template as templatem
@@ -512,6 +514,34 @@ class StackResourceTest(StackResourceBaseTest):
         rpcc.return_value.delete_stack.assert_called_once_with(
             self.parent_resource.context, mock.ANY)
 
+    def test_delete_nested_without_loading(self):
+        self.parent_resource._nested = None
+        self.parent_resource.resource_id = 'nested-id'
+        db_stack = mock.Mock(tenant='test_tenant', id='nested-id')
+        db_stack.name = 'nested'
+        self.patchobject(stack_object.Stack, 'get_by_id',
+                         return_value=db_stack)
+        load = self.patchobject(parser.Stack, 'load')
+        rpcc = mock.Mock()
+        self.parent_resource.rpc_client = rpcc
+
+        self.assertIsNone(self.parent_resource.delete_nested())
+        self.assertFalse(load.called)
+        rpcc.return_value.delete_stack.assert_called_once_with(
+            self.parent_resource.context,
+            dict(identifier.HeatIdentifier('test_tenant', 'nested',
+                                           'nested-id')))
+
+    def test_backend_service(self):
+        self.assertEqual('heat', self.parent_resource.backend_service())
+
+    def test_attributes_not_persisted(self):
+        self.parent_resource.id = 1234
+        save = self.patchobject(resource.StoredAttributes, 'save')
+        self.assertIsNone(self.parent_resource.attributes._store)
+        self.parent_resource.store_attributes()
+        self.assertFalse(save.called)
+
     def test_need_update_for_nested_resource(self):
         """Test the resource with nested stack should need update.
 
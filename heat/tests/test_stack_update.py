@@ -25,6 +25,7 @@ from heat.engine import scheduler
 from heat.engine import service
 from heat.engine import stack
 from heat.engine import template
+from heat.engine import update
 from heat.objects import stack as stack_object
 from heat.rpc import api as rpc_api
 from heat.tests import common
@@ -144,6 +145,126 @@ class StackUpdateTest(common.HeatTestCase):
         self.assertEqual('BTemplate',
                          self.stack.t[self.stack.t.DESCRIPTION])
 
+    def test_update_skips_unchanged_resources(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': 'abc'}},
+                    'BResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': {
+                                      'Ref': 'AResource'}}},
+                    'CResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': 'xyz'}}}}
+
+        self.stack = stack.Stack(self.ctx, 'update_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+        tmpl2 = copy.deepcopy(tmpl)
+        tmpl2['Resources']['AResource']['Properties']['Foo'] = 'def'
+        updated_stack = stack.Stack(self.ctx, 'updated_stack',
+                                    template.Template(tmpl2))
+        update_in_place = update.StackUpdate._update_in_place
+        with mock.patch.object(update.StackUpdate, '_update_in_place',
+                               autospec=True,
+                               side_effect=update_in_place) as mock_update:
+            self.stack.update(updated_stack)
+
+        self.assertEqual((stack.Stack.UPDATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertEqual(['AResource', 'BResource'],
+                         sorted(c[0][1].name
+                                for c in mock_update.call_args_list))
+        self.assertEqual('def', self.stack['AResource'].properties['Foo'])
+        self.assertEqual('xyz', self.stack['CResource'].properties['Foo'])
+
+    def test_update_unstable_attributes_not_skipped(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': 'abc'}},
+                    'BResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': {
+                                      'Fn::GetAtt': ['AResource', 'Foo']}}},
+                    'CResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': {
+                                      'Ref': 'AResource'}}}}}
+
+        self.stack = stack.Stack(self.ctx, 'update_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+        # AResource's attributes may have changed without it changing state
+        self.patchobject(generic_rsrc.ResourceWithProps, 'stable_attributes',
+                         new=False)
+        updated_stack = stack.Stack(self.ctx, 'updated_stack',
+                                    template.Template(copy.deepcopy(tmpl)))
+        update_in_place = update.StackUpdate._update_in_place
+        with mock.patch.object(update.StackUpdate, '_update_in_place',
+                               autospec=True,
+                               side_effect=update_in_place) as mock_update:
+            self.stack.update(updated_stack)
+
+        self.assertEqual((stack.Stack.UPDATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertEqual(['BResource'],
+                         [c[0][1].name for c in mock_update.call_args_list])
+
+    def test_update_retry_after_failure_not_skipped(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Parameters': {'foo': {'Type': 'String'}},
+                'Resources': {
+                    'AResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': {'Ref': 'foo'}}},
+                    'CResource': {'Type': 'ResourceWithPropsType',
+                                  'DependsOn': 'AResource',
+                                  'Properties': {'Foo': {'Ref': 'foo'}}}}}
+
+        self.stack = stack.Stack(
+            self.ctx, 'update_test_stack',
+            template.Template(tmpl, env=environment.Environment(
+                {'foo': 'abc'})),
+            disable_rollback=True)
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+        mock_create = self.patchobject(generic_rsrc.ResourceWithProps,
+                                       'handle_create',
+                                       side_effect=[Exception, None, None])
+
+        def new_stack():
+            return stack.Stack(
+                self.ctx, 'updated_stack',
+                template.Template(tmpl, env=environment.Environment(
+                    {'foo': 'def'})),
+                disable_rollback=True)
+
+        # The replacement of AResource fails, so CResource is not reached
+        self.stack.update(new_stack())
+        self.assertEqual((stack.Stack.UPDATE, stack.Stack.FAILED),
+                         self.stack.state)
+        self.assertEqual(1, mock_create.call_count)
+
+        # Retrying with the same template and parameters, which have been
+        # merged into the stack, must still update CResource
+        self.stack = stack.Stack.load(self.ctx, self.stack.id)
+        self.stack.update(new_stack())
+        self.assertEqual((stack.Stack.UPDATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertEqual(3, mock_create.call_count)
+
+        self.stack = stack.Stack.load(self.ctx, self.stack.id)
+        self.assertEqual('def', self.stack['AResource'].properties['Foo'])
+        self.assertEqual('def', self.stack['CResource'].properties['Foo'])
+
     def test_update_timeout(self):
         tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
                 'Description': 'ATemplate',
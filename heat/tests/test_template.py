@@ -22,6 +22,7 @@ from stevedore import extension
 
 from heat.common import exception
 from heat.common import template_format
+from heat.db.sqlalchemy import models
 from heat.engine.cfn import functions as cfn_funcs
 from heat.engine.cfn import template as cfn_t
 from heat.engine.clients.os import nova
@@ -32,6 +33,9 @@ from heat.engine import parameters
 from heat.engine import rsrc_defn
 from heat.engine import stack
 from heat.engine import template
+from heat.engine import template_files
+from heat.objects import raw_template
+from heat.objects import raw_template_files
 from heat.tests import common
 from heat.tests.openstack.nova import fakes as fakes_nova
 from heat.tests import utils
@@ -965,6 +969,59 @@ class TemplateTest(common.HeatTestCase):
 
         self.assertEqual(cfn_tpl['Resources'], empty.t['Resources'])
 
+    def _test_resource_definitions_lazy(self, tmpl):
+        source = template.Template(tmpl)
+        stk = stack.Stack(self.ctx, 'test_stack', source)
+        parse = self.patchobject(source, 'parse', wraps=source.parse)
+
+        defns = source.resource_definitions(stk)
+        self.assertEqual(0, parse.call_count)
+        self.assertEqual(set(['resource1', 'resource2']), set(defns))
+        self.assertEqual(0, parse.call_count)
+
+        defn = defns['resource2']
+        self.assertEqual('resource2', defn.name)
+        self.assertEqual(1, parse.call_count)
+        self.assertIs(defn, defns['resource2'])
+        self.assertEqual(1, parse.call_count)
+        self.assertRaises(KeyError, defns.__getitem__, 'resource3')
+
+        self.assertEqual(2, len(dict(defns.items())))
+        self.assertEqual(2, parse.call_count)
+
+        # the parsed definitions are kept with the template for the stack
+        self.assertIs(defn, source.resource_definitions(stk)['resource2'])
+        self.assertEqual(2, parse.call_count)
+        other = stack.Stack(self.ctx, 'other_stack', source)
+        self.assertIsNot(defns, source.resource_definitions(other))
+
+        # until the resources change
+        source.remove_resource('resource1')
+        defns = source.resource_definitions(stk)
+        self.assertEqual(set(['resource2']), set(defns))
+        self.assertIsNot(defn, defns['resource2'])
+        self.assertEqual(3, parse.call_count)
+
+    def test_resource_definitions_lazy_cfn(self):
+        self._test_resource_definitions_lazy(template_format.parse('''
+        AWSTemplateFormatVersion: 2010-09-09
+        Resources:
+          resource1:
+            Type: AWS::EC2::Instance
+          resource2:
+            Type: AWS::EC2::Instance
+        '''))
+
+    def test_resource_definitions_lazy_hot(self):
+        self._test_resource_definitions_lazy(template_format.parse('''
+        heat_template_version: 2013-05-23
+        resources:
+          resource1:
+            type: AWS::EC2::Instance
+          resource2:
+            type: AWS::EC2::Instance
+        '''))
+
     def test_create_empty_template_default_version(self):
         empty_template = template.Template.create_empty_template()
         self.assertEqual(hot_t.HOTemplate20150430, empty_template.__class__)
@@ -1034,6 +1091,126 @@ class TemplateTest(common.HeatTestCase):
             from_template=hot_tmpl)
         self.assertEqual({}, empty_template['Resources'])
         self.assertEqual(hot_tmpl.env, empty_template.env)
+        self.assertEqual(['blarg', 'foo'], sorted(hot_tmpl['Resources']))
+
+    def test_deepcopy_shares_data(self):
+        tmpl = template.Template(copy.deepcopy(resource_template))
+        tmpl_copy = copy.deepcopy(tmpl)
+        self.assertIs(tmpl.t, tmpl_copy.t)
+
+        tmpl_copy.remove_resource('blarg')
+        self.assertIsNot(tmpl.t, tmpl_copy.t)
+        self.assertIs(tmpl.t['Resources']['foo'],
+                      tmpl_copy.t['Resources']['foo'])
+        self.assertEqual(['blarg', 'foo'], sorted(tmpl.t['Resources']))
+        self.assertEqual(['foo'], sorted(tmpl_copy.t['Resources']))
+
+    def test_resource_digests(self):
+        tmpl = template.Template(copy.deepcopy(resource_template))
+        digests = tmpl.resource_digests()
+        self.assertEqual(['blarg', 'foo'], sorted(digests))
+        self.assertEqual(digests['foo'], digests['blarg'])
+        self.assertEqual(template.snippet_digest(
+            {'Type': 'GenericResourceType'}), digests['foo'])
+
+        tmpl_copy = copy.deepcopy(tmpl)
+        stk = stack.Stack(self.ctx, 'test_stack', tmpl)
+        defn = tmpl.resource_definitions(stk)['foo']
+        tmpl_copy.add_resource(defn, 'new')
+        tmpl_copy.remove_resource('blarg')
+        self.assertEqual(['foo', 'new'],
+                         sorted(tmpl_copy.resource_digests()))
+        self.assertEqual(['blarg', 'foo'], sorted(tmpl.resource_digests()))
+
+    def test_resource_digests_stored(self):
+        tmpl = template.Template(copy.deepcopy(resource_template))
+        tmpl.store(self.ctx)
+        digests = tmpl.resource_digests()
+
+        self.patchobject(template, 'snippet_digest',
+                         side_effect=AssertionError('not stored'))
+        loaded = template.Template.load(self.ctx, tmpl.id)
+        self.assertEqual(digests, loaded.resource_digests())
+
+    def test_deepcopy_add_resource(self):
+        tmpl = template.Template(copy.deepcopy(resource_template))
+        tmpl_copy = copy.deepcopy(tmpl)
+        stk = stack.Stack(self.ctx, 'test_stack', tmpl)
+        defn = tmpl.resource_definitions(stk)['foo']
+
+        tmpl.add_resource(defn, 'new')
+        self.assertIn('new', tmpl.t['Resources'])
+        self.assertNotIn('new', tmpl_copy.t['Resources'])
+        tmpl.add_resource(defn, 'newer')
+        tmpl_copy.add_resource(defn, 'copied')
+        self.assertEqual(['blarg', 'foo', 'new', 'newer'],
+                         sorted(tmpl.t['Resources']))
+        self.assertEqual(['blarg', 'copied', 'foo'],
+                         sorted(tmpl_copy.t['Resources']))
+
+
+class TemplateFilesTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(TemplateFilesTest, self).setUp()
+        self.ctx = utils.dummy_context()
+
+    def _file_rows(self):
+        return dict((row.digest, (row.contents, row.refcount)) for row in
+                    self.ctx.session.query(models.RawTemplateFiles))
+
+    def test_store_by_digest(self):
+        files = {'a.yaml': 'shared', 'b.yaml': 'shared', 'c.sh': 'once'}
+        tmpl = template.Template(empty_template, files=files)
+        tmpl.store(self.ctx)
+
+        shared = template_files.digest('shared')
+        once = template_files.digest('once')
+        raw = raw_template.RawTemplate.get_by_id(self.ctx, tmpl.id)
+        self.assertEqual({'a.yaml': shared, 'b.yaml': shared, 'c.sh': once},
+                         raw.files)
+        self.assertEqual({shared: ('shared', 1), once: ('once', 1)},
+                         self._file_rows())
+
+    def test_child_templates_share_files(self):
+        parent = template.Template(empty_template,
+                                   files={'provider.yaml': 'contents'})
+        parent.store(self.ctx)
+        loaded = template.Template.load(self.ctx, parent.id)
+        for i in range(3):
+            child = template.Template(empty_template, files=loaded.files)
+            child.store(self.ctx)
+
+        digest = template_files.digest('contents')
+        self.assertEqual({digest: ('contents', 4)}, self._file_rows())
+
+    def test_load_files_lazily(self):
+        tmpl = template.Template(empty_template,
+                                 files={'a.yaml': 'a', 'b.yaml': 'b'})
+        tmpl.store(self.ctx)
+        get_many = self.patchobject(
+            raw_template_files.RawTemplateFiles, 'get_many',
+            side_effect=raw_template_files.RawTemplateFiles.get_many)
+
+        loaded = template.Template.load(self.ctx, tmpl.id)
+        self.assertEqual(['a.yaml', 'b.yaml'], sorted(loaded.files))
+        self.assertFalse(get_many.called)
+
+        self.assertEqual('a', loaded.files['a.yaml'])
+        self.assertEqual('a', loaded.files.copy()['a.yaml'])
+        get_many.assert_called_once_with(self.ctx,
+                                         [template_files.digest('a')])
+        self.assertEqual({'a.yaml': 'a', 'b.yaml': 'b'},
+                         loaded.files.to_dict())
+
+    def test_update_files(self):
+        tmpl = template.Template(empty_template, files={'a.yaml': 'old'})
+        tmpl.store(self.ctx)
+        tmpl.files['a.yaml'] = 'new'
+        tmpl.store(self.ctx)
+
+        self.assertEqual({template_files.digest('new'): ('new', 1)},
+                         self._file_rows())
 
 
 class TemplateFnErrorTest(common.HeatTestCase):
@@ -978,3 +978,72 @@ class WatchRuleTest(common.HeatTestCase):
         # Test
         self.assertRaises(ValueError, wr.set_watch_state, None)
         self.assertRaises(ValueError, wr.set_watch_state, "BADSTATE")
+
+
+class WatchRuleIndexTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(WatchRuleIndexTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        self.index = watchrule.WatchRuleIndex()
+        self.patchobject(watch_rule.WatchRule, 'get_all', return_value=[])
+
+    @staticmethod
+    def _sample(metric, **dims):
+        return {'Namespace': 'system/linux',
+                metric: {'Unit': 'Counter', 'Value': '1',
+                         'Dimensions': [dims]}}
+
+    def test_candidates_by_metric(self):
+        self.index.add(1, {'MetricName': 'ServiceFailure'})
+        self.index.add(2, {'MetricName': 'MemoryUtilization'})
+
+        self.assertEqual([1], self.index.candidates(
+            self.ctx, self._sample('ServiceFailure')))
+        self.assertEqual([], self.index.candidates(
+            self.ctx, self._sample('CPUUtilization')))
+
+    def test_candidates_by_dimension(self):
+        dims = [{'Name': 'AutoScalingGroupName', 'Value': 'group_x'}]
+        self.index.add(1, {'MetricName': 'CPU', 'Dimensions': dims})
+        dims = [{'Name': 'AutoScalingGroupName', 'Value': 'group_y'}]
+        self.index.add(2, {'MetricName': 'CPU', 'Dimensions': dims})
+        self.index.add(3, {'MetricName': 'CPU'})
+
+        sample = self._sample('CPU', AutoScalingGroupName='group_x',
+                              InstanceId='1234')
+        self.assertEqual([1, 3], self.index.candidates(self.ctx, sample))
+        sample = self._sample('CPU', InstanceId='1234')
+        self.assertEqual([3], self.index.candidates(self.ctx, sample))
+
+    def test_candidates_ceilometer_rule(self):
+        rule = {'meter_name': 'cpu_util',
+                'matching_metadata': {'metadata.user_metadata.groupname':
+                                      'group_x'}}
+        self.index.add(1, rule)
+
+        sample = self._sample('cpu_util', groupname='group_x')
+        self.assertEqual([1], self.index.candidates(self.ctx, sample))
+
+    def test_add_replaces_and_remove(self):
+        self.index.add(1, {'MetricName': 'CPU'})
+        self.index.add(1, {'MetricName': 'Memory'})
+        self.assertEqual([], self.index.candidates(self.ctx,
+                                                   self._sample('CPU')))
+        self.assertEqual([1], self.index.candidates(self.ctx,
+                                                    self._sample('Memory')))
+
+        self.index.remove(1)
+        self.index.remove(1)
+        self.assertEqual([], self.index.candidates(self.ctx,
+                                                   self._sample('Memory')))
+
+    def test_refresh_loads_rules_from_db(self):
+        wr = mock.Mock(id=5, rule={'MetricName': 'CPU'})
+        watch_rule.WatchRule.get_all.return_value = [wr]
+
+        self.assertEqual([5], self.index.candidates(self.ctx,
+                                                    self._sample('CPU')))
+        self.assertEqual([5], self.index.candidates(self.ctx,
+                                                    self._sample('CPU')))
+        watch_rule.WatchRule.get_all.assert_called_once_with(self.ctx)
@@ -23,6 +23,7 @@ import sqlalchemy
 
 from heat.common import context
 from heat.db import api as db_api
+from heat.db import query_stats
 from heat.db.sqlalchemy import models
 from heat.engine import environment
 from heat.engine import resource
@@ -112,6 +113,38 @@ def update_stack(stk, new_t, params=None, files=None):
     stk.update(updated_stack)
 
 
+class QueryBudget(object):
+    """Fail a test if a block issues more SQL statements than its budget.
+
+    Usage::
+
+        with utils.QueryBudget(self, 10):
+            stack.Stack.load(ctx, stack_id)
+    """
+
+    def __init__(self, test, budget, operation='test'):
+        self.test = test
+        self.budget = budget
+        self._operation = operation
+        self._accounting = None
+        self.stats = None
+
+    def __enter__(self):
+        cfg.CONF.set_override('query_accounting', True)
+        query_stats.install(get_engine())
+        self._accounting = query_stats.operation(self._operation)
+        self.stats = self._accounting.__enter__()
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        self._accounting.__exit__(*exc_info)
+        if exc_info[0] is None:
+            self.test.assertLessEqual(
+                self.stats.count, self.budget,
+                '%s issued %d SQL statements, over its budget of %d' %
+                (self._operation, self.stats.count, self.budget))
+
+
 class PhysName(object):
 
     mock_short_id = 'x' * 12
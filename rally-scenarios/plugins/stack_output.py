@@ -49,6 +49,31 @@ class CustomHeatBenchmark(utils.HeatScenario):
             if output['output_key'] == output_key:
                 break
 
+    @atomic.action_timer("heat.show_output_cached")
+    def _stack_show_output_cached(self, stack, output_key):
+        """Execute output_show for specified 'output_key'.
+
+        This method expects the output value to have been stored with the
+        stack by a previous call, so the output is not resolved again.
+
+        :param stack: stack with output_key output.
+        :param output_key: The name of the output.
+        """
+        self.clients("heat").stacks.output_show(stack.id, output_key)
+
+    @atomic.action_timer("heat.show_output_live")
+    def _stack_show_output_live(self, stack, output_key):
+        """Execute output_show for specified 'output_key'.
+
+        This method asks for the output to be resolved live, ignoring any
+        value stored with the stack.
+
+        :param stack: stack with output_key output.
+        :param output_key: The name of the output.
+        """
+        url = '/stacks/%s/outputs/%s' % (stack.id, output_key)
+        self.clients("heat").http_client.get(url + '?resolve_live=True')
+
     @atomic.action_timer("heat.list_output_new")
     def _stack_list_output_new(self, stack):
         """Execute output_list for specified 'stack'.
@@ -170,3 +195,58 @@ class CustomHeatBenchmark(utils.HeatScenario):
         stack = self._create_stack(
             template_path, parameters, files, environment)
         self._stack_list_output_new(stack)
+
+    @types.set(template_path=types.FileType, files=types.FileTypeDict)
+    @validation.required_services(consts.Service.HEAT)
+    @validation.required_openstack(users=True)
+    @scenario.configure(context={"cleanup": ["heat"]})
+    def create_stack_and_show_output_cached(self, template_path, output_key,
+                                            parameters=None, files=None,
+                                            environment=None):
+        """Create stack and show output stored with the stack.
+
+        Measure performance of the following commands:
+        heat stack-create
+        heat output-show
+        heat output-show
+        heat stack-delete
+
+        The first output-show stores the output value with the stack, the
+        second one is measured.
+
+        :param template_path: path to stack template file
+        :param output_key: the stack output key that corresponds to
+                           the scaling webhook
+        :param parameters: parameters to use in heat template
+        :param files: files used in template
+        :param environment: stack environment definition
+        """
+        stack = self._create_stack(
+            template_path, parameters, files, environment)
+        self._stack_show_output_new(stack, output_key)
+        self._stack_show_output_cached(stack, output_key)
+
+    @types.set(template_path=types.FileType, files=types.FileTypeDict)
+    @validation.required_services(consts.Service.HEAT)
+    @validation.required_openstack(users=True)
+    @scenario.configure(context={"cleanup": ["heat"]})
+    def create_stack_and_show_output_live(self, template_path, output_key,
+                                          parameters=None, files=None,
+                                          environment=None):
+        """Create stack and show output resolved live.
+
+        Measure performance of the following commands:
+        heat stack-create
+        heat output-show (with resolve_live)
+        heat stack-delete
+
+        :param template_path: path to stack template file
+        :param output_key: the stack output key that corresponds to
+                           the scaling webhook
+        :param parameters: parameters to use in heat template
+        :param files: files used in template
+        :param environment: stack environment definition
+        """
+        stack = self._create_stack(
+            template_path, parameters, files, environment)
+        self._stack_show_output_live(stack, output_key)